@@ -2,8 +2,14 @@
 字节数组读写工具类
 """
 
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
 from enum import Enum
+import functools
+import mmap
 import struct
+from typing import Any, Literal
+from typing_extensions import Self
 
 
 class Writer:
@@ -82,12 +88,76 @@ class GlobalLengthType:
 	value = LengthType.BYTE
 
 
+BufferTypes = bytes | bytearray | memoryview | mmap.mmap
+"""支持切片与struct.unpack_from的缓冲区类型"""
+
+UINT16_LE = struct.Struct('<H')
+"""小端无符号16位整数，YooAsset清单中字符串与列表的长度前缀"""
+
+_PRIMITIVE_CODES = 'bBhHiIqQfd'
+_LITTLE_ENDIAN_STRUCTS = {code: struct.Struct(f'<{code}') for code in _PRIMITIVE_CODES}
+_BIG_ENDIAN_STRUCTS = {code: struct.Struct(f'>{code}') for code in _PRIMITIVE_CODES}
+_LENGTH_CODES = {
+	LengthType.BYTE: 'B',
+	LengthType.UINT16: 'H',
+	LengthType.UINT32: 'I',
+}
+
+
+def primitive_struct(code: str, little_endian: bool = True) -> struct.Struct:
+	"""获取单个基本类型的预编译结构，code为struct格式字符，例如'i'"""
+	return (_LITTLE_ENDIAN_STRUCTS if little_endian else _BIG_ENDIAN_STRUCTS)[code]
+
+
+@functools.cache
+def int_array_struct(count: int, little_endian: bool = True) -> struct.Struct:
+	"""count个有符号32位整数的预编译结构，按数量缓存"""
+	return struct.Struct(f'{"<" if little_endian else ">"}{count}i')
+
+
+def read_texts(
+	buffer: BufferTypes,
+	offset: int,
+	count: int,
+	length_struct: struct.Struct = UINT16_LE,
+) -> tuple[list[str], int]:
+	"""从buffer的offset处读取count个带长度前缀的字符串，返回字符串列表与新的位置
+
+	buffer可以是bytes、bytearray、memoryview或mmap，不会复制整个缓冲区。
+	"""
+	texts = []
+	unpack_length = length_struct.unpack_from
+	length_size = length_struct.size
+	for _ in range(count):
+		(length,) = unpack_length(buffer, offset)
+		offset += length_size
+		texts.append(str(buffer[offset : offset + length], 'utf-8'))
+		offset += length
+	return texts, offset
+
+
+def read_ints(
+	buffer: BufferTypes, offset: int, count: int, little_endian: bool = True
+) -> tuple[list[int], int]:
+	"""从buffer的offset处读取count个有符号32位整数，返回整数列表与新的位置"""
+	if not count:
+		return [], offset
+	values = int_array_struct(count, little_endian).unpack_from(buffer, offset)
+	return list(values), offset + 4 * count
+
+
 class BytesReader:
-	"""字节数组读取器"""
+	"""字节数组读取器
+
+	数值使用预编译的struct.Struct直接从缓冲区解包，字符串直接从缓冲区解码，
+	读取过程中不会复制数据。data为bytes时直接读取，为bytearray、memoryview或mmap
+	时包装为memoryview（零复制模式），读取mmap时应在关闭mmap前调用release
+	或使用with语句。
+	"""
 
 	def __init__(
 		self,
-		data: bytes,
+		data: BufferTypes,
 		length_type: LengthType = GlobalLengthType.value,
 		little_endian: bool = True,
 	) -> None:
@@ -95,15 +165,51 @@ class BytesReader:
 		初始化字节读取器
 
 		Args:
-			data: 要读取的字节数据
+			data: 要读取的字节数据，可以是bytes、bytearray、memoryview或mmap
 			length_type: 字符串长度前缀类型，默认使用全局设置
 			little_endian: 是否使用小端字节序，默认为True
 
 		"""
-		self.data = data
+		if not isinstance(data, bytes):
+			data = memoryview(data).cast('B')
+		self.data: bytes | memoryview = data
 		self.offset = 0
-		self.length_type = length_type
+		self._length_type = length_type
 		self.little_endian = little_endian
+		self.length_type = length_type
+
+	def __enter__(self) -> Self:
+		return self
+
+	def __exit__(self, *exc_info: object) -> None:
+		self.release()
+
+	def release(self) -> None:
+		"""释放零复制模式下持有的memoryview，之后不能再读取"""
+		if isinstance(self.data, memoryview):
+			self.data.release()
+
+	@property
+	def little_endian(self) -> bool:
+		return self._little_endian
+
+	@little_endian.setter
+	def little_endian(self, little_endian: bool) -> None:
+		# 按默认字节序缓存预编译结构，避免每次读取时查找
+		self._little_endian = little_endian
+		self._structs = _LITTLE_ENDIAN_STRUCTS if little_endian else _BIG_ENDIAN_STRUCTS
+		self._length_struct = self._structs[_LENGTH_CODES[self._length_type]]
+
+	@property
+	def length_type(self) -> LengthType:
+		return self._length_type
+
+	@length_type.setter
+	def length_type(self, length_type: LengthType) -> None:
+		if length_type not in _LENGTH_CODES:
+			raise ValueError(f'Invalid length type: {length_type}')
+		self._length_type = length_type
+		self._length_struct = self._structs[_LENGTH_CODES[length_type]]
 
 	def seek(self, length: int, tag: str = ''):
 		"""移动读取位置"""
@@ -115,30 +221,37 @@ class BytesReader:
 
 	def read(self, length: int | None = None, tag: str = '') -> bytes:
 		"""读取指定长度的字节"""
-		if length is not None:
-			slice_data = self.data[self.offset : self.offset + length]
-			self.seek(length, tag)
-		else:
-			# 读取到末尾
-			slice_data = self.data[self.offset :]
-			self.offset = len(self.data)
-		return slice_data
+		# length为None时读取到末尾
+		end = len(self.data) if length is None else self.offset + length
+		slice_data = self.data[self.offset : end]
+		self.offset = end
+		return bytes(slice_data) if isinstance(slice_data, memoryview) else slice_data
+
+	def view(self, length: int) -> memoryview:
+		"""读取指定长度的字节，返回不复制数据的memoryview"""
+		view = memoryview(self.data)[self.offset : self.offset + length]
+		self.offset += length
+		return view
+
+	def _unpack(self, code: str, little_endian: bool | None) -> Any:
+		unpacker = (
+			self._structs[code]
+			if little_endian is None
+			else primitive_struct(code, little_endian)
+		)
+		(value,) = unpacker.unpack_from(self.data, self.offset)
+		self.offset += unpacker.size
+		return value
 
 	def text(self) -> str:
 		"""读取带长度前缀的文本字符串"""
-		if self.length_type == LengthType.BYTE:
-			length = self.byte()
-		elif self.length_type == LengthType.UINT16:
-			length = self.ushort()
-		elif self.length_type == LengthType.UINT32:
-			length = self.uint()
-		else:
-			raise ValueError(f'Invalid length type: {self.length_type}')
-
-		if length > 0:
-			return self.read(length).decode('utf-8')
-		else:
+		unpacker = self._length_struct
+		(length,) = unpacker.unpack_from(self.data, self.offset)
+		offset = self.offset + unpacker.size
+		self.offset = offset + length
+		if length <= 0:
 			return ''
+		return str(self.data[offset : offset + length], 'utf-8')
 
 	def boolean(self) -> bool:
 		"""读取布尔值"""
@@ -152,77 +265,51 @@ class BytesReader:
 
 	def short(self, little_endian: bool | None = None) -> int:
 		"""读取有符号16位整数"""
-		if little_endian is None:
-			little_endian = self.little_endian
-		data = self.read(2)
-		format_str = '<h' if little_endian else '>h'
-		return struct.unpack(format_str, data)[0]
+		return self._unpack('h', little_endian)
 
 	def ushort(self, little_endian: bool | None = None) -> int:
 		"""读取无符号16位整数"""
-		if little_endian is None:
-			little_endian = self.little_endian
-		data = self.read(2)
-		format_str = '<H' if little_endian else '>H'
-		return struct.unpack(format_str, data)[0]
+		return self._unpack('H', little_endian)
 
 	def int(self, little_endian: bool | None = None) -> int:
 		"""读取有符号32位整数"""
-		if little_endian is None:
-			little_endian = self.little_endian
-		data = self.read(4)
-		format_str = '<i' if little_endian else '>i'
-		return struct.unpack(format_str, data)[0]
+		return self._unpack('i', little_endian)
 
 	def uint(self, little_endian: bool | None = None) -> 'int':
 		"""读取无符号32位整数"""
-		if little_endian is None:
-			little_endian = self.little_endian
-		data = self.read(4)
-		format_str = '<I' if little_endian else '>I'
-		return struct.unpack(format_str, data)[0]
+		return self._unpack('I', little_endian)
 
 	def long(self, little_endian: bool | None = None) -> 'int':
 		"""读取有符号64位整数"""
-		if little_endian is None:
-			little_endian = self.little_endian
-		data = self.read(8)
-		format_str = '<q' if little_endian else '>q'
-		return struct.unpack(format_str, data)[0]
+		return self._unpack('q', little_endian)
 
 	def ulong(self, little_endian: bool | None = None) -> 'int':
 		"""读取无符号64位整数"""
-		if little_endian is None:
-			little_endian = self.little_endian
-		data = self.read(8)
-		format_str = '<Q' if little_endian else '>Q'
-		return struct.unpack(format_str, data)[0]
+		return self._unpack('Q', little_endian)
 
 	def float(self, little_endian: bool | None = None) -> float:
 		"""读取32位浮点数"""
-		if little_endian is None:
-			little_endian = self.little_endian
-		data = self.read(4)
-		format_str = '<f' if little_endian else '>f'
-		return struct.unpack(format_str, data)[0]
+		return self._unpack('f', little_endian)
 
 	def double(self, little_endian: bool | None = None) -> 'float':
 		"""读取64位浮点数"""
-		if little_endian is None:
-			little_endian = self.little_endian
-		data = self.read(8)
-		format_str = '<d' if little_endian else '>d'
-		return struct.unpack(format_str, data)[0]
+		return self._unpack('d', little_endian)
 
 	def text_list(self) -> list[str]:
 		"""读取带长度前缀的文本列表"""
 		length = self.ushort()
-		return [self.text() for _ in range(length)]
+		texts, self.offset = read_texts(
+			self.data, self.offset, length, self._length_struct
+		)
+		return texts
 
 	def int_list(self) -> list['int']:
 		"""读取带长度前缀的有符号32位整数列表"""
 		length = self.ushort()
-		return [self.int() for _ in range(length)]
+		values, self.offset = read_ints(
+			self.data, self.offset, length, self.little_endian
+		)
+		return values
 
 
 # 类型定义
@@ -337,3 +424,249 @@ def bundle_bytes_struct(
 		offset += len(b)
 
 	return bytes(result)
+
+
+FieldType = Literal[
+	'byte',
+	'boolean',
+	'short',
+	'ushort',
+	'int',
+	'uint',
+	'long',
+	'ulong',
+	'float',
+	'double',
+	'text',
+	'text_list',
+	'int_list',
+]
+
+_FIXED_FIELD_CODES: dict[str, str] = {
+	'byte': 'B',
+	'boolean': '?',
+	'short': 'h',
+	'ushort': 'H',
+	'int': 'i',
+	'uint': 'I',
+	'long': 'q',
+	'ulong': 'Q',
+	'float': 'f',
+	'double': 'd',
+}
+
+
+@dataclass(frozen=True)
+class Field:
+	"""二进制记录中的一个字段"""
+
+	name: str
+	type: FieldType
+	length_type: LengthType | None = None
+	"""text与text_list中字符串的长度前缀类型，为None时使用RecordSchema的设置，
+	列表的元素个数总是无符号16位整数，与BytesReader一致"""
+	when: Callable[[str], bool] | None = None
+	"""版本条件，接收清单版本号，返回False时不读取该字段，值为default"""
+	default: Any = None
+
+
+@dataclass(frozen=True)
+class Const:
+	"""不占用字节、值固定的字段，factory不为None时每条记录调用一次以创建新的值"""
+
+	name: str
+	value: Any = None
+	factory: Callable[[], Any] | None = None
+
+
+class RecordSchema:
+	"""声明式的二进制记录结构
+
+	首次读取某个版本的记录时，根据版本条件确定布局并生成专用的解码函数：
+	相邻的定长字段与字符串、列表的长度前缀合并为一个struct.Struct，
+	字符串直接从缓冲区解码，整个循环中没有逐字段的函数调用。
+	解码结果为以字段名为键的dict，可以直接作为TypedDict使用。
+	同时生成逐条产出记录的生成器，以及只读取长度前缀、跳过整段记录的函数。
+
+	Example:
+		>>> schema = RecordSchema(Field('Name', 'text'), Field('Size', 'long'))
+		>>> schema.read_list(reader, count, version)
+	"""
+
+	def __init__(
+		self,
+		*fields: Field | Const,
+		length_type: LengthType = LengthType.UINT16,
+		little_endian: bool = True,
+	) -> None:
+		self.fields = fields
+		self.length_type = length_type
+		self.little_endian = little_endian
+		self._compiled: dict[str, dict[str, Any]] = {}
+
+	def _generate(self, version: str) -> tuple[str, dict[str, Any]]:
+		"""生成解码函数的源代码与其中引用的全局变量"""
+		endian = '<' if self.little_endian else '>'
+		namespace: dict[str, Any] = {'read_texts': read_texts, 'read_ints': read_ints}
+		lines: list[str] = []
+		run_codes: list[str] = []
+		run_targets: list[str] = []
+
+		def flush() -> None:
+			if not run_codes:
+				return
+			unpacker = struct.Struct(endian + ''.join(run_codes))
+			name = f'_unpack{len(namespace)}'
+			namespace[name] = unpacker.unpack_from
+			lines.append(f'({", ".join(run_targets)},) = {name}(data, offset)')
+			lines.append(f'offset += {unpacker.size}')
+			run_codes.clear()
+			run_targets.clear()
+
+		for i, field in enumerate(self.fields):
+			var = f'v{i}'
+			if isinstance(field, Const):
+				namespace[f'_const{i}'] = field.factory or field.value
+				lines.append(f'{var} = _const{i}{"()" if field.factory else ""}')
+				continue
+			if field.when is not None and not field.when(version):
+				namespace[f'_const{i}'] = field.default
+				lines.append(f'{var} = _const{i}')
+				continue
+
+			length_code = _LENGTH_CODES[field.length_type or self.length_type]
+			if code := _FIXED_FIELD_CODES.get(field.type):
+				run_codes.append(code)
+				run_targets.append(var)
+				continue
+			# 变长字段的长度前缀并入前面的定长字段，之后的数据长度不固定
+			run_codes.append(length_code if field.type == 'text' else 'H')
+			run_targets.append(f'n{i}')
+			flush()
+			if field.type == 'text':
+				lines.append(f"{var} = str(data[offset : offset + n{i}], 'utf-8')")
+				lines.append(f'offset += n{i}')
+			elif field.type == 'text_list':
+				namespace[f'_length{i}'] = struct.Struct(endian + length_code)
+				lines.append(
+					f'{var}, offset = read_texts(data, offset, n{i}, _length{i}) '
+					f'if n{i} else ([], offset)'
+				)
+			elif field.type == 'int_list':
+				lines.append(
+					f'{var}, offset = read_ints(data, offset, n{i}, '
+					f'{self.little_endian}) if n{i} else ([], offset)'
+				)
+			else:
+				raise ValueError(f'不支持的字段类型: {field.type}')
+		flush()
+
+		record = ', '.join(
+			f'{field.name!r}: v{i}' for i, field in enumerate(self.fields)
+		)
+		body = ''.join(f'\t\t{line}\n' for line in lines)
+		skip_body = ''.join(
+			f'\t\t{line}\n' for line in self._generate_skip(version, namespace)
+		)
+		source = (
+			'def decode(data, offset, count):\n'
+			'\trecords = []\n'
+			'\tappend = records.append\n'
+			'\tfor _ in range(count):\n'
+			f'{body}'
+			f'\t\tappend({{{record}}})\n'
+			'\treturn records, offset\n'
+			'\n'
+			'def iterate(data, offset, count, done):\n'
+			'\tfor _ in range(count):\n'
+			f'{body}'
+			f'\t\tyield {{{record}}}\n'
+			'\tdone(offset)\n'
+			'\n'
+			'def skip(data, offset, count):\n'
+			'\tfor _ in range(count):\n'
+			f'{skip_body}'
+			'\treturn offset\n'
+		)
+		return source, namespace
+
+	def _generate_skip(self, version: str, namespace: dict[str, Any]) -> list[str]:
+		"""生成跳过一条记录的代码：定长字段只累加长度，变长字段只读取长度前缀"""
+		endian = '<' if self.little_endian else '>'
+		lines: list[str] = []
+		fixed = 0
+		for i, field in enumerate(self.fields):
+			if isinstance(field, Const) or (
+				field.when is not None and not field.when(version)
+			):
+				continue
+			if code := _FIXED_FIELD_CODES.get(field.type):
+				fixed += struct.calcsize(endian + code)
+				continue
+			length = struct.Struct(
+				endian + _LENGTH_CODES[field.length_type or self.length_type]
+			)
+			namespace[f'_skip_length{i}'] = length.unpack_from
+			if field.type == 'text':
+				lines.append(f'(n,) = _skip_length{i}(data, offset + {fixed})')
+				lines.append(f'offset += {fixed + length.size} + n')
+			else:
+				lines.append(f'(n,) = _unpack_count(data, offset + {fixed})')
+				lines.append(f'offset += {fixed + 2}')
+				if field.type == 'text_list':
+					lines.append('for _ in range(n):')
+					lines.append(
+						f'\toffset += {length.size} + _skip_length{i}(data, offset)[0]'
+					)
+				else:
+					lines.append('offset += 4 * n')
+			fixed = 0
+		if fixed:
+			lines.append(f'offset += {fixed}')
+		namespace['_unpack_count'] = struct.Struct(endian + 'H').unpack_from
+		return lines or ['pass']
+
+	def _functions(self, version: str) -> dict[str, Any]:
+		if (namespace := self._compiled.get(version)) is None:
+			source, namespace = self._generate(version)
+			exec(compile(source, f'<RecordSchema {version or "-"}>', 'exec'), namespace)
+			self._compiled[version] = namespace
+		return namespace
+
+	def compile(
+		self, version: str = ''
+	) -> Callable[[BufferTypes, int, int], tuple[list, int]]:
+		"""获取指定版本的解码函数，每个版本只生成一次
+
+		解码函数的参数为缓冲区、起始位置与记录数，返回记录列表与新的位置。
+		"""
+		return self._functions(version)['decode']
+
+	def read_list(self, reader: BytesReader, count: int, version: str = '') -> list:
+		"""从reader的当前位置读取count条记录，并移动reader的读取位置"""
+		records, reader.offset = self.compile(version)(
+			reader.data, reader.offset, count
+		)
+		return records
+
+	def read(self, reader: BytesReader, version: str = '') -> dict[str, Any]:
+		"""读取一条记录"""
+		return self.read_list(reader, 1, version)[0]
+
+	def iter_records(
+		self, reader: BytesReader, count: int, version: str = ''
+	) -> Iterator[dict[str, Any]]:
+		"""逐条读取count条记录，全部读取完毕后才移动reader的读取位置"""
+
+		def done(offset: int) -> None:
+			reader.offset = offset
+
+		return self._functions(version)['iterate'](
+			reader.data, reader.offset, count, done
+		)
+
+	def skip(self, reader: BytesReader, count: int, version: str = '') -> None:
+		"""跳过count条记录，只读取其中字符串与列表的长度前缀"""
+		reader.offset = self._functions(version)['skip'](
+			reader.data, reader.offset, count
+		)
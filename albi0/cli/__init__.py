@@ -4,7 +4,7 @@ from pathlib import Path
 from asyncer import syncify
 import click
 
-from albi0.request import client as httpx_client
+from albi0 import request
 
 
 @click.group(invoke_without_command=True)
@@ -35,11 +35,12 @@ async def cli(ctx: click.Context):
 
 @syncify
 async def on_close():
-	await httpx_client.aclose()
+	await request.aclose()
 
 
-from .commands import extract, list_, update
+from .commands import extract, gc, list_, update
 
 cli.add_command(update)
 cli.add_command(extract)
 cli.add_command(list_)
+cli.add_command(gc)
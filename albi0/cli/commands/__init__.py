@@ -1,5 +1,6 @@
 from .extract import extract
+from .gc import gc
 from .list import list as list_
 from .update import update
 
-__all__ = ['extract', 'list_', 'update']
+__all__ = ['extract', 'gc', 'list_', 'update']
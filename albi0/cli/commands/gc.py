@@ -0,0 +1,82 @@
+import click
+
+from albi0.update import updaters
+from albi0.utils import set_directory
+
+
+@click.command(help='删除已从远程清单中移除的资源文件')
+@click.option(
+	'-w',
+	'--working-dir',
+	default=None,
+	type=click.Path(exists=True, file_okay=False, writable=True),
+)
+@click.option(
+	'-n',
+	'--updater-name',
+	type=str,
+	required=True,
+	help='更新器名称，支持传入更新器/组名',
+)
+@click.option(
+	'-m',
+	'--manifest-path',
+	type=click.Path(dir_okay=False, writable=True),
+	help='本地清单文件路径，如果未指定则使用更新器默认路径',
+)
+@click.option(
+	'--dry-run',
+	is_flag=True,
+	default=False,
+	help='只列出将要删除的文件，不修改磁盘与本地清单',
+)
+@click.option(
+	'--keep-empty-dirs',
+	is_flag=True,
+	default=False,
+	help='不删除清理后变为空的目录',
+)
+@click.argument('patterns', nargs=-1, default=None)
+def gc(
+	patterns: tuple[str, ...],
+	working_dir: str | None,
+	updater_name: str,
+	manifest_path: str | None,
+	dry_run: bool,
+	keep_empty_dirs: bool,
+) -> None:
+	updater_set = updaters.get_processors(updater_name)
+	if not updater_set:
+		click.echo(f'找不到输入的更新器/组：{updater_name}')
+		return
+	if manifest_path and len(updater_set) > 1:
+		# 每个更新器都会按同一个清单清理文件，其他包的文件会被当作已移除
+		raise click.BadParameter(
+			'选择了多个更新器时不能指定自定义清单路径',
+			param_hint="'-m' / '--manifest-path'",
+		)
+
+	with set_directory(working_dir or './'):
+		for updater in updater_set:
+			version_manager = updater.version_manager
+			if manifest_path:
+				version_manager.local_manifest_path = manifest_path
+			result = version_manager.gc(
+				*patterns, dry_run=dry_run, remove_empty_dirs=not keep_empty_dirs
+			)
+
+			prefix = f'[{updater.name}] '
+			action = '将删除' if dry_run else '已删除'
+			if dry_run:
+				for path in result.files:
+					click.echo(f'{prefix}将删除：{path}')
+				for path in result.dirs:
+					click.echo(f'{prefix}将删除空目录：{path}')
+			click.echo(
+				f'{prefix}{action}文件{len(result.files)}个，'
+				f'空目录{len(result.dirs)}个，'
+				f'释放约{result.freed_bytes / 1024**2:.1f}MiB，'
+				f'清单中移除{len(result.stale_entries) - len(result.failed)}项'
+			)
+			for path in result.failed:
+				click.echo(f'{prefix}❌ 无法删除：{path}')
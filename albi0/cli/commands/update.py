@@ -1,12 +1,48 @@
 import os
+from pathlib import Path
 
 import anyio
+import anyio.to_thread
 from asyncer import syncify
 import click
 from tqdm.asyncio import tqdm
 
-from albi0.update import updaters
-from albi0.utils import set_directory, timer
+from albi0 import request
+from albi0.update import (
+	AdaptiveLimiter,
+	BlobStore,
+	DownloadsFailedError,
+	Updater,
+	updaters,
+)
+from albi0.update.limiter import Limiter, set_bandwidth_limit
+from albi0.update.manifest_codec import Compression, check_compression
+from albi0.update.metadata_cache import ManifestCache, MetadataCache
+from albi0.updaters import YooVersionManager
+from albi0.utils import parse_size, set_directory, timer
+
+
+def _parse_rate(ctx: click.Context, param: click.Parameter, value: str | None):
+	if value is None:
+		return None
+	try:
+		rate = parse_size(value)
+	except ValueError as e:
+		raise click.BadParameter(str(e)) from e
+	if rate <= 0:
+		raise click.BadParameter(f'限速必须大于0：{value}')
+	return rate
+
+
+def _check_compression(
+	ctx: click.Context, param: click.Parameter, value: Compression | None
+):
+	# 在开始下载前检查依赖，避免下载完成后保存清单时才失败
+	try:
+		check_compression(value)
+	except ImportError as e:
+		raise click.BadParameter(str(e)) from e
+	return value
 
 
 @click.command(help='更新资源清单并下载资源文件')
@@ -36,6 +72,25 @@ from albi0.utils import set_directory, timer
 	type=int,
 	show_default=True,
 )
+@click.option(
+	'--adaptive',
+	is_flag=True,
+	default=False,
+	help='根据吞吐量与响应延迟自动调整并发数，-s 作为初始并发数',
+)
+@click.option(
+	'--adaptive-max-limit',
+	default=64,
+	type=int,
+	show_default=True,
+	help='自动调整并发数时的最大并发数',
+)
+@click.option(
+	'--limit-rate',
+	default=None,
+	callback=_parse_rate,
+	help='所有下载共享的带宽上限（字节/秒），支持K/M/G单位，如 5M',
+)
 @click.option(
 	'--ignore-version',
 	is_flag=True,
@@ -48,6 +103,79 @@ from albi0.utils import set_directory, timer
 	default=False,
 	help='仅获取远程版本号，不下载资源文件',
 )
+@click.option(
+	'--http2',
+	is_flag=True,
+	default=False,
+	help='启用HTTP/2多路复用，需要安装h2',
+)
+@click.option(
+	'--max-connections',
+	default=request.ClientConfig.max_connections,
+	type=int,
+	show_default=True,
+	help='连接池的最大连接数',
+)
+@click.option(
+	'--max-connections-per-host',
+	default=request.ClientConfig.max_connections_per_host,
+	type=int,
+	show_default=True,
+	help='每个主机的最大连接数',
+)
+@click.option(
+	'--keepalive-expiry',
+	default=request.ClientConfig.keepalive_expiry,
+	type=float,
+	show_default=True,
+	help='空闲连接的保持时间（秒）',
+)
+@click.option(
+	'--timeout',
+	'read_timeout',
+	default=request.ClientConfig.read_timeout,
+	type=float,
+	show_default=True,
+	help='读取超时（秒）',
+)
+@click.option(
+	'--blob-store',
+	default=None,
+	type=click.Path(file_okay=False, writable=True, resolve_path=True, path_type=Path),
+	help='以文件哈希为键的本地存储目录，已存在的文件通过硬链接放置而不重新下载',
+)
+@click.option(
+	'--reconcile',
+	is_flag=True,
+	default=False,
+	help='检查磁盘上的文件，重新下载缺失或损坏的文件，版本最新时也会检查',
+)
+@click.option(
+	'--reconcile-workers',
+	default=None,
+	type=int,
+	help='检查磁盘文件时计算摘要的线程数',
+)
+@click.option(
+	'--metadata-cache',
+	default=None,
+	type=click.Path(file_okay=False, writable=True, resolve_path=True, path_type=Path),
+	help='版本文件与清单的缓存目录，使用条件请求检查版本，未变化的清单不会重新下载与解析',
+)
+@click.option(
+	'--manifest-compression',
+	default=None,
+	type=click.Choice(['gzip', 'zstd']),
+	callback=_check_compression,
+	help='保存本地清单时使用的压缩格式，zstd需要安装zstandard，读取时自动识别',
+)
+@click.option(
+	'-a',
+	'--asset',
+	'asset_patterns',
+	multiple=True,
+	help='资源路径的glob模式，可以多次指定，只下载加载匹配的资源所需的bundle（包括依赖）',
+)
 @click.argument('patterns', nargs=-1, default=None)
 @click.pass_context
 @syncify
@@ -59,14 +187,44 @@ async def update(
 	manifest_path: str | None,
 	version_only: bool,
 	semaphore_limit: int,
+	adaptive: bool,
+	adaptive_max_limit: int,
+	limit_rate: int | None,
 	ignore_version: bool,
+	http2: bool,
+	max_connections: int,
+	max_connections_per_host: int,
+	keepalive_expiry: float,
+	read_timeout: float,
+	blob_store: Path | None,
+	metadata_cache: Path | None,
+	reconcile: bool,
+	reconcile_workers: int | None,
+	manifest_compression: Compression | None,
+	asset_patterns: tuple[str, ...],
 ) -> None:
+	request.configure(
+		request.ClientConfig(
+			max_connections=max_connections,
+			max_connections_per_host=max_connections_per_host,
+			keepalive_expiry=keepalive_expiry,
+			http2=http2,
+			read_timeout=read_timeout,
+		)
+	)
+	set_bandwidth_limit(limit_rate)
 	patterns = patterns or []
 	os.chdir(working_dir or './')
 	updater_set = updaters.get_processors(updater_name)
 	if not updater_set:
 		click.echo(f'找不到输入的更新器/组：{updater_name}')
 		return
+	if manifest_path and len(updater_set) > 1:
+		# 并发运行的更新器会同时读写同一个清单与清单日志
+		raise click.BadParameter(
+			'选择了多个更新器时不能指定自定义清单路径',
+			param_hint="'-m' / '--manifest-path'",
+		)
 
 	_updater_string = '找到以下更新器：\n'
 	_updater_string += ''.join(
@@ -74,38 +232,90 @@ async def update(
 	)
 	click.echo(_updater_string)
 
-	with (
-		timer('✅ 更新完成~ 总耗时: {duration:.2f}s'),
-		set_directory(working_dir or './'),
-	):
-		for updater in updater_set:
-			# 如果指定了自定义清单路径，设置到版本管理器中
-			if manifest_path:
-				click.echo(f'使用自定义清单文件路径: {manifest_path}')
-				updater.version_manager.local_manifest_path = manifest_path
-
-			click.echo(f'运行更新器：{updater.name}')
-			if version_only:
-				click.echo(
-					f'远程版本：{updater.version_manager.get_remote_version()}\n'
-				)
-				continue
-
-			click.echo(
-				f'本地版本：{updater.version_manager.load_local_version() or "无"}\n'
-				f'远程版本：{updater.version_manager.get_remote_version()}'
+	semaphore: Limiter = (
+		AdaptiveLimiter(
+			semaphore_limit, max_limit=max(adaptive_max_limit, semaphore_limit)
+		)
+		if adaptive
+		else anyio.Semaphore(semaphore_limit)
+	)
+	failed: list[str] = []
+
+	async def run_updater(updater: Updater, progress_bar: tqdm) -> None:
+		# 单个更新器出错时只记录失败，不影响同组的其他更新器
+		try:
+			await _run_updater(updater, progress_bar)
+		except Exception as e:
+			failed.append(updater.name)
+			click.echo(f'[{updater.name}] ❌ 更新失败：{e!r}')
+
+	async def _run_updater(updater: Updater, progress_bar: tqdm) -> None:
+		def echo(message: str) -> None:
+			click.echo(f'[{updater.name}] {message}')
+
+		# 如果指定了自定义清单路径，设置到版本管理器中
+		if manifest_path:
+			echo(f'使用自定义清单文件路径: {manifest_path}')
+			updater.version_manager.local_manifest_path = manifest_path
+		if blob_store:
+			updater.blob_store = BlobStore(blob_store)
+		if metadata_cache and isinstance(updater.version_manager, YooVersionManager):
+			updater.version_manager.metadata_cache = MetadataCache(metadata_cache)
+			updater.version_manager.manifest_cache = ManifestCache(
+				metadata_cache / 'parsed'
 			)
-			if not updater.version_manager.is_version_outdated and not ignore_version:
-				click.echo('版本最新，无需更新。')
-				continue
+		if manifest_compression and isinstance(
+			updater.version_manager, YooVersionManager
+		):
+			updater.version_manager.manifest_compression = manifest_compression
+
+		version_manager = updater.version_manager
+		version_manager.clear_remote_cache()
+		remote_version = await version_manager.aget_remote_version()
+		if version_only:
+			echo(f'远程版本：{remote_version}')
+			return
 
-			click.echo('开始更新...')
+		# 读取本地清单需要解析整个文件，放到工作线程中避免阻塞其他更新器的下载
+		local_version = await anyio.to_thread.run_sync(
+			version_manager.load_local_version
+		)
+		echo(f'本地版本：{local_version or "无"}，远程版本：{remote_version}')
+		if not (
+			ignore_version or reconcile or await version_manager.ais_version_outdated()
+		):
+			echo('版本最新，无需更新。')
+			return
+
+		echo('开始更新...')
+		try:
 			await updater.update(
-				progress_bar=tqdm(desc='下载资源文件', unit='file'),
+				progress_bar=progress_bar,
 				patterns=patterns,
-				semaphore=anyio.Semaphore(semaphore_limit),
-			)
-			click.echo(
-				f'✅(<ゝω・)～☆更新完毕！'
-				f'本地版本：{updater.version_manager.load_local_version() or "无"}\n'
+				semaphore=semaphore,
+				reconcile=reconcile,
+				reconcile_workers=reconcile_workers,
+				asset_patterns=asset_patterns,
 			)
+		except DownloadsFailedError as e:
+			failed.append(updater.name)
+			echo(f'❌ 更新失败：{e}，请重新运行以继续更新')
+			return
+		local_version = await anyio.to_thread.run_sync(
+			version_manager.load_local_version
+		)
+		echo(f'✅(<ゝω・)～☆更新完毕！本地版本：{local_version or "无"}')
+
+	# 所有更新器并发运行，共用同一个并发限制与总进度条
+	with (
+		timer('✅ 更新完成~ 总耗时: {duration:.2f}s'),
+		set_directory(working_dir or './'),
+		tqdm(desc='下载资源文件', unit='file', total=0) as progress_bar,
+	):
+		async with anyio.create_task_group() as tg:
+			for updater in updater_set:
+				tg.start_soon(run_updater, updater, progress_bar)
+
+	if failed:
+		click.echo(f'❌ 以下更新器更新失败：{", ".join(failed)}')
+		ctx.exit(1)
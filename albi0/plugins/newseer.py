@@ -1,20 +1,14 @@
 from typing import TYPE_CHECKING
 
-from httpx import AsyncClient
-from packaging.version import Version
 from UnityPy.enums.ClassIDType import ClassIDType
 
-from albi0.bytes_reader import BytesReader
+from albi0.bytes_reader import Const, Field, RecordSchema
 from albi0.extract.extractor import Extractor
 from albi0.extract.registry import AssetPostHandlerGroup, ObjPreHandlerGroup
 from albi0.typing import ObjectPath
 from albi0.update import Downloader, Updater
 from albi0.updaters import YooVersionManager
-from albi0.updaters.yoo_version_manager import (
-	PackageAssetInfo,
-	PackageBundleInfo,
-	YooManifestParser,
-)
+from albi0.updaters.yoo_version_manager import YooManifestParser, newer_than
 
 if TYPE_CHECKING:
 	from UnityPy.classes import Texture2D
@@ -25,7 +19,7 @@ header = {
 	'referer': r'https://newseer.61.com',
 }
 
-downloader = Downloader(AsyncClient())
+downloader = Downloader(headers=header)
 
 obj_pre = ObjPreHandlerGroup()
 asset_post = AssetPostHandlerGroup()
@@ -48,43 +42,27 @@ def texture2d_prehandler(
 
 
 class NewseerManifestParser(YooManifestParser):
-	def _parse_asset_infos(
-		self,
-		reader: BytesReader,
-		version: str,
-		count: int,
-	) -> list[PackageAssetInfo]:
-		"""解析资源信息列表"""
-		return [
-			PackageAssetInfo(
-				Address='',
-				AssetPath=reader.text(),
-				AssetGUID=None,
-				AssetTags=[],
-				BundleID=reader.int(),
-				DependIDs=reader.int_list(),
-			)
-			for _ in range(count)
-		]
-
-	def _parse_bundle_list(
-		self, reader: BytesReader, version: str, count: int
-	) -> list[PackageBundleInfo]:
-		"""解析Bundle列表"""
-		return [
-			PackageBundleInfo(
-				BundleName=reader.text(),
-				UnityCRC=reader.uint() if Version(version) > Version('1.5.1') else None,
-				FileHash=reader.text(),
-				FileCRC=reader.text(),
-				FileSize=reader.long(),
-				IsRawFile=reader.boolean(),
-				LoadMethod=reader.byte(),
-				Tags=[],
-				ReferenceIDs=reader.int_list(),
-			)
-			for _ in range(count)
-		]
+	"""赛尔号的清单去掉了资源的Address、GUID、Tags与Bundle的Tags"""
+
+	asset_info_schema = RecordSchema(
+		Const('Address', ''),
+		Field('AssetPath', 'text'),
+		Const('AssetGUID'),
+		Const('AssetTags', factory=list),
+		Field('BundleID', 'int'),
+		Field('DependIDs', 'int_list'),
+	)
+	bundle_info_schema = RecordSchema(
+		Field('BundleName', 'text'),
+		Field('UnityCRC', 'uint', when=newer_than('1.5.1')),
+		Field('FileHash', 'text'),
+		Field('FileCRC', 'text'),
+		Field('FileSize', 'long'),
+		Field('IsRawFile', 'boolean'),
+		Field('LoadMethod', 'byte'),
+		Const('Tags', factory=list),
+		Field('ReferenceIDs', 'int_list'),
+	)
 
 
 Updater(
@@ -96,6 +74,7 @@ Updater(
 		local_path='./newseer/assetbundles/DefaultPackage/',
 		manifest_factory=NewseerManifestParser(),
 		version_factory=int,
+		headers=header,
 	),
 	downloader=downloader,
 )
@@ -110,6 +89,7 @@ Updater(
 		local_path='./newseer/assetbundles/ConfigPackage/',
 		manifest_factory=NewseerManifestParser(),
 		version_factory=int,
+		headers=header,
 	),
 	downloader=downloader,
 )
@@ -124,6 +104,7 @@ Updater(
 		local_path='./newseer/assetbundles/PetAnimPackage/',
 		manifest_factory=NewseerManifestParser(),
 		version_factory=int,
+		headers=header,
 	),
 	downloader=downloader,
 )
@@ -138,6 +119,7 @@ Updater(
 		local_path='./newseer/assetbundles/StartupPackage/',
 		manifest_factory=NewseerManifestParser(),
 		version_factory=int,
+		headers=header,
 	),
 	downloader=downloader,
 )
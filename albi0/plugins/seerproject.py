@@ -18,7 +18,7 @@ from albi0.typing import ObjectPath
 from albi0.update import Downloader, Updater
 from albi0.update.version import LocalFileName, Manifest, ManifestItem
 from albi0.updaters import YooVersionManager
-from albi0.updaters.yoo_version_manager import PackageManifest
+from albi0.updaters.yoo_version_manager import LazyPackageManifest, PackageManifest
 from albi0.utils import join_path, join_url, remove_all_suffixes
 
 if TYPE_CHECKING:
@@ -40,7 +40,9 @@ def default_decryption_method(data: memoryview):
 
 
 class SeerProjectVersionManager(YooVersionManager):
-	def _simplify_manifest(self, data: PackageManifest) -> Manifest:
+	def _simplify_manifest(
+		self, data: PackageManifest | LazyPackageManifest
+	) -> Manifest:
 		version = data['PackageVersion']
 		items = {}
 		for item in data['BundleList']:
@@ -51,6 +53,8 @@ class SeerProjectVersionManager(YooVersionManager):
 				f'{join_url(self.remote_path, remote_filehash)}.bundle',
 				f'{local_basename}.bundle',
 				remote_filehash.encode(),
+				item['FileSize'],
+				item['FileCRC'],
 			)
 		return Manifest(version=version, items=items)
 
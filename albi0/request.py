@@ -1,4 +1,23 @@
-from httpx import AsyncClient
+from collections import defaultdict
+from collections.abc import AsyncIterator, Callable
+from dataclasses import dataclass
+import importlib.util
+from typing import Any
+
+import anyio
+from httpx import (
+	AsyncBaseTransport,
+	AsyncByteStream,
+	AsyncClient,
+	AsyncHTTPTransport,
+	Client,
+	Limits,
+	Request,
+	Response,
+	Timeout,
+)
+
+from albi0.log import logger
 
 MAX_CONCURRENT = 10
 
@@ -7,4 +26,198 @@ header = {
 	'referer': r'https://sp.61.com',
 }
 
-client = AsyncClient(headers=header)
+
+@dataclass(frozen=True)
+class ClientConfig:
+	"""共享连接池的配置"""
+
+	max_connections: int = 100
+	"""连接池的最大连接数"""
+	max_connections_per_host: int | None = 32
+	"""每个主机的最大并发请求数，HTTP/1.1下等同于每个主机的最大连接数，为None时不限制"""
+	max_keepalive_connections: int = 32
+	"""连接池保持的最大空闲连接数"""
+	keepalive_expiry: float = 30.0
+	"""空闲连接的保持时间（秒）"""
+	http2: bool = False
+	"""是否启用HTTP/2多路复用，需要安装h2"""
+	connect_timeout: float = 10.0
+	read_timeout: float | None = 60.0
+	"""读取超时，流式下载时为两次读取之间的最长间隔"""
+	write_timeout: float | None = 60.0
+
+	@property
+	def limits(self) -> Limits:
+		return Limits(
+			max_connections=self.max_connections,
+			max_keepalive_connections=self.max_keepalive_connections,
+			keepalive_expiry=self.keepalive_expiry,
+		)
+
+	@property
+	def timeout(self) -> Timeout:
+		return Timeout(
+			connect=self.connect_timeout,
+			read=self.read_timeout,
+			write=self.write_timeout,
+			pool=None,
+		)
+
+	@property
+	def http2_enabled(self) -> bool:
+		"""启用了HTTP/2且h2可用"""
+		if self.http2 and importlib.util.find_spec('h2') is None:
+			logger.warning(
+				'未安装h2（pip install albi0[http2]），无法启用HTTP/2，回退为HTTP/1.1'
+			)
+			return False
+		return self.http2
+
+
+class _ReleasingStream(AsyncByteStream):
+	"""响应关闭时释放主机并发名额的响应流"""
+
+	def __init__(self, stream: AsyncByteStream, release: Callable[[], None]) -> None:
+		self._stream = stream
+		self._release = release
+		self._released = False
+
+	def release(self) -> None:
+		if not self._released:
+			self._released = True
+			self._release()
+
+	async def __aiter__(self) -> AsyncIterator[bytes]:
+		try:
+			async for chunk in self._stream:
+				yield chunk
+		finally:
+			self.release()
+
+	async def aclose(self) -> None:
+		try:
+			await self._stream.aclose()
+		finally:
+			self.release()
+
+
+class HostLimitedTransport(AsyncBaseTransport):
+	"""限制每个主机并发请求数的传输层，名额在响应关闭时释放"""
+
+	def __init__(self, transport: AsyncBaseTransport, max_per_host: int) -> None:
+		self._transport = transport
+		self._semaphores: defaultdict[str, anyio.Semaphore] = defaultdict(
+			lambda: anyio.Semaphore(max_per_host)
+		)
+
+	async def handle_async_request(self, request: Request) -> Response:
+		semaphore = self._semaphores[request.url.host]
+		await semaphore.acquire()
+		try:
+			response = await self._transport.handle_async_request(request)
+		except BaseException:
+			semaphore.release()
+			raise
+
+		if response.is_closed:
+			# 已经读取完毕的响应（例如测试中的MockTransport）不会再调用aclose
+			semaphore.release()
+			return response
+
+		assert isinstance(response.stream, AsyncByteStream)
+		response.stream = _ReleasingStream(response.stream, semaphore.release)
+		return response
+
+	async def aclose(self) -> None:
+		await self._transport.aclose()
+
+
+def create_client(
+	config: ClientConfig | None = None, *, headers: dict[str, str] | None = None
+) -> AsyncClient:
+	"""按照配置创建异步客户端"""
+	config = config or ClientConfig()
+	transport: AsyncBaseTransport = AsyncHTTPTransport(
+		http2=config.http2_enabled, limits=config.limits
+	)
+	if config.max_connections_per_host is not None:
+		transport = HostLimitedTransport(transport, config.max_connections_per_host)
+	return AsyncClient(
+		headers=header if headers is None else headers,
+		timeout=config.timeout,
+		transport=transport,
+	)
+
+
+def create_sync_client(
+	config: ClientConfig | None = None, *, headers: dict[str, str] | None = None
+) -> Client:
+	"""按照配置创建同步客户端，用于同步接口中的少量请求"""
+	config = config or ClientConfig()
+	return Client(
+		headers=header if headers is None else headers,
+		timeout=config.timeout,
+		limits=config.limits,
+		http2=config.http2_enabled,
+	)
+
+
+_config = ClientConfig()
+_client: AsyncClient | None = None
+_sync_client: Client | None = None
+
+
+def _close_sync_client() -> None:
+	global _sync_client
+	if _sync_client is not None:
+		_sync_client.close()
+		_sync_client = None
+
+
+def configure(config: ClientConfig) -> None:
+	"""设置共享连接池的配置，需要在发出请求前调用
+
+	异步客户端只能在事件循环中关闭，已创建的异步客户端需要先调用aclose()，
+	否则抛出RuntimeError。已创建的同步客户端会被关闭，在下次获取时重建。
+	"""
+	global _config
+	if _client is not None and not _client.is_closed:
+		raise RuntimeError('共享客户端已创建，请先调用aclose()再重新配置')
+	_config = config
+	_close_sync_client()
+
+
+def get_config() -> ClientConfig:
+	return _config
+
+
+def get_client() -> AsyncClient:
+	"""获取进程内共享的异步客户端，所有插件、下载器与版本管理器共用同一个连接池"""
+	global _client
+	if _client is None or _client.is_closed:
+		_client = create_client(_config)
+	return _client
+
+
+def get_sync_client() -> Client:
+	"""获取进程内共享的同步客户端"""
+	global _sync_client
+	if _sync_client is None or _sync_client.is_closed:
+		_sync_client = create_sync_client(_config)
+	return _sync_client
+
+
+async def aclose() -> None:
+	"""关闭共享客户端"""
+	global _client
+	if _client is not None:
+		await _client.aclose()
+		_client = None
+	_close_sync_client()
+
+
+def __getattr__(name: str) -> Any:
+	# 兼容旧代码中的 albi0.request.client
+	if name == 'client':
+		return get_client()
+	raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
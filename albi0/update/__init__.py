@@ -1,5 +1,25 @@
-from .downloader import Downloader
+from .blob_store import BlobStore
+from .downloader import (
+	ChecksumMismatchError,
+	Downloader,
+	DownloadError,
+	DownloadsFailedError,
+)
+from .limiter import AdaptiveLimiter
+from .retry import CircuitBreaker, RetryPolicy
 from .updater import Updater, updaters
 from .version import AbstractVersionManager
 
-__all__ = ['AbstractVersionManager', 'Downloader', 'Updater', 'updaters']
+__all__ = [
+	'AbstractVersionManager',
+	'AdaptiveLimiter',
+	'BlobStore',
+	'ChecksumMismatchError',
+	'CircuitBreaker',
+	'DownloadError',
+	'Downloader',
+	'DownloadsFailedError',
+	'RetryPolicy',
+	'Updater',
+	'updaters',
+]
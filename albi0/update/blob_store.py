@@ -0,0 +1,125 @@
+import contextlib
+import os
+from pathlib import Path
+import shutil
+import sys
+from typing import Literal
+
+from albi0.log import logger
+from albi0.typing import PathTypes
+
+LinkMode = Literal['hardlink', 'reflink', 'copy']
+
+# linux/fs.h: _IOW(0x94, 9, int)
+_FICLONE = 0x40049409
+
+
+def reflink(source: Path, target: Path) -> None:
+	"""使用FICLONE创建写时复制的副本，仅支持Linux上的btrfs、xfs等文件系统"""
+	if not sys.platform.startswith('linux'):
+		raise OSError('reflink仅支持Linux')
+
+	import fcntl
+
+	with open(source, 'rb') as src, open(target, 'wb') as dst:
+		try:
+			fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+		except OSError:
+			dst.close()
+			target.unlink(missing_ok=True)
+			raise
+
+
+def _is_safe_key(key: str) -> bool:
+	return bool(key) and key.isascii() and key.isalnum()
+
+
+class BlobStore:
+	"""以文件哈希（YooAsset的FileHash）为键的内容寻址存储
+
+	文件保存在 ``<root>/<key[:2]>/<key>``，不同包、不同工作目录甚至回滚后的版本
+	只要哈希相同就共用同一份数据。放置文件时依次尝试link_modes中的方式，
+	默认优先使用硬链接，跨文件系统时尝试reflink，最后回退为复制。
+	"""
+
+	def __init__(
+		self,
+		root: PathTypes,
+		*,
+		link_modes: tuple[LinkMode, ...] = ('hardlink', 'reflink', 'copy'),
+	) -> None:
+		self.root = Path(root)
+		self.link_modes = link_modes
+
+	@staticmethod
+	def key_of(file_hash: bytes) -> str:
+		"""将清单项的file_hash转换为存储键，非字母数字的哈希使用十六进制表示"""
+		with contextlib.suppress(UnicodeDecodeError):
+			if _is_safe_key(key := file_hash.decode()):
+				return key.lower()
+		return file_hash.hex()
+
+	def path_for(self, key: str) -> Path:
+		return self.root / key[:2] / key
+
+	def get(self, key: str, size: int | None = None) -> Path | None:
+		"""获取存储中的文件路径，文件不存在或大小与期望值不一致时返回None"""
+		path = self.path_for(key)
+		try:
+			stat = path.stat()
+		except FileNotFoundError:
+			return None
+		if size is not None and stat.st_size != size:
+			logger.warning(f'存储中的{key}大小与期望值不一致，忽略该文件')
+			return None
+		return path
+
+	def _link(self, source: Path, target: Path, modes: tuple[LinkMode, ...]) -> None:
+		"""依次尝试各种方式在临时路径创建副本，然后原子地替换目标文件"""
+		target.parent.mkdir(parents=True, exist_ok=True)
+		temp = target.with_name(f'{target.name}.blob-tmp')
+		temp.unlink(missing_ok=True)
+		error: OSError | None = None
+		for mode in modes:
+			try:
+				if mode == 'hardlink':
+					os.link(source, temp)
+				elif mode == 'reflink':
+					reflink(source, temp)
+				else:
+					shutil.copyfile(source, temp)
+			except OSError as e:
+				error = e
+				temp.unlink(missing_ok=True)
+				continue
+			os.replace(temp, target)
+			return
+
+		raise error or OSError(f'无法将{source}放置到{target}')
+
+	def place(self, key: str, target: PathTypes, size: int | None = None) -> bool:
+		"""如果存储中存在该文件，则将其放置到target，返回是否放置成功"""
+		if (source := self.get(key, size)) is None:
+			return False
+
+		target = Path(target)
+		with contextlib.suppress(FileNotFoundError):
+			if os.path.samefile(source, target):
+				return True
+
+		try:
+			self._link(source, target, self.link_modes)
+		except OSError as e:
+			logger.warning(f'无法从存储放置{target}：{e!r}')
+			return False
+		return True
+
+	def add(self, key: str, source: PathTypes) -> None:
+		"""将文件加入存储，已存在相同键的文件时不做任何操作"""
+		path = self.path_for(key)
+		if path.exists():
+			return
+		try:
+			self._link(Path(source), path, self.link_modes)
+		except OSError as e:
+			logger.warning(f'无法将{source}加入存储：{e!r}')
@@ -0,0 +1,99 @@
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass, field
+import os
+from pathlib import Path
+
+from albi0.log import logger
+from albi0.typing import PathTypes
+
+from .version import LocalFileName, ManifestItem
+
+
+@dataclass
+class GcResult:
+	"""清理孤立文件的结果，dry_run时为将要删除的文件与目录"""
+
+	files: list[Path] = field(default_factory=list)
+	"""删除的文件"""
+	dirs: list[Path] = field(default_factory=list)
+	"""删除的空目录"""
+	failed: list[Path] = field(default_factory=list)
+	"""无法删除的文件"""
+	freed_bytes: int = 0
+	"""按清单中的文件大小估算的释放空间，大小未知的文件不计入"""
+	stale_entries: list[LocalFileName] = field(default_factory=list)
+	"""清单中已不存在于远程清单的项，包括磁盘上已经不存在的文件"""
+
+
+def _scan_dirs(dirs: Iterable[Path]) -> dict[Path, set[str]]:
+	"""每个目录只调用一次scandir，返回目录中所有条目的名称，不存在的目录返回空集合"""
+	entries: dict[Path, set[str]] = {}
+	for directory in dirs:
+		try:
+			with os.scandir(directory) as it:
+				entries[directory] = {entry.name for entry in it}
+		except FileNotFoundError:
+			entries[directory] = set()
+	return entries
+
+
+def _is_protected(directory: Path, protected: Iterable[Path]) -> bool:
+	"""目录是受保护目录本身或其上级目录时不能删除"""
+	return any(directory == p or directory in p.parents for p in protected)
+
+
+def remove_orphaned_files(
+	orphaned: Mapping[LocalFileName, ManifestItem],
+	*,
+	dry_run: bool = False,
+	remove_empty_dirs: bool = True,
+	protected_dirs: Iterable[PathTypes] = (),
+) -> GcResult:
+	"""删除已不在远程清单中的文件
+
+	孤立文件所在的每个目录只扫描一次，不对每个文件单独调用stat。
+
+	Args:
+		orphaned: 需要删除的清单项，通常为清单比对结果中的removed
+		dry_run: 为True时只返回将要删除的文件与目录，不做任何修改
+		remove_empty_dirs: 是否删除因此变为空的目录（向上逐级删除）
+		protected_dirs: 不会被删除的目录，其上级目录也不会被删除，
+			通常为本地清单所在的目录
+	"""
+	result = GcResult(stale_entries=list(orphaned))
+	by_dir: dict[Path, dict[str, ManifestItem]] = {}
+	for local_fn, item in orphaned.items():
+		path = Path(local_fn).absolute()
+		by_dir.setdefault(path.parent, {})[path.name] = item
+
+	protected = [Path(p).absolute() for p in protected_dirs]
+	for directory, names in _scan_dirs(by_dir).items():
+		items = by_dir[directory]
+		for name in sorted(items.keys() & names):
+			path = directory / name
+			if not dry_run:
+				try:
+					path.unlink()
+				except OSError as e:
+					logger.warning(f'无法删除{path}：{e!r}')
+					result.failed.append(path)
+					continue
+			result.files.append(path)
+			result.freed_bytes += items[name].file_size or 0
+
+		if not remove_empty_dirs or not names or names - items.keys():
+			continue
+		if dry_run:
+			# 不删除时无法得知上级目录是否会变为空，只报告当前目录
+			if not _is_protected(directory, protected):
+				result.dirs.append(directory)
+			continue
+		# 目录中只有孤立文件，删除后向上逐级删除空目录
+		while not _is_protected(directory, protected) and directory.parent != directory:
+			try:
+				directory.rmdir()
+			except OSError:
+				break
+			result.dirs.append(directory)
+			directory = directory.parent
+	return result
@@ -0,0 +1,90 @@
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass, field
+import fnmatch
+import os
+import re
+
+from .version import LocalFileName, ManifestItem
+
+ItemMap = Mapping[LocalFileName, ManifestItem]
+
+
+def compile_patterns(patterns: Iterable[str]) -> Callable[[str], bool] | None:
+	"""将多个glob模式编译为一个正则表达式，语义与逐个调用fnmatch.fnmatch相同
+
+	Returns:
+		判断名称是否匹配任意模式的函数，patterns为空时返回None
+	"""
+	patterns = [os.path.normcase(p) for p in patterns]
+	if not patterns:
+		return None
+
+	regex = re.compile('|'.join(f'(?:{fnmatch.translate(p)})' for p in patterns))
+	match = regex.match
+	if os.path.normcase('A/') == 'A/':
+		# POSIX下normcase不做任何处理，省去每次调用的开销
+		return lambda name: match(name) is not None
+
+	normcase = os.path.normcase
+	return lambda name: match(normcase(name)) is not None
+
+
+@dataclass
+class ManifestDiff:
+	"""远程清单与本地清单的差异"""
+
+	added: dict[LocalFileName, ManifestItem] = field(default_factory=dict)
+	"""仅存在于远程清单的项"""
+	changed: dict[LocalFileName, ManifestItem] = field(default_factory=dict)
+	"""两边都存在但文件哈希不同的项，值为远程清单项"""
+	removed: dict[LocalFileName, ManifestItem] = field(default_factory=dict)
+	"""仅存在于本地清单的项，值为本地清单项"""
+	updated: dict[LocalFileName, ManifestItem] = field(default_factory=dict)
+	"""需要下载的项（added与changed的并集），保持远程清单中的顺序"""
+
+	def __bool__(self) -> bool:
+		return bool(self.updated or self.removed)
+
+
+def diff_manifest_items(
+	remote_items: ItemMap, local_items: ItemMap, patterns: Iterable[str] = ()
+) -> ManifestDiff:
+	"""一次遍历得到两个清单之间新增、变化与删除的项
+
+	两边的清单项以本地文件名为键索引，patterns只编译一次，
+	按照清单项的local_basename过滤，为空时比较所有项。
+	"""
+	match = compile_patterns(patterns)
+	diff = ManifestDiff()
+	# 清单没有变化是最常见的情况，dict的比较在C中完成，项数不同时立即返回
+	if match is None and remote_items == local_items:
+		return diff
+
+	added, changed, updated = diff.added, diff.changed, diff.updated
+	local_get = local_items.get
+	remote_iter = (
+		remote_items.items()
+		if match is None
+		else ((k, v) for k, v in remote_items.items() if match(v.local_basename))
+	)
+	for local_fn, item in remote_iter:
+		local_item = local_get(local_fn)
+		if local_item is None:
+			added[local_fn] = updated[local_fn] = item
+		elif local_item.file_hash != item.file_hash:
+			changed[local_fn] = updated[local_fn] = item
+
+	# 没有模式时，本地清单的项数等于两边共有的项数就说明没有删除的项，
+	# 省去一次集合运算
+	if match is None and len(local_items) <= len(remote_items) - len(added):
+		return diff
+
+	if removed_keys := local_items.keys() - remote_items.keys():
+		# 再遍历一次本地清单，使结果保持本地清单中的顺序
+		diff.removed.update(
+			(local_fn, local_item)
+			for local_fn, local_item in local_items.items()
+			if local_fn in removed_keys
+			and (match is None or match(local_item.local_basename))
+		)
+	return diff
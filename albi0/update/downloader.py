@@ -1,65 +1,560 @@
+from collections.abc import Callable, Mapping
+from contextlib import nullcontext, suppress
+from dataclasses import dataclass
+import functools
+import hashlib
+import itertools
+import os
 from pathlib import Path
-from typing import TYPE_CHECKING, ClassVar, Literal, NamedTuple
+import sys
+from typing import TYPE_CHECKING, Literal, NamedTuple
+import zlib
 
 import aiofiles
 import anyio
-from httpx import URL
+from dataclasses_json import DataClassJsonMixin
+from httpx import URL, codes
 from tqdm.asyncio import tqdm
 
-from ..request import client as default_client
+from .. import request
+from ..log import logger
 from ..typing import DownloadPostProcessMethod
-from ..utils import Hash
+from .limiter import AdaptiveLimiter, Limiter, get_bandwidth_limiter
+from .retry import CircuitBreaker, RetryPolicy
+
+if sys.version_info < (3, 11):
+	from exceptiongroup import BaseExceptionGroup
 
 if TYPE_CHECKING:
 	from httpx import AsyncClient, Response
 	from httpx._types import URLTypes
 
+DEFAULT_CHUNK_SIZE = 64 * 1024
+DEFAULT_SEGMENT_SIZE = 8 * 1024 * 1024
+TEMP_SUFFIX = '.part'
+STATE_SUFFIX = '.json'
+
+
+class DownloadError(Exception):
+	"""下载失败"""
+
+
+class ChecksumMismatchError(DownloadError):
+	"""下载内容的校验值与期望值不一致"""
+
+
+class FileSizeMismatchError(ChecksumMismatchError):
+	"""下载内容的大小与期望值不一致"""
+
+
+class RangeNotSupportedError(DownloadError):
+	"""服务器没有按照Range请求返回部分内容"""
+
+
+def _unwrap_segment_error(group: BaseExceptionGroup) -> BaseException:
+	"""从分段下载任务组的异常中取出要抛出的异常
+
+	任一分段不支持Range时返回该异常以回退为单连接下载，否则返回第一个异常，
+	使重试策略可以根据具体的异常类型判断是否重试。
+	"""
+	_, rest = group.split(Exception)
+	if rest is not None:
+		# 包含取消等非Exception异常时原样抛出
+		return group
+	leaves: list[BaseException] = []
+	pending: list[BaseException] = [group]
+	while pending:
+		exc = pending.pop(0)
+		if isinstance(exc, BaseExceptionGroup):
+			pending[:0] = exc.exceptions
+		else:
+			leaves.append(exc)
+	for exc in leaves:
+		if isinstance(exc, RangeNotSupportedError):
+			return exc
+	return leaves[0]
+
+
+class DownloadsFailedError(DownloadError):
+	"""批量下载中有文件在重试后仍然失败"""
+
+	def __init__(self, failures: dict[Path, Exception]) -> None:
+		self.failures = failures
+		super().__init__(f'{len(failures)}个文件下载失败')
+
 
 class DownloadParams(NamedTuple):
 	url: 'URLTypes'
 	filename: Path
 	method: Literal['GET', 'POST'] = 'GET'
 	md5: str | None = None
+	size: int | None = None
+	crc32: int | None = None
 
 
-class Downloader:
-	_global_client: ClassVar['AsyncClient'] = default_client
+class StreamDigest:
+	"""边下载边计算的文件摘要，包括大小、md5与crc32"""
+
+	def __init__(self) -> None:
+		self.size = 0
+		self.crc32 = 0
+		self._md5 = hashlib.md5()
+
+	def update(self, chunk: bytes) -> None:
+		self.size += len(chunk)
+		self.crc32 = zlib.crc32(chunk, self.crc32)
+		self._md5.update(chunk)
+
+	@property
+	def md5(self) -> str:
+		return self._md5.hexdigest()
+
+	def verify(
+		self,
+		filename: Path,
+		*,
+		md5: str | None = None,
+		size: int | None = None,
+		crc32: int | None = None,
+	) -> None:
+		"""校验摘要，为None的期望值不参与校验
+
+		Raises:
+			FileSizeMismatchError: 文件大小不一致
+			ChecksumMismatchError: crc32或md5不一致
+		"""
+		if size is not None and self.size != size:
+			raise FileSizeMismatchError(
+				f'{filename}的大小校验失败，期望值：{size}，实际值：{self.size}'
+			)
+		if crc32 is not None and self.crc32 != crc32:
+			raise ChecksumMismatchError(
+				f'{filename}的crc32校验失败，期望值：{crc32}，实际值：{self.crc32}'
+			)
+		if md5 is not None and self.md5 != md5:
+			raise ChecksumMismatchError(
+				f'{filename}的md5校验失败，期望值：{md5}，实际值：{self.md5}'
+			)
+
+
+@dataclass
+class PartialDownloadState(DataClassJsonMixin):
+	"""未完成下载的状态，保存在临时文件旁，用于断点续传"""
+
+	url: str
+	total_size: int | None
+	validator: str
+	"""用于If-Range请求头的校验值，强ETag或Last-Modified"""
 
-	def __init__(self, client: 'AsyncClient | None' = None, limit: int = 10):
-		self._client = client or self._global_client
+
+def get_temp_filename(filename: Path) -> Path:
+	"""获取下载过程中使用的临时文件路径，与目标文件位于同一目录以保证重命名的原子性"""
+	return filename.with_name(f'{filename.name}{TEMP_SUFFIX}')
+
+
+def get_state_filename(temp_filename: Path) -> Path:
+	"""获取临时文件对应的续传状态文件路径"""
+	return temp_filename.with_name(f'{temp_filename.name}{STATE_SUFFIX}')
+
+
+def load_partial_state(
+	temp_filename: Path, url: str
+) -> tuple[PartialDownloadState, int] | None:
+	"""加载可用于续传的状态及已下载的字节数
+
+	状态不存在、已损坏或与当前下载不匹配时返回None。
+	"""
+	state_filename = get_state_filename(temp_filename)
+	if not temp_filename.is_file() or not state_filename.is_file():
+		return None
+
+	try:
+		state = PartialDownloadState.from_json(state_filename.read_bytes())
+	except (ValueError, KeyError, TypeError):
+		return None
+
+	size = temp_filename.stat().st_size
+	if state.url != url or (state.total_size is not None and size > state.total_size):
+		return None
+
+	return state, size
+
+
+def discard_partial(temp_filename: Path) -> None:
+	"""删除临时文件及其续传状态"""
+	temp_filename.unlink(missing_ok=True)
+	get_state_filename(temp_filename).unlink(missing_ok=True)
+
+
+def get_validator(res: 'Response') -> str | None:
+	"""获取响应中可用于If-Range的校验值，弱ETag不能用于If-Range"""
+	etag = res.headers.get('etag')
+	if etag and not etag.startswith('W/'):
+		return etag
+	return res.headers.get('last-modified')
+
+
+def get_content_range_start(res: 'Response') -> int | None:
+	"""解析Content-Range响应头的起始位置"""
+	content_range = res.headers.get('content-range', '')
+	unit, _, range_ = content_range.partition(' ')
+	start, sep, _ = range_.partition('-')
+	if unit != 'bytes' or not sep or not start.isdigit():
+		return None
+	return int(start)
+
+
+async def _throttle(num_bytes: int) -> None:
+	"""按照全局带宽限制等待"""
+	if (bandwidth_limiter := get_bandwidth_limiter()) is not None:
+		await bandwidth_limiter.consume(num_bytes)
+
+
+def _record_response(semaphore: Limiter, ttfb: float) -> None:
+	if isinstance(semaphore, AdaptiveLimiter):
+		semaphore.record_response(ttfb)
+
+
+def _record_success(semaphore: Limiter, num_bytes: int) -> None:
+	if isinstance(semaphore, AdaptiveLimiter):
+		semaphore.record_success(num_bytes)
+
+
+def _record_failure(semaphore: Limiter) -> None:
+	if isinstance(semaphore, AdaptiveLimiter):
+		semaphore.record_failure()
+
+
+class Downloader:
+	def __init__(
+		self,
+		client: 'AsyncClient | None' = None,
+		limit: int = 10,
+		*,
+		chunk_size: int = DEFAULT_CHUNK_SIZE,
+		segment_threshold: int | None = None,
+		segment_size: int = DEFAULT_SEGMENT_SIZE,
+		checksum_retries: int = 2,
+		retry_policy: RetryPolicy | None = None,
+		circuit_breaker: CircuitBreaker | None = None,
+		headers: Mapping[str, str] | None = None,
+	):
+		"""
+		Args:
+			client: httpx客户端，默认使用albi0.request中共享连接池的客户端
+			limit: 默认的并发限制
+			chunk_size: 流式读取响应时每个块的大小
+			segment_threshold: 大于等于该大小的文件将被拆分为多个分段并发下载，
+				为None时不启用分段下载
+			segment_size: 分段下载时每个分段的大小
+			checksum_retries: 校验失败后立即重新下载的最大次数
+			retry_policy: 网络错误与可重试状态码的重试策略，默认使用RetryPolicy()
+			circuit_breaker: 按主机熔断的熔断器，默认每个下载器使用独立的熔断器
+			headers: 每个请求附带的请求头，会覆盖客户端的同名请求头
+		"""
+		self._client = client
+		self.headers = dict(headers or {})
 		self._semaphore = anyio.Semaphore(limit)
+		self.chunk_size = chunk_size
+		self.segment_threshold = segment_threshold
+		self.segment_size = segment_size
+		self.checksum_retries = checksum_retries
+		self.retry_policy = retry_policy or RetryPolicy()
+		self.circuit_breaker = circuit_breaker or CircuitBreaker()
 
-	async def _get_data(
+	@property
+	def client(self) -> 'AsyncClient':
+		return self._client or request.get_client()
+
+	async def _hash_file(self, filename: Path, digest: StreamDigest) -> None:
+		async with aiofiles.open(filename, mode='rb') as f:
+			while chunk := await f.read(self.chunk_size):
+				digest.update(chunk)
+
+	async def _stream_to_file(
 		self,
 		url: 'URLTypes',
+		filename: Path,
 		*,
 		method: Literal['GET', 'POST'] = 'GET',
-		md5: str | None = None,
-	) -> bytes:
+		size: int | None = None,
+		semaphore: Limiter,
+	) -> StreamDigest:
+		"""以流的方式将响应写入文件，边写入边计算摘要
+
+		如果存在与当前下载匹配的未完成文件，会使用Range请求从断点处继续下载，
+		服务器忽略Range请求时从头下载。
+		指定size时，响应的Content-Length与期望值不一致，或者写入的数据超出期望值，
+		会立即抛出FileSizeMismatchError，无需等待下载完成。
+		"""
 		url = URL(str(url))
-		async with self._client.stream(method, url, timeout=None) as res:
-			res: 'Response'
-			res.raise_for_status()
-
-			data = b''
-			with tqdm(
-				total=int(res.headers['content-length']),
-				unit_scale=True,
-				unit_divisor=1024,
-				unit='B',
-				desc=f'{url.path.split("/")[-1]}下载中',
-				leave=False,
-			) as progress_bar:
-				num_bytes_downloaded = res.num_bytes_downloaded
-				async for chunk in res.aiter_bytes():
-					data += chunk
+		state_filename = get_state_filename(filename)
+		digest = StreamDigest()
+		# 断点超出远程文件大小（416）时丢弃临时文件，第二次循环从头下载
+		for _ in range(2):
+			offset = 0
+			headers = dict(self.headers)
+			if method == 'GET' and (partial := load_partial_state(filename, str(url))):
+				state, offset = partial
+				headers |= {'range': f'bytes={offset}-', 'if-range': state.validator}
+			else:
+				discard_partial(filename)
+
+			async with semaphore:
+				start_time = anyio.current_time()
+				async with self.client.stream(method, url, headers=headers) as res:
+					res: 'Response'
+					if (
+						offset
+						and res.status_code == codes.REQUESTED_RANGE_NOT_SATISFIABLE
+					):
+						discard_partial(filename)
+						continue
+
+					res.raise_for_status()
+					_record_response(semaphore, anyio.current_time() - start_time)
+					await self._write_response(
+						res,
+						filename,
+						digest,
+						offset=offset,
+						size=size,
+						save_state=method == 'GET',
+					)
+					_record_success(semaphore, res.num_bytes_downloaded)
+					break
+
+		state_filename.unlink(missing_ok=True)
+		return digest
+
+	async def _write_response(
+		self,
+		res: 'Response',
+		filename: Path,
+		digest: StreamDigest,
+		*,
+		offset: int,
+		size: int | None,
+		save_state: bool,
+	) -> None:
+		"""将响应写入文件，offset不为0且响应为对应的部分内容时追加写入"""
+		url = res.url
+		if (
+			offset
+			and res.status_code == codes.PARTIAL_CONTENT
+			and get_content_range_start(res) == offset
+		):
+			await self._hash_file(filename, digest)
+			mode = 'ab'
+		else:
+			offset = 0
+			mode = 'wb'
+
+		content_length = res.headers.get('content-length')
+		total = offset + int(content_length) if content_length is not None else None
+		if size is not None and total is not None and total != size:
+			raise FileSizeMismatchError(
+				f'{url}的大小与期望值不一致，期望值：{size}，实际值：{total}'
+			)
+		if (validator := get_validator(res)) and save_state:
+			get_state_filename(filename).write_text(
+				PartialDownloadState(str(url), total, validator).to_json()
+			)
+
+		with tqdm(
+			total=total,
+			initial=offset,
+			unit_scale=True,
+			unit_divisor=1024,
+			unit='B',
+			desc=f'{url.path.split("/")[-1]}下载中',
+			leave=False,
+		) as progress_bar:
+			num_bytes_downloaded = res.num_bytes_downloaded
+			async with aiofiles.open(filename, mode=mode) as f:
+				async for chunk in res.aiter_bytes(self.chunk_size):
+					await _throttle(len(chunk))
+					digest.update(chunk)
+					if size is not None and digest.size > size:
+						raise FileSizeMismatchError(f'{url}的大小超出期望值：{size}')
+					await f.write(chunk)
 					progress_bar.update(res.num_bytes_downloaded - num_bytes_downloaded)
 					num_bytes_downloaded = res.num_bytes_downloaded
 
-		if md5 is not None and Hash(data).md5() != md5:
-			raise
+	async def _probe_segmented_size(self, url: 'URLTypes') -> int | None:
+		"""使用HEAD请求获取文件大小，文件不满足分段下载条件时返回None"""
+		assert self.segment_threshold is not None
+		res = await self.client.head(url, headers=self.headers)
+		res.raise_for_status()
+		content_length = res.headers.get('content-length')
+		if (
+			res.headers.get('accept-ranges', '').lower() != 'bytes'
+			or content_length is None
+			or int(content_length) < self.segment_threshold
+		):
+			return None
+
+		return int(content_length)
+
+	async def _fetch_segment(
+		self,
+		url: URL,
+		filename: Path,
+		start: int,
+		end: int,
+		*,
+		semaphore: Limiter,
+		progress_bar: tqdm,
+	) -> None:
+		"""下载[start, end]范围内的字节，并写入文件的对应位置"""
+		expected = end - start + 1
+		written = 0
+		async with semaphore:
+			start_time = anyio.current_time()
+			async with self.client.stream(
+				'GET', url, headers={**self.headers, 'range': f'bytes={start}-{end}'}
+			) as res:
+				res.raise_for_status()
+				if (
+					res.status_code != codes.PARTIAL_CONTENT
+					or get_content_range_start(res) != start
+				):
+					raise RangeNotSupportedError(f'{url}不支持Range请求')
+
+				_record_response(semaphore, anyio.current_time() - start_time)
+				async with aiofiles.open(filename, mode='r+b') as f:
+					await f.seek(start)
+					async for chunk in res.aiter_bytes(self.chunk_size):
+						await _throttle(len(chunk))
+						written += len(chunk)
+						if written > expected:
+							break
+						await f.write(chunk)
+						progress_bar.update(len(chunk))
+				_record_success(semaphore, written)
+
+		if written != expected:
+			raise DownloadError(
+				f'{url}的分段{start}-{end}大小错误，期望值：{expected}，实际值：{written}'
+			)
+
+	async def _download_segmented(
+		self,
+		url: 'URLTypes',
+		filename: Path,
+		size: int,
+		*,
+		semaphore: Limiter,
+	) -> StreamDigest:
+		"""将文件拆分为多个分段并发下载到预分配的文件中，返回整个文件的摘要"""
+		url = URL(str(url))
+		discard_partial(filename)
+		async with aiofiles.open(filename, mode='wb') as f:
+			await f.truncate(size)
 
-		return data
+		with tqdm(
+			total=size,
+			unit_scale=True,
+			unit_divisor=1024,
+			unit='B',
+			desc=f'{url.path.split("/")[-1]}分段下载中',
+			leave=False,
+		) as progress_bar:
+			try:
+				async with anyio.create_task_group() as tg:
+					for start in range(0, size, self.segment_size):
+						end = min(start + self.segment_size, size) - 1
+						tg.start_soon(
+							functools.partial(
+								self._fetch_segment,
+								url,
+								filename,
+								start,
+								end,
+								semaphore=semaphore,
+								progress_bar=progress_bar,
+							)
+						)
+			except BaseExceptionGroup as group:
+				error = _unwrap_segment_error(group)
+				if error is group:
+					raise
+				raise error from None
+
+		digest = StreamDigest()
+		await self._hash_file(filename, digest)
+		return digest
+
+	async def _fetch(
+		self,
+		url: 'URLTypes',
+		temp_filename: Path,
+		*,
+		method: Literal['GET', 'POST'],
+		size: int | None,
+		semaphore: Limiter,
+	) -> StreamDigest:
+		"""将文件下载到临时文件，按条件选择分段下载或单连接下载"""
+		if (
+			self.segment_threshold is not None
+			and method == 'GET'
+			and load_partial_state(temp_filename, str(url)) is None
+		):
+			# 已知文件大小时省去HEAD请求，由分段请求的响应判断是否支持Range
+			if size is None:
+				async with semaphore:
+					segmented_size = await self._probe_segmented_size(url)
+			else:
+				segmented_size = size if size >= self.segment_threshold else None
+
+			if segmented_size is not None:
+				with suppress(RangeNotSupportedError):
+					return await self._download_segmented(
+						url, temp_filename, segmented_size, semaphore=semaphore
+					)
+
+		return await self._stream_to_file(
+			url, temp_filename, method=method, size=size, semaphore=semaphore
+		)
+
+	async def _fetch_with_retry(
+		self,
+		url: 'URLTypes',
+		temp_filename: Path,
+		*,
+		method: Literal['GET', 'POST'],
+		size: int | None,
+		semaphore: Limiter,
+		retry_policy: RetryPolicy,
+	) -> StreamDigest:
+		"""按照重试策略下载文件，熔断打开时等待熔断关闭后再发出请求
+
+		重试等待期间不占用并发名额，网络中断时保留的临时文件会在重试时续传。
+		"""
+		host = URL(str(url)).host
+		for attempt in itertools.count(1):
+			await self.circuit_breaker.wait(host)
+			try:
+				digest = await self._fetch(
+					url, temp_filename, method=method, size=size, semaphore=semaphore
+				)
+			except Exception as e:
+				if not retry_policy.is_retryable(e):
+					raise
+				self.circuit_breaker.record_failure(host)
+				_record_failure(semaphore)
+				if attempt >= retry_policy.max_attempts:
+					raise
+				delay = retry_policy.get_delay(attempt, e)
+				logger.warning(
+					f'{url}下载失败：{e!r}，{delay:.1f}秒后重试（第{attempt}次重试）'
+				)
+				await anyio.sleep(delay)
+			else:
+				self.circuit_breaker.record_success(host)
+				return digest
+
+		raise AssertionError('unreachable')
 
 	async def download(
 		self,
@@ -68,47 +563,127 @@ class Downloader:
 		*,
 		method: Literal['GET', 'POST'] = 'GET',
 		md5: str | None = None,
+		size: int | None = None,
+		crc32: int | None = None,
 		postprocess_handler: DownloadPostProcessMethod | None = None,
-		semaphore: anyio.Semaphore | None = None,
+		semaphore: Limiter | None = None,
+		retry_policy: RetryPolicy | None = None,
 	):
-		async with semaphore or self._semaphore:
-			data = await self._get_data(url, method=method, md5=md5)
+		"""下载文件
+
+		数据以流的方式写入目标文件旁的临时文件，下载完成并校验通过后原子地重命名为目标文件，
+		因此单个下载的内存占用只与chunk_size相关。
+		指定postprocess_handler时，需要在下载完成后将整个文件读入内存进行处理。
+
+		下载中断时会保留临时文件及其续传状态（URL、文件大小与校验值），
+		再次下载同一文件时从断点处继续。
+
+		启用分段下载时，大于等于segment_threshold的文件会拆分为多个Range请求，
+		每个分段各自占用一个并发名额，服务器不支持Range请求时回退为单连接下载。
+
+		md5、size与crc32会在下载过程中增量校验，无需重新读取文件，
+		校验失败时丢弃临时文件并立即重新下载，最多重试checksum_retries次。
+
+		网络错误与可重试的状态码按照retry_policy退避重试，未指定时使用下载器的策略。
+		"""
+		semaphore = semaphore or self._semaphore
+		retry_policy = retry_policy or self.retry_policy
+		filename.parent.mkdir(parents=True, exist_ok=True)
+		temp_filename = get_temp_filename(filename)
+		try:
+			for attempt in itertools.count(1):
+				try:
+					digest = await self._fetch_with_retry(
+						url,
+						temp_filename,
+						method=method,
+						size=size,
+						semaphore=semaphore,
+						retry_policy=retry_policy,
+					)
+					digest.verify(filename, md5=md5, size=size, crc32=crc32)
+					break
+				except ChecksumMismatchError as e:
+					discard_partial(temp_filename)
+					if attempt > self.checksum_retries:
+						raise
+					logger.warning(f'{e}，重新下载（第{attempt}次重试）')
+
 			if postprocess_handler is not None:
-				data = postprocess_handler(data)
+				async with aiofiles.open(temp_filename, mode='rb') as f:
+					data = postprocess_handler(await f.read())
+				async with aiofiles.open(temp_filename, mode='wb') as f:
+					await f.write(data)
 
-			filename.parent.mkdir(parents=True, exist_ok=True)
-			async with aiofiles.open(filename, mode='wb') as f:
-				await f.write(data)
+			os.replace(temp_filename, filename)
+		except ChecksumMismatchError:
+			discard_partial(temp_filename)
+			raise
+		except BaseException:
+			# 没有续传状态的临时文件无法续传，直接删除
+			if not get_state_filename(temp_filename).is_file():
+				temp_filename.unlink(missing_ok=True)
+			raise
 
 	async def downloads(
 		self,
 		*params: DownloadParams,
-		semaphore: anyio.Semaphore | None = None,
+		semaphore: Limiter | None = None,
 		progress_bar: tqdm | None = None,
 		postprocess_handler: DownloadPostProcessMethod | None = None,
+		retry_policy: RetryPolicy | None = None,
+		on_complete: Callable[[DownloadParams], None] | None = None,
 	) -> None:
+		"""并发下载多个文件
+
+		单个文件在重试后仍然失败时不会取消其他下载，所有下载结束后抛出
+		DownloadsFailedError，其failures属性记录了失败的文件与对应的异常。
+
+		传入progress_bar时，文件数会累加到进度条的总数上，进度条由调用方关闭。
+		on_complete会在每个文件下载、校验并移动到目标路径后立即调用。
+		semaphore可以是anyio.Semaphore或AdaptiveLimiter，
+		使用AdaptiveLimiter时，进度条会显示当前的并发上限。
+		"""
+		semaphore = semaphore or self._semaphore
 		total = len(params)
 		# 这里不能使用 or 表达式，因为 tqdm 的 total 属性还没有设置，
 		# 此时调用 __bool__ 会报错
-		pbar = (
-			tqdm(total=total, desc='下载中', unit='file')
-			if progress_bar is None
-			else progress_bar
-		)
-		pbar.total = total
-		with pbar:
+		if progress_bar is None:
+			pbar = tqdm(total=total, desc='下载中', unit='file')
+		else:
+			# 传入的进度条可能由多个更新器共用，累加总数且不在这里关闭
+			pbar = progress_bar
+			pbar.total = (pbar.total or 0) + total
+			pbar.refresh()
+		with pbar if progress_bar is None else nullcontext():
+			failures: dict[Path, Exception] = {}
 
 			async def _handle(p: DownloadParams):
-				await self.download(
-					p.url,
-					p.filename,
-					method=p.method,
-					md5=p.md5,
-					postprocess_handler=postprocess_handler,
-					semaphore=semaphore,
-				)
+				try:
+					await self.download(
+						p.url,
+						p.filename,
+						method=p.method,
+						md5=p.md5,
+						size=p.size,
+						crc32=p.crc32,
+						postprocess_handler=postprocess_handler,
+						semaphore=semaphore,
+						retry_policy=retry_policy,
+					)
+				except Exception as e:
+					logger.error(f'{p.filename}下载失败：{e!r}')
+					failures[p.filename] = e
+					return
+				if on_complete is not None:
+					on_complete(p)
+				if isinstance(semaphore, AdaptiveLimiter):
+					pbar.set_postfix_str(f'并发上限: {semaphore.limit}', refresh=False)
 				pbar.update()
 
 			async with anyio.create_task_group() as tg:
 				for param in params:
 					tg.start_soon(_handle, param)
+
+		if failures:
+			raise DownloadsFailedError(failures)
@@ -0,0 +1,94 @@
+from pathlib import Path
+from typing import IO
+
+import orjson
+
+from albi0.log import logger
+from albi0.typing import PathTypes
+
+from .version import (
+	LocalFileName,
+	ManifestItem,
+	manifest_item_from_row,
+	manifest_item_to_row,
+)
+
+
+class ManifestJournal:
+	"""只追加的清单日志
+
+	每个文件下载并校验完成后立即追加一行记录，进程意外退出时已完成的文件不会丢失，
+	下次运行时先将日志合并到本地清单再比对远程清单，从中断的位置继续更新。
+	下载期间可以调用rotate()将已有的记录移动到rotated_path，在其他线程中合并，
+	新的记录继续写入path。
+	"""
+
+	def __init__(self, path: PathTypes) -> None:
+		self.path = Path(path)
+		self.rotated_path = self.path.with_name(f'{self.path.name}.old')
+		self.count = 0
+		"""自上次清空或轮换以来追加的记录数"""
+		self._file: IO[bytes] | None = None
+
+	def exists(self) -> bool:
+		return self.path.is_file() or self.rotated_path.is_file()
+
+	def _read(self, path: Path) -> dict[LocalFileName, ManifestItem]:
+		items: dict[LocalFileName, ManifestItem] = {}
+		try:
+			data = path.read_bytes()
+		except FileNotFoundError:
+			return items
+
+		for line in data.splitlines():
+			try:
+				local_fn, item = manifest_item_from_row(orjson.loads(line))
+			except (orjson.JSONDecodeError, TypeError, ValueError) as e:
+				logger.warning(f'忽略清单日志{path}中无法解析的记录：{e!r}')
+				continue
+			items[local_fn] = item
+		return items
+
+	def replay(self) -> dict[LocalFileName, ManifestItem]:
+		"""读取日志中的全部记录（包括已轮换的记录），忽略写入到一半的最后一行"""
+		return {**self._read(self.rotated_path), **self._read(self.path)}
+
+	def replay_rotated(self) -> dict[LocalFileName, ManifestItem]:
+		"""只读取已轮换的记录"""
+		return self._read(self.rotated_path)
+
+	def rotate(self) -> bool:
+		"""将当前的记录移动到rotated_path，返回是否移动
+
+		上次轮换的记录还未合并（rotated_path仍存在）或没有记录时不移动
+		"""
+		if self.rotated_path.exists() or not self.path.exists():
+			return False
+		self.close()
+		self.path.replace(self.rotated_path)
+		self.count = 0
+		return True
+
+	def clear_rotated(self) -> None:
+		"""删除已轮换的记录，应在这些记录已经保存到本地清单后调用"""
+		self.rotated_path.unlink(missing_ok=True)
+
+	def append(self, local_fn: str, item: ManifestItem) -> None:
+		if self._file is None:
+			self.path.parent.mkdir(parents=True, exist_ok=True)
+			self._file = self.path.open('ab')
+		self._file.write(orjson.dumps(manifest_item_to_row(local_fn, item)) + b'\n')
+		self._file.flush()
+		self.count += 1
+
+	def clear(self) -> None:
+		"""清空日志，应在日志中的记录已经保存到本地清单后调用"""
+		self.close()
+		self.path.unlink(missing_ok=True)
+		self.clear_rotated()
+		self.count = 0
+
+	def close(self) -> None:
+		if self._file is not None:
+			self._file.close()
+			self._file = None
@@ -0,0 +1,217 @@
+from collections import deque
+import statistics
+from typing import TypeAlias
+
+import anyio
+import anyio.lowlevel
+
+
+class AdaptiveLimiter:
+	"""自适应并发限制器，可以代替anyio.Semaphore传给Downloader
+
+	使用AIMD（加性增、乘性减）调整并发上限：
+	每完成一个窗口（数量等于当前上限）的请求后统计吞吐量与首字节时间（TTFB），
+	吞吐量没有下降且TTFB没有明显上升时上限加一；
+	请求失败或TTFB超过基线的latency_tolerance倍时上限乘以decrease_factor，
+	每个窗口最多下降一次，避免一次失败潮把上限降到最低。
+	"""
+
+	def __init__(
+		self,
+		initial_limit: int = 10,
+		*,
+		min_limit: int = 1,
+		max_limit: int = 64,
+		decrease_factor: float = 0.7,
+		latency_tolerance: float = 2.0,
+		throughput_tolerance: float = 0.1,
+	) -> None:
+		"""
+		Args:
+			initial_limit: 初始并发上限
+			min_limit: 并发上限的最小值
+			max_limit: 并发上限的最大值
+			decrease_factor: 乘性减的系数
+			latency_tolerance: TTFB超过基线的倍数后下调上限
+			throughput_tolerance: 吞吐量相对上一窗口下降超过该比例时不再上调上限
+		"""
+		if not min_limit <= initial_limit <= max_limit:
+			raise ValueError('必须满足 min_limit <= initial_limit <= max_limit')
+
+		self.min_limit = min_limit
+		self.max_limit = max_limit
+		self.decrease_factor = decrease_factor
+		self.latency_tolerance = latency_tolerance
+		self.throughput_tolerance = throughput_tolerance
+
+		self._limit = float(initial_limit)
+		self._in_flight = 0
+		self._waiters: deque[anyio.Event] = deque()
+
+		self._ttfb_baseline: float | None = None
+		self._last_throughput: float | None = None
+		self._window_start: float | None = None
+		self._window_bytes = 0
+		self._window_completed = 0
+		self._window_ttfbs: list[float] = []
+		self._window_failures = 0
+		self._decreased_in_window = False
+
+	@property
+	def limit(self) -> int:
+		"""当前的并发上限"""
+		return int(self._limit)
+
+	@property
+	def in_flight(self) -> int:
+		return self._in_flight
+
+	async def acquire(self) -> None:
+		# 与anyio.Semaphore相同：先检查取消再占用名额，之后的检查点不会被取消
+		await anyio.lowlevel.checkpoint_if_cancelled()
+		if self._in_flight < self.limit and not self._waiters:
+			self._in_flight += 1
+			await anyio.lowlevel.cancel_shielded_checkpoint()
+			return
+
+		event = anyio.Event()
+		self._waiters.append(event)
+		try:
+			await event.wait()
+		except BaseException:
+			if event.is_set():
+				# 名额已经交给当前任务，取消时需要归还
+				self.release()
+			else:
+				self._waiters.remove(event)
+			raise
+
+	def release(self) -> None:
+		self._in_flight -= 1
+		self._wake_waiters()
+
+	def _wake_waiters(self) -> None:
+		while self._waiters and self._in_flight < self.limit:
+			self._in_flight += 1
+			self._waiters.popleft().set()
+
+	async def __aenter__(self) -> None:
+		await self.acquire()
+
+	async def __aexit__(self, *args) -> None:
+		self.release()
+
+	def _set_limit(self, limit: float) -> None:
+		self._limit = min(float(self.max_limit), max(float(self.min_limit), limit))
+		self._wake_waiters()
+
+	def _decrease(self) -> None:
+		if not self._decreased_in_window:
+			self._decreased_in_window = True
+			self._set_limit(self._limit * self.decrease_factor)
+
+	def record_response(self, ttfb: float) -> None:
+		"""记录一次请求的首字节时间"""
+		if self._window_start is None:
+			self._window_start = anyio.current_time() - ttfb
+		self._window_ttfbs.append(ttfb)
+		if self._ttfb_baseline is None or ttfb < self._ttfb_baseline:
+			self._ttfb_baseline = ttfb
+		else:
+			# 基线缓慢跟随，避免网络环境变化后一直使用过低的基线
+			self._ttfb_baseline += (ttfb - self._ttfb_baseline) * 0.01
+
+		if ttfb > self._ttfb_baseline * self.latency_tolerance and len(
+			self._window_ttfbs
+		) >= max(2, self.limit // 2):
+			median = statistics.median(self._window_ttfbs)
+			if median > self._ttfb_baseline * self.latency_tolerance:
+				self._decrease()
+
+	def record_success(self, num_bytes: int) -> None:
+		"""记录一次成功的请求及其传输的字节数"""
+		now = anyio.current_time()
+		if self._window_start is None:
+			self._window_start = now
+		self._window_bytes += num_bytes
+		self._window_completed += 1
+		if self._window_completed + self._window_failures >= self.limit:
+			self._close_window(now)
+
+	def record_failure(self) -> None:
+		"""记录一次失败的请求，立即下调并发上限"""
+		self._window_failures += 1
+		self._decrease()
+
+	def _close_window(self, now: float) -> None:
+		assert self._window_start is not None
+		elapsed = max(now - self._window_start, 1e-6)
+		throughput = self._window_bytes / elapsed
+		if (
+			not self._decreased_in_window
+			and not self._window_failures
+			and (
+				self._last_throughput is None
+				or throughput >= self._last_throughput * (1 - self.throughput_tolerance)
+			)
+		):
+			self._set_limit(self._limit + 1)
+
+		self._last_throughput = throughput
+		self._window_start = now
+		self._window_bytes = 0
+		self._window_completed = 0
+		self._window_ttfbs.clear()
+		self._window_failures = 0
+		self._decreased_in_window = False
+
+
+Limiter: TypeAlias = anyio.Semaphore | AdaptiveLimiter
+
+
+class BandwidthLimiter:
+	"""令牌桶带宽限制器
+
+	以rate字节/秒的速度生成令牌，桶容量为burst字节。
+	使用虚拟时间（GCRA）实现：每次消费都会预约一段传输时间，
+	预约按调用顺序排队，等待时间只取决于之前预约的总字节数，因此多个下载之间是公平的，
+	并且每个块只等待很短的时间，吞吐量平滑而不会突发。
+	"""
+
+	def __init__(self, rate: float, burst: float | None = None) -> None:
+		"""
+		Args:
+			rate: 每秒允许传输的字节数
+			burst: 桶容量，即空闲后允许立即传输的字节数，默认为0.1秒的传输量
+		"""
+		if rate <= 0:
+			raise ValueError('rate必须大于0')
+
+		self.rate = float(rate)
+		self.burst = float(burst) if burst is not None else self.rate / 10
+		self._empty_at: float | None = None
+
+	async def consume(self, num_bytes: int) -> None:
+		"""消费num_bytes个令牌，令牌不足时等待"""
+		now = anyio.current_time()
+		full_at = now - self.burst / self.rate
+		if self._empty_at is None or self._empty_at < full_at:
+			self._empty_at = full_at
+		self._empty_at += num_bytes / self.rate
+		if (delay := self._empty_at - now) > 0:
+			await anyio.sleep(delay)
+		else:
+			await anyio.lowlevel.checkpoint()
+
+
+_bandwidth_limiter: BandwidthLimiter | None = None
+
+
+def set_bandwidth_limit(rate: float | None, burst: float | None = None) -> None:
+	"""设置进程内所有下载器共享的带宽限制（字节/秒），为None时不限制"""
+	global _bandwidth_limiter
+	_bandwidth_limiter = None if rate is None else BandwidthLimiter(rate, burst)
+
+
+def get_bandwidth_limiter() -> BandwidthLimiter | None:
+	return _bandwidth_limiter
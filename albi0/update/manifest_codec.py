@@ -0,0 +1,109 @@
+import gzip
+from typing import Any, Literal
+
+import orjson
+
+from albi0.utils import gc_paused
+
+from .version import (
+	LocalFileName,
+	Manifest,
+	ManifestItem,
+	decode_manifest_items,
+	manifest_item_to_row,
+)
+
+Compression = Literal['gzip', 'zstd']
+
+FORMAT_VERSION = 2
+"""行格式的版本号，dataclasses_json写入的旧格式视为版本1"""
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+MANIFEST_SUFFIXES: dict[Compression | None, str] = {
+	None: '.json',
+	'gzip': '.json.gz',
+	'zstd': '.json.zst',
+}
+"""各压缩格式的本地清单文件后缀"""
+
+
+def _import_zstandard() -> Any:
+	try:
+		import zstandard
+	except ImportError as e:
+		raise ImportError(
+			'读写zstd压缩的清单需要安装zstandard，可以使用pip install albi0[zstd]安装'
+		) from e
+	return zstandard
+
+
+def check_compression(compression: Compression | None) -> None:
+	"""检查压缩格式所需的依赖是否已安装，未安装时抛出ImportError"""
+	if compression == 'zstd':
+		_import_zstandard()
+
+
+def compress(data: bytes, compression: Compression | None) -> bytes:
+	if compression is None:
+		return data
+	if compression == 'gzip':
+		# 清单中的哈希无法压缩，更高的压缩等级收益很小但慢数倍；
+		# mtime固定为0，内容相同时输出相同
+		return gzip.compress(data, compresslevel=1, mtime=0)
+	if compression == 'zstd':
+		return _import_zstandard().ZstdCompressor(level=3).compress(data)
+	raise ValueError(f'不支持的压缩格式: {compression}')
+
+
+def decompress(data: bytes) -> bytes:
+	"""根据文件头解压数据，未压缩的数据原样返回"""
+	if data.startswith(GZIP_MAGIC):
+		return gzip.decompress(data)
+	if data.startswith(ZSTD_MAGIC):
+		# 流式写入的帧头中可能没有内容大小，使用stream_reader解压
+		with _import_zstandard().ZstdDecompressor().stream_reader(data) as reader:
+			return reader.read()
+	return data
+
+
+def dumps_manifest(manifest: Manifest, compression: Compression | None = None) -> bytes:
+	"""使用orjson将清单编码为行格式的JSON，比dataclasses_json快得多，体积也更小
+
+	Args:
+		manifest: 清单
+		compression: 压缩格式，为None时不压缩
+	"""
+	data = {
+		'format': FORMAT_VERSION,
+		'version': manifest.version,
+		'items': [
+			manifest_item_to_row(local_fn, item)
+			for local_fn, item in manifest.items.items()
+		],
+	}
+	return compress(orjson.dumps(data), compression)
+
+
+def loads_manifest(data: bytes | str) -> Manifest:
+	"""解码dumps_manifest或Manifest.to_json的输出，压缩格式根据文件头自动识别"""
+	if isinstance(data, str):
+		data = data.encode()
+	data = decompress(data)
+	with gc_paused():
+		obj = orjson.loads(data)
+		items = obj['items']
+		if isinstance(items, list):
+			# 与manifest_item_from_row相同，内联以省去每行一次函数调用
+			fromhex = bytes.fromhex
+			decoded = {
+				LocalFileName(local_fn): ManifestItem(
+					remote, basename, fromhex(file_hash), size, crc
+				)
+				for local_fn, remote, basename, file_hash, size, crc in items
+			}
+		else:
+			# dataclasses_json写入的旧格式，以本地文件名为键
+			decoded = decode_manifest_items(items)
+	return Manifest(version=obj['version'], items=decoded)
@@ -0,0 +1,216 @@
+from dataclasses import dataclass
+import hashlib
+import os
+from pathlib import Path
+from typing import Any
+
+import anyio.to_thread
+from dataclasses_json import DataClassJsonMixin
+from httpx import URL, AsyncClient, Client, Response, codes
+import orjson
+
+from albi0.log import logger
+from albi0.typing import PathTypes
+
+from .manifest_codec import dumps_manifest, loads_manifest
+from .version import Manifest
+
+
+@dataclass
+class CachedMetadata(DataClassJsonMixin):
+	url: str
+	"""不包含查询参数的URL"""
+	etag: str | None = None
+	last_modified: str | None = None
+
+
+def _strip_query(url: str) -> str:
+	return str(URL(url).copy_with(query=None))
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+	temp = path.with_name(f'{path.name}.tmp')
+	temp.write_bytes(data)
+	os.replace(temp, path)
+
+
+class MetadataCache:
+	"""版本文件与清单的磁盘缓存
+
+	保存响应内容与ETag/Last-Modified，再次请求时发送条件请求，
+	服务器返回304时直接使用缓存的内容。
+	内容不可变的文件（例如URL中带版本号的清单）命中缓存时不会发出请求。
+	URL中带有版本号的文件可以指定不含版本号的缓存键，新版本会覆盖旧版本的缓存。
+	"""
+
+	def __init__(self, root: PathTypes) -> None:
+		self.root = Path(root)
+
+	def _paths(self, key: str) -> tuple[Path, Path]:
+		basename = URL(key).path.rsplit('/', 1)[-1] or 'index'
+		name = f'{basename}-{hashlib.sha1(key.encode()).hexdigest()[:12]}'
+		return self.root / f'{name}.json', self.root / f'{name}.bin'
+
+	def load(
+		self, url: str, key: str | None = None
+	) -> tuple[CachedMetadata, bytes] | None:
+		"""读取缓存，不存在、损坏或缓存的是其他URL时返回None"""
+		url = _strip_query(url)
+		meta_path, body_path = self._paths(key or url)
+		try:
+			metadata = CachedMetadata.from_json(meta_path.read_bytes())
+			body = body_path.read_bytes()
+		except FileNotFoundError:
+			return None
+		except (ValueError, KeyError) as e:
+			logger.warning(f'元数据缓存{meta_path}已损坏，忽略该缓存：{e!r}')
+			return None
+		if metadata.url != url:
+			return None
+		return metadata, body
+
+	def save(self, url: str, response: Response, key: str | None = None) -> None:
+		url = _strip_query(url)
+		meta_path, body_path = self._paths(key or url)
+		self.root.mkdir(parents=True, exist_ok=True)
+		# 先写入内容再写入元数据，中途中断时不会出现元数据与内容不匹配
+		_write_atomic(body_path, response.content)
+		metadata = CachedMetadata(
+			url,
+			etag=response.headers.get('etag'),
+			last_modified=response.headers.get('last-modified'),
+		)
+		_write_atomic(meta_path, metadata.to_json().encode())
+
+	@staticmethod
+	def conditional_headers(metadata: CachedMetadata) -> dict[str, str]:
+		headers = {}
+		if metadata.etag:
+			headers['if-none-match'] = metadata.etag
+		if metadata.last_modified:
+			headers['if-modified-since'] = metadata.last_modified
+		return headers
+
+	def _prepare(
+		self, url: str, headers: dict[str, str] | None, key: str | None
+	) -> tuple[tuple[CachedMetadata, bytes] | None, dict[str, str]]:
+		cached = self.load(url, key)
+		headers = dict(headers or {})
+		if cached is not None:
+			headers.update(self.conditional_headers(cached[0]))
+		return cached, headers
+
+	def _handle_response(
+		self,
+		url: str,
+		cached: tuple[CachedMetadata, bytes] | None,
+		response: Response,
+		key: str | None,
+	) -> bytes:
+		if response.status_code == codes.NOT_MODIFIED and cached is not None:
+			return cached[1]
+		response.raise_for_status()
+		self.save(url, response, key)
+		return response.content
+
+	def get(
+		self,
+		client: Client,
+		url: str,
+		*,
+		immutable: bool = False,
+		headers: dict[str, str] | None = None,
+		key: str | None = None,
+		**kwargs: Any,
+	) -> bytes:
+		"""使用缓存获取url的内容
+
+		Args:
+			client: 同步客户端
+			url: 请求的URL
+			immutable: 内容是否不可变，为True时命中缓存不发出请求
+			headers: 额外的请求头
+			key: 缓存键，默认为URL，相同键的缓存只保留最后保存的URL
+			**kwargs: 传给client.get的其他参数
+		"""
+		if immutable and (cached := self.load(url, key)) is not None:
+			return cached[1]
+		cached, headers = self._prepare(url, headers, key)
+		response = client.get(url, headers=headers, **kwargs)
+		return self._handle_response(url, cached, response, key)
+
+	async def aget(
+		self,
+		client: AsyncClient,
+		url: str,
+		*,
+		immutable: bool = False,
+		headers: dict[str, str] | None = None,
+		key: str | None = None,
+		**kwargs: Any,
+	) -> bytes:
+		"""get的异步版本，读写缓存文件在工作线程中进行"""
+		cached, headers = await anyio.to_thread.run_sync(
+			self._prepare, url, headers, key
+		)
+		if immutable and cached is not None:
+			return cached[1]
+		response = await client.get(url, headers=headers, **kwargs)
+		return await anyio.to_thread.run_sync(
+			self._handle_response, url, cached, response, key
+		)
+
+
+class ManifestCache:
+	"""解析后的远程清单缓存
+
+	以包名与版本号为键，使用orjson保存简化后的Manifest，
+	远程版本号未变化时直接加载，不再下载与解析二进制清单。
+	"""
+
+	FORMAT_VERSION = 1
+
+	def __init__(self, root: PathTypes) -> None:
+		self.root = Path(root)
+
+	def _digest(self, package_name: str, namespace: str) -> str:
+		return hashlib.sha1(
+			f'{self.FORMAT_VERSION}|{package_name}|{namespace}'.encode()
+		).hexdigest()[:12]
+
+	def path_for(self, package_name: str, version: str, namespace: str = '') -> Path:
+		"""获取缓存文件路径
+
+		Args:
+			package_name: 包名
+			version: 远程版本号
+			namespace: 区分同名包的附加信息，例如远程地址与本地路径，
+				解析方式不同的版本管理器也应使用不同的namespace
+		"""
+		digest = self._digest(package_name, namespace)
+		return self.root / f'{package_name}_{version}-{digest}.json'
+
+	def load(
+		self, package_name: str, version: str, namespace: str = ''
+	) -> Manifest | None:
+		path = self.path_for(package_name, version, namespace)
+		try:
+			return loads_manifest(path.read_bytes())
+		except FileNotFoundError:
+			return None
+		except (orjson.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+			logger.warning(f'清单缓存{path}已损坏，忽略该缓存：{e!r}')
+			return None
+
+	def save(
+		self, package_name: str, version: str, manifest: Manifest, namespace: str = ''
+	) -> None:
+		"""保存清单，并删除同一个包其他版本的缓存"""
+		path = self.path_for(package_name, version, namespace)
+		self.root.mkdir(parents=True, exist_ok=True)
+		_write_atomic(path, dumps_manifest(manifest))
+		# 文件名的摘要由包名与namespace决定，相同摘要的其他文件都是旧版本
+		digest = self._digest(package_name, namespace)
+		for other in self.root.glob(f'*-{digest}.json'):
+			if other != path:
+				other.unlink(missing_ok=True)
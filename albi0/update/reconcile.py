@@ -0,0 +1,148 @@
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+from pathlib import Path
+from typing import NamedTuple
+import zlib
+
+import orjson
+
+from albi0.log import logger
+from albi0.typing import PathTypes
+
+from .version import LocalFileName, ManifestItem
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class FileDigest(NamedTuple):
+	"""文件的状态与摘要，状态不变时认为摘要仍然有效"""
+
+	size: int
+	mtime_ns: int
+	inode: int
+	md5: str
+	crc32: int
+
+
+class StatCache:
+	"""持久化的文件状态缓存，以本地文件名为键保存size、mtime_ns、inode与摘要"""
+
+	def __init__(self, path: PathTypes) -> None:
+		self.path = Path(path)
+		self.entries: dict[str, FileDigest] = {}
+
+	def load(self) -> None:
+		try:
+			data = orjson.loads(self.path.read_bytes())
+			self.entries = {k: FileDigest(*v) for k, v in data.items()}
+		except FileNotFoundError:
+			self.entries = {}
+		except (orjson.JSONDecodeError, TypeError, AttributeError) as e:
+			logger.warning(f'文件状态缓存{self.path}已损坏，忽略该缓存：{e!r}')
+			self.entries = {}
+
+	def save(self) -> None:
+		self.path.parent.mkdir(parents=True, exist_ok=True)
+		temp = self.path.with_name(f'{self.path.name}.tmp')
+		temp.write_bytes(orjson.dumps({k: tuple(v) for k, v in self.entries.items()}))
+		os.replace(temp, self.path)
+
+	def lookup(self, local_fn: str, stat: os.stat_result) -> FileDigest | None:
+		"""状态与缓存一致时返回缓存的摘要"""
+		entry = self.entries.get(local_fn)
+		if (
+			entry is not None
+			and entry.size == stat.st_size
+			and entry.mtime_ns == stat.st_mtime_ns
+			and entry.inode == stat.st_ino
+		):
+			return entry
+		return None
+
+
+def hash_file(path: PathTypes, stat: os.stat_result) -> FileDigest:
+	"""计算文件的md5与CRC32，大块读取时hashlib与zlib会释放GIL，可以在多个线程中并行"""
+	md5 = hashlib.md5()
+	crc = 0
+	with open(path, 'rb') as f:
+		while chunk := f.read(HASH_CHUNK_SIZE):
+			md5.update(chunk)
+			crc = zlib.crc32(chunk, crc)
+	return FileDigest(stat.st_size, stat.st_mtime_ns, stat.st_ino, md5.hexdigest(), crc)
+
+
+def _try_hash_file(path: PathTypes, stat: os.stat_result) -> FileDigest | None:
+	try:
+		return hash_file(path, stat)
+	except OSError as e:
+		logger.warning(f'无法读取{path}：{e!r}')
+		return None
+
+
+def is_intact(item: ManifestItem, digest: FileDigest, *, verify_md5: bool) -> bool:
+	"""判断文件摘要是否与清单项一致，清单项中未知的字段不参与比较"""
+	if item.file_size is not None and digest.size != item.file_size:
+		return False
+	if (crc32 := item.crc32) is not None and digest.crc32 != crc32:
+		return False
+	return not verify_md5 or (md5 := item.md5) is None or digest.md5 == md5
+
+
+def reconcile_files(
+	items: Mapping[LocalFileName, ManifestItem],
+	*,
+	stat_cache: StatCache | None = None,
+	max_workers: int | None = None,
+	verify_md5: bool = True,
+) -> dict[LocalFileName, ManifestItem]:
+	"""检查磁盘上的文件是否与清单一致，返回缺失、大小不一致或摘要不一致的项
+
+	状态（size、mtime_ns、inode）与stat_cache一致的文件直接使用缓存的摘要，
+	其余文件在线程池中并行计算摘要，检查完成后更新并保存stat_cache。
+
+	Args:
+		items: 需要检查的清单项
+		stat_cache: 文件状态缓存，为None时重新计算所有文件的摘要
+		max_workers: 计算摘要的线程数
+		verify_md5: 是否比较md5，清单项的file_hash不是md5时应设为False
+	"""
+	broken: dict[LocalFileName, ManifestItem] = {}
+	digests: dict[LocalFileName, FileDigest] = {}
+	to_hash: list[tuple[LocalFileName, os.stat_result]] = []
+	for local_fn, item in items.items():
+		try:
+			stat = os.stat(local_fn)
+		except FileNotFoundError:
+			broken[local_fn] = item
+			continue
+		if item.file_size is not None and stat.st_size != item.file_size:
+			broken[local_fn] = item
+			continue
+		cached = stat_cache.lookup(local_fn, stat) if stat_cache is not None else None
+		if cached is None:
+			to_hash.append((local_fn, stat))
+		else:
+			digests[local_fn] = cached
+
+	if to_hash:
+		logger.info(f'需要重新计算摘要的文件数量: {len(to_hash)}')
+		with ThreadPoolExecutor(max_workers) as executor:
+			results = executor.map(lambda args: _try_hash_file(*args), to_hash)
+			for (local_fn, _), digest in zip(to_hash, results):
+				if digest is None:
+					broken[local_fn] = items[local_fn]
+				else:
+					digests[local_fn] = digest
+
+	for local_fn, digest in digests.items():
+		if not is_intact(item := items[local_fn], digest, verify_md5=verify_md5):
+			broken[local_fn] = item
+
+	if stat_cache is not None:
+		stat_cache.entries.update(digests)
+		for local_fn in broken:
+			stat_cache.entries.pop(local_fn, None)
+		stat_cache.save()
+	return broken
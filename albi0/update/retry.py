@@ -0,0 +1,102 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+import random
+import time
+
+import anyio
+import httpx
+
+DEFAULT_RETRY_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+	"""下载重试策略，使用带抖动的指数退避
+
+	第n次重试前等待的时间为[0, min(backoff_max, backoff_base * 2 ** (n - 1))]
+	范围内的随机值（full jitter），服务器返回Retry-After时取两者中的较大值。
+	"""
+
+	max_attempts: int = 5
+	"""最大尝试次数（包括第一次请求），为1时不重试"""
+	backoff_base: float = 0.5
+	backoff_max: float = 30.0
+	jitter: bool = True
+	"""为False时严格按照指数退避等待"""
+	retry_status_codes: frozenset[int] = DEFAULT_RETRY_STATUS_CODES
+	retry_exceptions: tuple[type[Exception], ...] = (httpx.TransportError,)
+
+	def is_retryable(self, exc: BaseException) -> bool:
+		if isinstance(exc, httpx.HTTPStatusError):
+			return exc.response.status_code in self.retry_status_codes
+		return isinstance(exc, self.retry_exceptions)
+
+	def get_delay(self, attempt: int, exc: BaseException | None = None) -> float:
+		"""获取第attempt次失败后的等待时间"""
+		delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+		if self.jitter:
+			delay = random.uniform(0, delay)
+		if isinstance(exc, httpx.HTTPStatusError) and (
+			retry_after := parse_retry_after(exc.response)
+		):
+			delay = max(delay, min(retry_after, self.backoff_max))
+		return delay
+
+
+NO_RETRY = RetryPolicy(max_attempts=1)
+
+
+def parse_retry_after(response: httpx.Response) -> float | None:
+	"""解析Retry-After响应头，支持秒数与HTTP日期两种格式"""
+	value = response.headers.get('retry-after')
+	if not value:
+		return None
+	if value.isdigit():
+		return float(value)
+	try:
+		return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+	except (TypeError, ValueError):
+		return None
+
+
+@dataclass
+class _HostState:
+	failures: int = 0
+	open_until: float = 0.0
+
+
+@dataclass
+class CircuitBreaker:
+	"""按主机统计连续失败次数的熔断器
+
+	连续失败达到failure_threshold次后熔断打开，在recovery_timeout秒内，
+	发往该主机的请求会等待而不是立即发出；熔断关闭前的每次失败都会重新打开熔断，
+	直到有请求成功为止。
+	"""
+
+	failure_threshold: int = 5
+	recovery_timeout: float = 10.0
+	_states: defaultdict[str, _HostState] = field(
+		default_factory=lambda: defaultdict(_HostState), init=False, repr=False
+	)
+
+	def is_open(self, host: str) -> bool:
+		return self._states[host].open_until > anyio.current_time()
+
+	async def wait(self, host: str) -> None:
+		"""熔断打开期间等待，直到熔断关闭"""
+		if not self.is_open(host):
+			return
+		await anyio.sleep_until(self._states[host].open_until)
+		# 等待期间可能有其他请求失败，使熔断重新打开
+		await self.wait(host)
+
+	def record_success(self, host: str) -> None:
+		self._states[host].failures = 0
+
+	def record_failure(self, host: str) -> None:
+		state = self._states[host]
+		state.failures += 1
+		if state.failures >= self.failure_threshold:
+			state.open_until = anyio.current_time() + self.recovery_timeout
@@ -1,15 +1,20 @@
-from collections.abc import Iterable
+from collections.abc import Iterable, Mapping
 from pathlib import Path
 
-import anyio
+import anyio.to_thread
 import click
 from tqdm.asyncio import tqdm
 
 from albi0.container import ProcessorContainer
 from albi0.typing import DownloadPostProcessMethod
 
-from .downloader import Downloader, DownloadParams
-from .version import AbstractVersionManager
+from .blob_store import BlobStore
+from .downloader import Downloader, DownloadParams, DownloadsFailedError
+from .journal import ManifestJournal
+from .limiter import Limiter
+from .reconcile import StatCache, reconcile_files
+from .retry import RetryPolicy
+from .version import AbstractVersionManager, LocalFileName, Manifest, ManifestItem
 
 updaters: ProcessorContainer['Updater'] = ProcessorContainer()
 
@@ -23,25 +28,163 @@ class Updater:
 		version_manager: AbstractVersionManager,
 		downloader: Downloader,
 		postprocess_handler: DownloadPostProcessMethod | None = None,
+		verify_file_hash: bool = True,
+		retry_policy: RetryPolicy | None = None,
+		blob_store: BlobStore | None = None,
+		journal_compact_every: int = 500,
 	) -> None:
+		"""
+		Args:
+			name: 更新器名称
+			desc: 更新器描述
+			version_manager: 版本管理器
+			downloader: 下载器
+			postprocess_handler: 下载完成后对文件内容的后处理函数
+			verify_file_hash: 当清单项的file_hash为md5摘要时，是否在下载时校验md5，
+				如果file_hash不是文件内容的md5（例如资源服务器自定义的哈希），应设为False
+			retry_policy: 下载重试策略，为None时使用下载器的策略
+			blob_store: 以文件哈希为键的本地存储，设置后优先从存储中放置文件，
+				下载完成的文件也会加入存储
+			journal_compact_every: 清单日志每追加多少条记录就合并到本地清单一次，
+				合并在工作线程中进行，不会阻塞下载
+		"""
 		self.name = name
 		self.desc = desc
 		self.version_manager = version_manager
 		self.downloader = downloader
 		self.postprocess_handler = postprocess_handler
+		self.verify_file_hash = verify_file_hash
+		self.retry_policy = retry_policy
+		self.blob_store = blob_store
+		self.journal_compact_every = journal_compact_every
 
 		updaters[self.name] = self
 
 	def _log_message(self, message: str) -> None:
 		click.echo(f'更新器|[{self.name}]: {message}')
 
+	def _merge_into_local_manifest(
+		self, items: Mapping[LocalFileName, ManifestItem], version: str | None = None
+	) -> None:
+		"""将清单项合并到本地清单中
+
+		需要更新的清单只包含变化的文件，直接保存会丢失其他文件的记录。
+		version为None时本地版本号保持不变，以便下次运行时继续更新。
+		"""
+		local_manifest = self.version_manager.load_local_manifest()
+		self.version_manager.save_manifest_to_local(
+			Manifest(
+				version=local_manifest.version if version is None else version,
+				items={**local_manifest.items, **items},
+			)
+		)
+
+	def _get_journal(self) -> ManifestJournal:
+		return ManifestJournal(f'{self.version_manager.local_manifest_path}.journal')
+
+	def _flush_journal(self, journal: ManifestJournal) -> int:
+		"""将日志中的记录合并到本地清单并清空日志，返回合并的记录数"""
+		journal.close()
+		if items := journal.replay():
+			self._merge_into_local_manifest(items)
+		journal.clear()
+		return len(items)
+
+	def _compact_journal(self, journal: ManifestJournal) -> None:
+		"""将已轮换的日志记录合并到本地清单，在工作线程中与下载同时进行"""
+		try:
+			if items := journal.replay_rotated():
+				self._merge_into_local_manifest(items)
+			journal.clear_rotated()
+		except Exception as e:
+			# 已轮换的记录仍保留在日志中，运行结束时会与其余记录一起合并
+			self._log_message(f'合并清单日志失败：{e!r}')
+
+	def _place_from_blob_store(
+		self, items: dict[str, ManifestItem]
+	) -> dict[str, ManifestItem]:
+		"""从存储中放置文件，返回存储中没有、仍需下载的清单项"""
+		if self.blob_store is None:
+			return items
+
+		missing = {
+			local_fn: item
+			for local_fn, item in items.items()
+			if not self.blob_store.place(
+				BlobStore.key_of(item.file_hash), local_fn, item.file_size
+			)
+		}
+		if placed := len(items) - len(missing):
+			self._log_message(f'从本地存储放置的文件数量: {placed}')
+		return missing
+
+	def _add_to_blob_store(
+		self, items: dict[str, ManifestItem], failures: Iterable[Path] = ()
+	) -> None:
+		if self.blob_store is None:
+			return
+
+		failures = set(failures)
+		for local_fn, item in items.items():
+			if Path(local_fn) not in failures:
+				self.blob_store.add(BlobStore.key_of(item.file_hash), local_fn)
+
+	async def _select_by_assets(
+		self, manifest: Manifest, asset_patterns: tuple[str, ...]
+	) -> Manifest | None:
+		"""只保留加载匹配的资源所需的清单项，没有剩余项时返回None"""
+		selected = await self.version_manager.aresolve_asset_patterns(*asset_patterns)
+		self._log_message(f'资源路径匹配的文件数量（包括依赖）: {len(selected)}')
+		items = {
+			local_fn: item
+			for local_fn, item in manifest.items.items()
+			if local_fn in selected
+		}
+		return Manifest(version=manifest.version, items=items) if items else None
+
+	def _get_stat_cache(self) -> StatCache:
+		return StatCache(f'{self.version_manager.local_manifest_path}.stat')
+
+	def _reconcile(
+		self,
+		remote_manifest: Manifest,
+		update_manifest: Manifest | None,
+		patterns: tuple[str, ...],
+		max_workers: int | None,
+	) -> Manifest | None:
+		"""检查清单认为已是最新的文件在磁盘上是否完整，将不完整的文件加入更新清单"""
+		pending = update_manifest.items if update_manifest else {}
+		items = {
+			local_fn: item
+			for local_fn, item in remote_manifest.filter_local_filenames_by_glob(
+				*patterns
+			).items.items()
+			if local_fn not in pending
+		}
+		stat_cache = self._get_stat_cache()
+		stat_cache.load()
+		broken = reconcile_files(
+			items,
+			stat_cache=stat_cache,
+			max_workers=max_workers,
+			verify_md5=self.verify_file_hash,
+		)
+		if not broken:
+			return update_manifest
+
+		self._log_message(f'磁盘上缺失或损坏的文件数量: {len(broken)}')
+		return Manifest(version=remote_manifest.version, items={**pending, **broken})
+
 	async def update(
 		self,
 		*,
 		progress_bar: tqdm | None = None,
 		save_manifest: bool = True,
 		patterns: Iterable[str] = (),
-		semaphore: anyio.Semaphore | None = None,
+		semaphore: Limiter | None = None,
+		reconcile: bool = False,
+		reconcile_workers: int | None = None,
+		asset_patterns: Iterable[str] = (),
 	) -> None:
 		"""异步更新资源文件
 
@@ -49,37 +192,113 @@ class Updater:
 
 		Args:
 			progress_bar: 进度条
-			semaphore: 并发限制
+			semaphore: 并发限制，可以是anyio.Semaphore或AdaptiveLimiter
 			save_manifest: 是否保存清单
 			patterns: glob语法的文件名过滤模式，用于过滤希望检查更新的文件，
 			如果为空则检查所有文件。
+			reconcile: 是否检查磁盘上的文件，缺失或损坏的文件即使清单中的哈希一致
+			也会重新下载。文件状态缓存在本地清单旁的.stat文件中，
+			只有状态变化的文件会重新计算摘要。指定了postprocess_handler时，
+			磁盘上的文件与清单中的摘要不一致，不会进行检查
+			reconcile_workers: 检查磁盘文件时计算摘要的线程数
+			asset_patterns: glob语法的资源路径过滤模式，不为空时只更新加载匹配的资源
+			所需的文件（包括传递依赖），与patterns同时指定时取交集。
+			需要版本管理器支持resolve_asset_patterns
 		"""
-		manifest = self.version_manager.generate_update_manifest(*patterns)
+		patterns = tuple(patterns)
+		journal = self._get_journal()
+		if save_manifest and journal.exists():
+			# 上次运行意外中断，先恢复已经下载完成的文件
+			recovered = await anyio.to_thread.run_sync(self._flush_journal, journal)
+			self._log_message(f'从清单日志恢复的文件数量: {recovered}')
+
+		manifest = await self.version_manager.agenerate_update_manifest(*patterns)
+		if reconcile and self.postprocess_handler is not None:
+			# 后处理改写了文件内容，按清单检查会把所有文件当作损坏
+			self._log_message('下载后会对文件进行后处理，跳过磁盘文件检查')
+			reconcile = False
+		if reconcile:
+			manifest = await anyio.to_thread.run_sync(
+				self._reconcile,
+				await self.version_manager.aget_remote_manifest(),
+				manifest,
+				patterns,
+				reconcile_workers,
+			)
+		if manifest and (asset_patterns := tuple(asset_patterns)):
+			manifest = await self._select_by_assets(manifest, asset_patterns)
 		if not manifest:
 			self._log_message('没有需要更新的文件，运行结束')
 			return
 
-		items = manifest.items
-		self._log_message(f'需要更新的文件数量: {len(items)}')
+		self._log_message(f'需要更新的文件数量: {len(manifest.items)}')
+		items = await anyio.to_thread.run_sync(
+			self._place_from_blob_store, manifest.items
+		)
+		by_filename = {Path(local_fn): local_fn for local_fn in items}
+
+		if save_manifest:
+			for local_fn, item in manifest.items.items():
+				if local_fn not in items:
+					journal.append(local_fn, item)
+
 		tasks = [
-			DownloadParams(url=item.remote_filename, filename=Path(local_fn))
+			DownloadParams(
+				url=item.remote_filename,
+				filename=Path(local_fn),
+				md5=item.md5 if self.verify_file_hash else None,
+				size=item.file_size,
+				crc32=item.crc32,
+			)
 			for local_fn, item in items.items()
 		]
-		if tasks:
-			await self.downloader.downloads(
-				*tasks,
-				progress_bar=progress_bar,
-				postprocess_handler=self.postprocess_handler,
-				semaphore=semaphore,
-			)
+		error: DownloadsFailedError | None = None
+		try:
+			# 合并日志需要读写整个清单，轮换日志后在工作线程中合并，
+			# 下载回调只追加日志，退出任务组时等待所有合并完成
+			async with anyio.create_task_group() as compactions:
 
-		if not tasks:
-			self._log_message('没有需要更新的文件，不保存资源清单')
-			return
+				def on_complete(params: DownloadParams) -> None:
+					local_fn = by_filename[params.filename]
+					journal.append(local_fn, items[local_fn])
+					if journal.count >= self.journal_compact_every and journal.rotate():
+						compactions.start_soon(
+							anyio.to_thread.run_sync, self._compact_journal, journal
+						)
+
+				try:
+					if tasks:
+						await self.downloader.downloads(
+							*tasks,
+							progress_bar=progress_bar,
+							postprocess_handler=self.postprocess_handler,
+							semaphore=semaphore,
+							retry_policy=self.retry_policy,
+							on_complete=on_complete if save_manifest else None,
+						)
+				except DownloadsFailedError as e:
+					error = e
+		finally:
+			journal.close()
+
+		if error is not None:
+			await anyio.to_thread.run_sync(
+				self._add_to_blob_store, items, error.failures
+			)
+			if save_manifest:
+				await anyio.to_thread.run_sync(self._flush_journal, journal)
+				self._log_message(
+					f'{len(error.failures)}个文件下载失败，已将下载成功的文件保存到资源清单'
+				)
+			raise error
+		await anyio.to_thread.run_sync(self._add_to_blob_store, items)
 
 		if not save_manifest:
 			self._log_message('参数save_manifest为False，不保存资源清单')
 			return
 
-		self.version_manager.save_manifest_to_local(manifest)
+		await anyio.to_thread.run_sync(
+			self._merge_into_local_manifest, manifest.items, manifest.version
+		)
+		journal.clear()
 		self._log_message('资源清单更新完成')
@@ -1,11 +1,19 @@
 from abc import ABC, abstractmethod
+from collections.abc import Sequence
 from dataclasses import dataclass, field
-from typing import NamedTuple, NewType
+from pathlib import Path
+from string import hexdigits
+from typing import TYPE_CHECKING, NamedTuple, NewType
 from typing_extensions import Self
 
+import anyio.to_thread
 from dataclasses_json import DataClassJsonMixin, config
 import dataclasses_json.cfg
 
+if TYPE_CHECKING:
+	from .cleanup import GcResult
+	from .diff import ManifestDiff
+
 LocalFileName = NewType('LocalFileName', str)
 
 
@@ -23,6 +31,54 @@ class ManifestItem(NamedTuple):
 	remote_filename: str
 	local_basename: str
 	file_hash: bytes
+	file_size: int | None = None
+	"""文件大小，未知时为None"""
+	file_crc: str | None = None
+	"""文件的CRC32校验值（十进制字符串），未知时为None"""
+
+	@property
+	def md5(self) -> str | None:
+		"""如果file_hash是md5的十六进制摘要则返回，否则返回None"""
+		try:
+			file_hash = self.file_hash.decode()
+		except UnicodeDecodeError:
+			return None
+		if len(file_hash) != 32 or not all(c in hexdigits for c in file_hash):
+			return None
+		return file_hash.lower()
+
+	@property
+	def crc32(self) -> int | None:
+		"""将file_crc解析为整数，无法解析时返回None"""
+		if self.file_crc is None:
+			return None
+		try:
+			return int(self.file_crc)
+		except ValueError:
+			return None
+
+
+ManifestRow = tuple[str, str, str, str, int | None, str | None]
+"""清单项的紧凑表示，依次为本地文件名、远程文件名、本地基本名、文件哈希的十六进制、
+大小与CRC"""
+
+
+def manifest_item_to_row(local_fn: str, item: ManifestItem) -> ManifestRow:
+	return (
+		str(local_fn),
+		item.remote_filename,
+		item.local_basename,
+		item.file_hash.hex(),
+		item.file_size,
+		item.file_crc,
+	)
+
+
+def manifest_item_from_row(row: Sequence) -> tuple[LocalFileName, ManifestItem]:
+	local_fn, remote_filename, local_basename, file_hash, file_size, file_crc = row
+	return LocalFileName(local_fn), ManifestItem(
+		remote_filename, local_basename, bytes.fromhex(file_hash), file_size, file_crc
+	)
 
 
 def encode_manifest_items(items: dict[LocalFileName, ManifestItem]) -> dict:
@@ -31,6 +87,8 @@ def encode_manifest_items(items: dict[LocalFileName, ManifestItem]) -> dict:
 			'remote_filename': item.remote_filename,
 			'local_basename': item.local_basename,
 			'file_hash': item.file_hash.hex(),
+			'file_size': item.file_size,
+			'file_crc': item.file_crc,
 		}
 		for local_fn, item in items.items()
 	}
@@ -42,6 +100,8 @@ def decode_manifest_items(items: dict) -> dict[LocalFileName, ManifestItem]:
 			item['remote_filename'],
 			item['local_basename'],
 			bytes.fromhex(item['file_hash']),
+			item.get('file_size'),
+			item.get('file_crc'),
 		)
 		for local_fn, item in items.items()
 	}
@@ -66,17 +126,16 @@ class Manifest(DataClassJsonMixin):
 		Returns:
 			包含匹配文件的新Manifest实例，返回所有模式的并集，如果patterns为空，则原样返回
 		"""
-		from fnmatch import fnmatch
+		from .diff import compile_patterns
 
-		if not patterns:
+		if (match := compile_patterns(patterns)) is None:
 			return self
 
-		filtered_items = {}
-		for local_fn, item in self.items.items():
-			for pattern in patterns:
-				if fnmatch(item.local_basename, pattern):
-					filtered_items[local_fn] = item
-					break
+		filtered_items = {
+			local_fn: item
+			for local_fn, item in self.items.items()
+			if match(item.local_basename)
+		}
 
 		return self.__class__(version=self.version, items=filtered_items)
 
@@ -137,6 +196,56 @@ class AbstractVersionManager(ABC):
 		注意该方法仅判断版本号，不能用于判断是否需要下载资源。
 		"""
 
+	async def aget_remote_version(self) -> str:
+		"""get_remote_version的异步版本，默认在工作线程中调用同步方法"""
+		return await anyio.to_thread.run_sync(self.get_remote_version)
+
+	async def aget_remote_manifest(self) -> Manifest:
+		"""get_remote_manifest的异步版本，默认在工作线程中调用同步方法"""
+		return await anyio.to_thread.run_sync(self.get_remote_manifest)
+
+	async def ais_version_outdated(self) -> bool:
+		"""is_version_outdated的异步版本，默认在工作线程中调用同步方法"""
+		return await anyio.to_thread.run_sync(lambda: self.is_version_outdated)
+
+	def resolve_asset_patterns(self, *patterns: str) -> set[LocalFileName]:
+		"""返回加载资源路径匹配patterns的资源所需的全部文件（包括传递依赖）的本地文件名
+
+		清单中包含资源与依赖信息的子类需要重写该方法。
+		"""
+		raise NotImplementedError(f'{type(self).__name__}不支持按资源路径筛选')
+
+	async def aresolve_asset_patterns(self, *patterns: str) -> set[LocalFileName]:
+		"""resolve_asset_patterns的异步版本，默认在工作线程中调用同步方法"""
+		return await anyio.to_thread.run_sync(
+			lambda: self.resolve_asset_patterns(*patterns)
+		)
+
+	def clear_remote_cache(self) -> None:
+		"""清除缓存的远程版本号与清单，缓存远程结果的子类需要重写该方法"""
+
+	@staticmethod
+	def _diff_manifest(
+		remote_manifest: Manifest, local_manifest: Manifest, patterns: tuple[str, ...]
+	) -> Manifest | None:
+		from .diff import diff_manifest_items
+
+		diff = diff_manifest_items(
+			remote_manifest.items, local_manifest.items, patterns
+		)
+		if not diff.updated:
+			return None
+
+		return Manifest(version=remote_manifest.version, items=diff.updated)
+
+	def diff_manifest(self, *patterns: str) -> 'ManifestDiff':
+		"""比对本地与远程清单，返回新增、变化与删除的项"""
+		from .diff import diff_manifest_items
+
+		return diff_manifest_items(
+			self.get_remote_manifest().items, self.load_local_manifest().items, patterns
+		)
+
 	def generate_update_manifest(self, *patterns: str) -> Manifest | None:
 		"""
 		比对本地与远程清单，返回需要更新的资源。
@@ -150,25 +259,53 @@ class AbstractVersionManager(ABC):
 		"""
 		remote_manifest = self.get_remote_manifest()
 		local_manifest = self.load_local_manifest()
-		remote_version = remote_manifest.version
-		remote_items = remote_manifest.filter_local_filenames_by_glob(*patterns).items
-		local_items = local_manifest.filter_local_filenames_by_glob(*patterns).items
+		return self._diff_manifest(remote_manifest, local_manifest, patterns)
 
-		if local_items == remote_items or not remote_items:
-			return None
+	async def agenerate_update_manifest(self, *patterns: str) -> Manifest | None:
+		"""generate_update_manifest的异步版本"""
+		remote_manifest = await self.aget_remote_manifest()
+		local_manifest = await anyio.to_thread.run_sync(self.load_local_manifest)
+		return self._diff_manifest(remote_manifest, local_manifest, patterns)
 
-		def needs_update(item: tuple[LocalFileName, ManifestItem]) -> bool:
-			local_fn, remote_manifest_item = item
-			try:
-				return local_items[local_fn].file_hash != remote_manifest_item.file_hash
-			except KeyError:
-				return True
+	def gc(
+		self, *patterns: str, dry_run: bool = False, remove_empty_dirs: bool = True
+	) -> 'GcResult':
+		"""删除本地清单中有、远程清单中已经没有的文件，并从本地清单中移除对应的项
 
-		items = filter(needs_update, remote_items.items())
-		if not items:
-			return None
+		Args:
+			*patterns: glob模式，只清理匹配的文件，为空时清理所有孤立文件
+			dry_run: 为True时只返回将要删除的文件，不修改磁盘与本地清单
+			remove_empty_dirs: 是否删除因此变为空的目录，本地清单所在的目录不会被删除
+		"""
+		from .cleanup import remove_orphaned_files
+		from .diff import diff_manifest_items
 
-		return Manifest(version=remote_version, items=dict(items))
+		local_manifest = self.load_local_manifest()
+		removed = diff_manifest_items(
+			self.get_remote_manifest().items, local_manifest.items, patterns
+		).removed
+		result = remove_orphaned_files(
+			removed,
+			dry_run=dry_run,
+			remove_empty_dirs=remove_empty_dirs,
+			protected_dirs=(Path(self.local_manifest_path).absolute().parent,),
+		)
+		if dry_run or not removed:
+			return result
+
+		# 删除失败的文件保留在清单中，下次清理时重试
+		failed = set(result.failed)
+		self.save_manifest_to_local(
+			Manifest(
+				version=local_manifest.version,
+				items={
+					local_fn: item
+					for local_fn, item in local_manifest.items.items()
+					if local_fn not in removed or Path(local_fn).absolute() in failed
+				},
+			)
+		)
+		return result
 
 	def save_remote_manifest(self) -> None:
 		"""保存远程资源清单到本地"""
@@ -0,0 +1,246 @@
+from array import array
+from collections.abc import Iterable, Iterator, Mapping
+from typing import Any
+
+from albi0.utils import gc_paused
+
+from .yoo_version_manager import (
+	LazyPackageManifest,
+	OutputNameType,
+	PackageAssetInfo,
+	PackageBundleInfo,
+	PackageManifest,
+	YooManifestParser,
+)
+
+_NONE = -1
+"""可为None的列中表示None的值"""
+
+
+class StringTable:
+	"""驻留字符串表，相同的字符串只保存一次，列中只保存其序号"""
+
+	def __init__(self) -> None:
+		self.strings: list[str] = []
+		self._index: dict[str, int] = {}
+
+	def add(self, value: str) -> int:
+		if (index := self._index.get(value)) is None:
+			index = self._index[value] = len(self.strings)
+			self.strings.append(value)
+		return index
+
+	def find(self, value: str) -> int | None:
+		"""返回字符串的序号，不存在时返回None"""
+		return self._index.get(value)
+
+	def __getitem__(self, index: int) -> str:
+		return self.strings[index]
+
+	def __len__(self) -> int:
+		return len(self.strings)
+
+
+class RaggedArray:
+	"""以偏移量索引的不定长整数数组，第i行为values[offsets[i]:offsets[i + 1]]"""
+
+	def __init__(self, typecode: str = 'i') -> None:
+		self.values = array(typecode)
+		self.offsets = array('q', [0])
+
+	def append(self, row: Iterable[int]) -> None:
+		self.values.extend(row)
+		self.offsets.append(len(self.values))
+
+	def __getitem__(self, index: int) -> list[int]:
+		return self.values[self.offsets[index] : self.offsets[index + 1]].tolist()
+
+	def __len__(self) -> int:
+		return len(self.offsets) - 1
+
+
+class CompactPackageManifest:
+	"""列式存储的包清单
+
+	整数字段保存在array中，DependIDs、ReferenceIDs与Tags保存为RaggedArray，
+	字符串字段只保存StringTable中的序号，每条记录不再是独立的dict与list。
+	按需通过bundle()、asset()等方法还原为TypedDict，to_manifest()还原完整清单。
+	"""
+
+	def __init__(self, header: Mapping[str, Any]) -> None:
+		self.header = {
+			key: header[key]
+			for key in (
+				'FileVersion',
+				'EnableAddressable',
+				'LocationToLower',
+				'IncludeAssetGUID',
+				'OutputNameType',
+				'PackageName',
+				'PackageVersion',
+			)
+		}
+		self.strings = StringTable()
+
+		self.asset_address = array('i')
+		self.asset_path = array('i')
+		self.asset_guid = array('i')
+		self.asset_tags = RaggedArray()
+		self.asset_bundle_id = array('i')
+		self.asset_depend_ids = RaggedArray()
+
+		self.bundle_name = array('i')
+		self.bundle_unity_crc = array('q')
+		self.bundle_file_hash = array('i')
+		self.bundle_file_crc = array('i')
+		self.bundle_file_size = array('q')
+		self.bundle_is_raw_file = array('b')
+		self.bundle_load_method = array('B')
+		self.bundle_tags = RaggedArray()
+		self.bundle_reference_ids = RaggedArray()
+
+		# 字符串序号到行号的索引，首次查找时建立
+		self._bundle_rows: dict[int, int] | None = None
+		self._asset_rows: dict[int, int] | None = None
+
+	@classmethod
+	def from_manifest(
+		cls, manifest: PackageManifest | LazyPackageManifest
+	) -> 'CompactPackageManifest':
+		"""从清单创建，传入LazyPackageManifest时不会创建完整的记录列表"""
+		compact = cls(manifest)
+		for info in manifest['PackageAssetInfos']:
+			compact.add_asset_info(info)
+		for bundle in manifest['BundleList']:
+			compact.add_bundle(bundle)
+		return compact
+
+	@classmethod
+	def from_bytes(
+		cls, data: bytes, parser: YooManifestParser | None = None
+	) -> 'CompactPackageManifest':
+		"""逐条解析二进制清单并直接写入列中
+
+		重写了解析方法的解析器不支持按需解析，此时先完整解析再转换
+		"""
+		parser = parser or YooManifestParser()
+		# 逐条解析的记录写入列后即被丢弃，暂停垃圾回收
+		with gc_paused():
+			if not parser.supports_lazy:
+				return cls.from_manifest(parser(data))
+			return cls.from_manifest(parser.parse_lazy(data))
+
+	@property
+	def asset_count(self) -> int:
+		return len(self.asset_bundle_id)
+
+	@property
+	def bundle_count(self) -> int:
+		return len(self.bundle_file_size)
+
+	def _optional_string(self, value: str | None) -> int:
+		return _NONE if value is None else self.strings.add(value)
+
+	def add_asset_info(self, info: PackageAssetInfo) -> None:
+		add = self.strings.add
+		self.asset_address.append(add(info['Address']))
+		self.asset_path.append(add(info['AssetPath']))
+		self.asset_guid.append(self._optional_string(info['AssetGUID']))
+		self.asset_tags.append(map(add, info['AssetTags']))
+		self.asset_bundle_id.append(info['BundleID'])
+		self.asset_depend_ids.append(info['DependIDs'])
+		self._asset_rows = None
+
+	def add_bundle(self, bundle: PackageBundleInfo) -> None:
+		add = self.strings.add
+		unity_crc = bundle['UnityCRC']
+		self.bundle_name.append(add(bundle['BundleName']))
+		self.bundle_unity_crc.append(_NONE if unity_crc is None else unity_crc)
+		self.bundle_file_hash.append(add(bundle['FileHash']))
+		self.bundle_file_crc.append(add(bundle['FileCRC']))
+		self.bundle_file_size.append(bundle['FileSize'])
+		self.bundle_is_raw_file.append(bundle['IsRawFile'])
+		self.bundle_load_method.append(bundle['LoadMethod'])
+		self.bundle_tags.append(map(add, bundle['Tags']))
+		self.bundle_reference_ids.append(bundle['ReferenceIDs'])
+		self._bundle_rows = None
+
+	def asset(self, index: int) -> PackageAssetInfo:
+		"""还原第index条资源信息"""
+		strings = self.strings.strings
+		guid = self.asset_guid[index]
+		return PackageAssetInfo(
+			Address=strings[self.asset_address[index]],
+			AssetPath=strings[self.asset_path[index]],
+			AssetGUID=None if guid == _NONE else strings[guid],
+			AssetTags=[strings[i] for i in self.asset_tags[index]],
+			BundleID=self.asset_bundle_id[index],
+			DependIDs=self.asset_depend_ids[index],
+		)
+
+	def bundle(self, index: int) -> PackageBundleInfo:
+		"""还原第index条Bundle信息"""
+		strings = self.strings.strings
+		unity_crc = self.bundle_unity_crc[index]
+		return PackageBundleInfo(
+			BundleName=strings[self.bundle_name[index]],
+			UnityCRC=None if unity_crc == _NONE else unity_crc,
+			FileHash=strings[self.bundle_file_hash[index]],
+			FileCRC=strings[self.bundle_file_crc[index]],
+			FileSize=self.bundle_file_size[index],
+			IsRawFile=bool(self.bundle_is_raw_file[index]),
+			LoadMethod=self.bundle_load_method[index],
+			Tags=[strings[i] for i in self.bundle_tags[index]],
+			ReferenceIDs=self.bundle_reference_ids[index],
+		)
+
+	def find_bundle(self, bundle_name: str) -> int | None:
+		"""按名称查找Bundle的序号"""
+		if self._bundle_rows is None:
+			self._bundle_rows = {name: row for row, name in enumerate(self.bundle_name)}
+		string_id = self.strings.find(bundle_name)
+		return None if string_id is None else self._bundle_rows.get(string_id)
+
+	def find_asset(self, asset_path: str) -> int | None:
+		"""按资源路径查找资源信息的序号"""
+		if self._asset_rows is None:
+			self._asset_rows = {path: row for row, path in enumerate(self.asset_path)}
+		string_id = self.strings.find(asset_path)
+		return None if string_id is None else self._asset_rows.get(string_id)
+
+	def get_bundle(self, bundle_name: str) -> PackageBundleInfo | None:
+		index = self.find_bundle(bundle_name)
+		return None if index is None else self.bundle(index)
+
+	def get_asset(self, asset_path: str) -> PackageAssetInfo | None:
+		index = self.find_asset(asset_path)
+		return None if index is None else self.asset(index)
+
+	def asset_bundle(self, asset_path: str) -> PackageBundleInfo | None:
+		"""返回资源所在的Bundle信息"""
+		index = self.find_asset(asset_path)
+		return None if index is None else self.bundle(self.asset_bundle_id[index])
+
+	def iter_asset_infos(self) -> Iterator[PackageAssetInfo]:
+		return map(self.asset, range(self.asset_count))
+
+	def iter_bundles(self) -> Iterator[PackageBundleInfo]:
+		return map(self.bundle, range(self.bundle_count))
+
+	def to_manifest(self) -> PackageManifest:
+		"""还原为以TypedDict表示的完整清单"""
+		header = self.header
+		with gc_paused():
+			return PackageManifest(
+				FileVersion=header['FileVersion'],
+				EnableAddressable=header['EnableAddressable'],
+				LocationToLower=header['LocationToLower'],
+				IncludeAssetGUID=header['IncludeAssetGUID'],
+				OutputNameType=OutputNameType(header['OutputNameType']),
+				PackageName=header['PackageName'],
+				PackageVersion=header['PackageVersion'],
+				PackageAssetCount=self.asset_count,
+				PackageAssetInfos=list(self.iter_asset_infos()),
+				PackageBundleCount=self.bundle_count,
+				BundleList=list(self.iter_bundles()),
+			)
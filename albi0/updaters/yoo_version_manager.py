@@ -1,20 +1,31 @@
-from collections.abc import Callable
+from collections.abc import Callable, Iterator, Mapping
 from enum import IntEnum
+import os
 from pathlib import Path
 import time
 from typing import Any, Protocol, TypedDict
 
-import httpx
+import anyio
+import anyio.to_thread
 from packaging.version import Version
 
-from albi0.bytes_reader import BytesReader, LengthType
+from albi0 import request
+from albi0.bytes_reader import BytesReader, Field, LengthType, RecordSchema
+from albi0.update.diff import compile_patterns
+from albi0.update.manifest_codec import (
+	MANIFEST_SUFFIXES,
+	Compression,
+	dumps_manifest,
+	loads_manifest,
+)
+from albi0.update.metadata_cache import ManifestCache, MetadataCache
 from albi0.update.version import (
 	AbstractVersionManager,
 	LocalFileName,
 	Manifest,
 	ManifestItem,
 )
-from albi0.utils import join_path, join_url
+from albi0.utils import gc_paused, join_path, join_url
 
 
 class VersionProtocol(Protocol):
@@ -88,26 +99,141 @@ class PackageManifest(TypedDict):
 	BundleList: list[PackageBundleInfo]
 
 
+class BundleDependencyIndex:
+	"""资源路径到bundle的依赖索引
+
+	资源的DependIDs是其所在bundle依赖的bundle，一个bundle依赖的bundle为其中
+	所有资源的DependIDs的并集，沿着这些边求传递闭包即可得到加载资源所需的全部bundle。
+	"""
+
+	def __init__(self, manifest: PackageManifest) -> None:
+		self.bundle_names = [bundle['BundleName'] for bundle in manifest['BundleList']]
+		self.asset_paths = [
+			asset['AssetPath'] for asset in manifest['PackageAssetInfos']
+		]
+		self.asset_bundle_ids = [
+			asset['BundleID'] for asset in manifest['PackageAssetInfos']
+		]
+		self.bundle_depends: list[set[int]] = [set() for _ in self.bundle_names]
+		for asset in manifest['PackageAssetInfos']:
+			self.bundle_depends[asset['BundleID']].update(asset['DependIDs'])
+
+	def match_assets(self, *patterns: str) -> list[int]:
+		"""返回资源路径匹配任意glob模式的资源序号"""
+		match = compile_patterns(patterns)
+		if match is None:
+			return []
+		return [i for i, path in enumerate(self.asset_paths) if match(path)]
+
+	def resolve(self, *patterns: str) -> set[int]:
+		"""返回加载匹配的资源所需的全部bundle序号"""
+		closure: set[int] = set()
+		pending = [self.asset_bundle_ids[i] for i in self.match_assets(*patterns)]
+		while pending:
+			bundle_id = pending.pop()
+			if bundle_id in closure:
+				continue
+			closure.add(bundle_id)
+			pending.extend(self.bundle_depends[bundle_id] - closure)
+		return closure
+
+
+def newer_than(version: str) -> Callable[[str], bool]:
+	"""字段的版本条件：清单版本高于version时才包含该字段"""
+	threshold = Version(version)
+	return lambda file_version: Version(file_version) > threshold
+
+
+YOO_ASSET_INFO_SCHEMA = RecordSchema(
+	Field('Address', 'text'),
+	Field('AssetPath', 'text'),
+	Field('AssetGUID', 'text', when=newer_than('1.4.16')),
+	Field('AssetTags', 'text_list'),
+	Field('BundleID', 'int'),
+	Field('DependIDs', 'int_list'),
+)
+YOO_BUNDLE_INFO_SCHEMA = RecordSchema(
+	Field('BundleName', 'text'),
+	Field('UnityCRC', 'uint', when=newer_than('1.5.1')),
+	Field('FileHash', 'text'),
+	Field('FileCRC', 'text'),
+	Field('FileSize', 'long'),
+	Field('IsRawFile', 'boolean'),
+	Field('LoadMethod', 'byte'),
+	Field('Tags', 'text_list'),
+	Field('ReferenceIDs', 'int_list'),
+)
+
+
 def _create_empty_manifest() -> Manifest:
 	return Manifest(version='0', items={})
 
 
 class YooManifestParser:
-	"""清单解析器"""
+	"""清单解析器
+
+	资源信息与Bundle信息的记录布局由RecordSchema声明，
+	格式不同的变体只需要在子类中替换asset_info_schema与bundle_info_schema。
+	"""
+
+	asset_info_schema: RecordSchema = YOO_ASSET_INFO_SCHEMA
+	bundle_info_schema: RecordSchema = YOO_BUNDLE_INFO_SCHEMA
 
 	def __call__(self, data: bytes) -> PackageManifest:
 		return self.parse_manifest(data)
 
 	def parse_manifest(self, data: bytes) -> PackageManifest:
 		"""解析清单数据"""
-		reader = BytesReader(
+		reader = self._create_reader(data)
+		manifest = self._parse_header(reader)
+		version = manifest['FileVersion']
+		# 记录中的对象不含循环引用，解析期间暂停垃圾回收
+		with gc_paused():
+			count = reader.int()
+			manifest['PackageAssetCount'] = count
+			package_asset_infos = self._parse_asset_infos(reader, version, count)
+			manifest['PackageAssetInfos'] = package_asset_infos
+
+			count = reader.int()
+			manifest['PackageBundleCount'] = count
+			bundle_list = self._parse_bundle_list(reader, version, count)
+			manifest['BundleList'] = bundle_list
+		return manifest
+
+	def parse_lazy(self, data: bytes) -> 'LazyPackageManifest':
+		"""只解析清单头，资源信息与Bundle列表在访问时才逐条解析
+
+		按需解析直接使用asset_info_schema与bundle_info_schema，
+		不经过_parse_asset_infos与_parse_bundle_list。
+		"""
+		return LazyPackageManifest(self, data)
+
+	@property
+	def supports_lazy(self) -> bool:
+		"""解析结果是否只由schema决定，重写了解析方法的子类需要完整解析"""
+		cls = type(self)
+		return all(
+			getattr(cls, name) is getattr(YooManifestParser, name)
+			for name in (
+				'__call__',
+				'parse_manifest',
+				'_parse_asset_infos',
+				'_parse_bundle_list',
+			)
+		)
+
+	def _create_reader(self, data: bytes) -> BytesReader:
+		return BytesReader(
 			data,
 			length_type=LengthType.UINT16,
 			little_endian=True,
 		)
+
+	def _parse_header(self, reader: BytesReader) -> PackageManifest:
+		"""解析清单头，读取位置停在资源数量之前"""
 		reader.uint()
 		version = reader.text()
-		manifest = PackageManifest(
+		return PackageManifest(
 			FileVersion=version,
 			EnableAddressable=reader.boolean(),
 			LocationToLower=reader.boolean()
@@ -124,53 +250,90 @@ class YooManifestParser:
 			PackageBundleCount=0,
 			BundleList=[],
 		)
-		count = reader.int()
-		manifest['PackageAssetCount'] = count
-		package_asset_infos = self._parse_asset_infos(reader, version, count)
-		manifest['PackageAssetInfos'] = package_asset_infos
-
-		count = reader.int()
-		manifest['PackageBundleCount'] = count
-		bundle_list = self._parse_bundle_list(reader, version, count)
-		manifest['BundleList'] = bundle_list
-		return manifest
 
 	def _parse_asset_infos(
 		self, reader: BytesReader, version: str, count: int
 	) -> list[PackageAssetInfo]:
 		"""解析资源信息列表"""
-		return [
-			PackageAssetInfo(
-				Address=reader.text(),
-				AssetPath=reader.text(),
-				AssetGUID=reader.text()
-				if Version(version) > Version('1.4.16')
-				else None,
-				AssetTags=reader.text_list(),
-				BundleID=reader.int(),
-				DependIDs=reader.int_list(),
-			)
-			for _ in range(count)
-		]
+		return self.asset_info_schema.read_list(reader, count, version)
 
 	def _parse_bundle_list(
 		self, reader: BytesReader, version: str, count: int
 	) -> list[PackageBundleInfo]:
 		"""解析Bundle列表"""
-		return [
-			PackageBundleInfo(
-				BundleName=reader.text(),
-				UnityCRC=reader.uint() if Version(version) > Version('1.5.1') else None,
-				FileHash=reader.text(),
-				FileCRC=reader.text(),
-				FileSize=reader.long(),
-				IsRawFile=reader.boolean(),
-				LoadMethod=reader.byte(),
-				Tags=reader.text_list(),
-				ReferenceIDs=reader.int_list(),
+		return self.bundle_info_schema.read_list(reader, count, version)
+
+
+class LazyPackageManifest(Mapping[str, Any]):
+	"""按需解析的清单
+
+	创建时只读取清单头，PackageAssetInfos与BundleList在访问时才逐条解析，
+	每次访问都返回新的迭代器。只遍历Bundle列表时，
+	资源信息部分只读取字符串与列表的长度前缀即被跳过，不会创建任何记录。
+	"""
+
+	def __init__(self, parser: YooManifestParser, data: bytes) -> None:
+		self._parser = parser
+		self._data = data
+		reader = parser._create_reader(data)
+		self._header = parser._parse_header(reader)
+		self._header['PackageAssetCount'] = reader.int()
+		self._asset_offset = reader.offset
+		self._bundle_offset: int | None = None
+
+	@property
+	def file_version(self) -> str:
+		return self._header['FileVersion']
+
+	def _reader_at(self, offset: int) -> BytesReader:
+		reader = self._parser._create_reader(self._data)
+		reader.offset = offset
+		return reader
+
+	def _locate_bundles(self) -> int:
+		"""跳过资源信息，定位到Bundle列表的开头"""
+		if self._bundle_offset is None:
+			reader = self._reader_at(self._asset_offset)
+			self._parser.asset_info_schema.skip(
+				reader, self._header['PackageAssetCount'], self.file_version
 			)
-			for _ in range(count)
-		]
+			self._header['PackageBundleCount'] = reader.int()
+			self._bundle_offset = reader.offset
+		return self._bundle_offset
+
+	def iter_asset_infos(self) -> Iterator[PackageAssetInfo]:
+		"""逐条解析资源信息"""
+		return self._parser.asset_info_schema.iter_records(
+			self._reader_at(self._asset_offset),
+			self._header['PackageAssetCount'],
+			self.file_version,
+		)  # type: ignore
+
+	def iter_bundles(self) -> Iterator[PackageBundleInfo]:
+		"""逐条解析Bundle信息"""
+		reader = self._reader_at(self._locate_bundles())
+		return self._parser.bundle_info_schema.iter_records(
+			reader, self._header['PackageBundleCount'], self.file_version
+		)  # type: ignore
+
+	def to_manifest(self) -> PackageManifest:
+		"""解析全部记录，得到完整的PackageManifest"""
+		return self._parser.parse_manifest(self._data)
+
+	def __getitem__(self, key: str) -> Any:
+		if key == 'PackageAssetInfos':
+			return self.iter_asset_infos()
+		if key == 'BundleList':
+			return self.iter_bundles()
+		if key == 'PackageBundleCount':
+			self._locate_bundles()
+		return self._header[key]
+
+	def __iter__(self) -> Iterator[str]:
+		return iter(self._header)
+
+	def __len__(self) -> int:
+		return len(self._header)
 
 
 class YooVersionManager(AbstractVersionManager):
@@ -182,6 +345,10 @@ class YooVersionManager(AbstractVersionManager):
 		local_path: str,
 		manifest_factory: Callable[[bytes], PackageManifest] = YooManifestParser(),
 		version_factory: type[VersionProtocol | float] = Version,
+		headers: Mapping[str, str] | None = None,
+		metadata_cache: MetadataCache | None = None,
+		manifest_cache: ManifestCache | None = None,
+		manifest_compression: Compression | None = None,
 	) -> None:
 		super().__init__()
 		self.package_name = package_name
@@ -189,21 +356,44 @@ class YooVersionManager(AbstractVersionManager):
 		self.local_path = local_path
 		self.manifest_factory = manifest_factory
 		self.version_factory = version_factory
-
-		self._local_manifest_path = join_path(
-			self.local_path, f'PackageManifest_{self.package_name}.json'
-		)
+		self.headers = dict(headers or {})
+		self.metadata_cache = metadata_cache
+		"""版本文件与清单的磁盘缓存，为None时不使用缓存"""
+		self.manifest_cache = manifest_cache
+		"""解析后的清单缓存，为None时不使用缓存"""
+		self.manifest_compression = manifest_compression
+		"""保存本地清单时的压缩格式，读取时根据文件头自动识别"""
+
+		self._local_manifest_path: str | None = None
+		"""自定义的本地清单路径，为None时根据压缩格式使用默认路径"""
 		self.version_basename = f'PackageManifest_{self.package_name}.version'
+		# 一次运行内缓存远程版本号与清单，同步与异步接口共用
+		self._remote_version: str | None = None
+		self._remote_manifest: Manifest | None = None
+		self._remote_manifest_data: bytes | None = None
+		"""本次运行下载的原始清单，按资源路径筛选时用于建立依赖索引，避免重复下载"""
+		self._dependency_index: BundleDependencyIndex | None = None
+		self._remote_lock = anyio.Lock()
+
+	def _default_manifest_path(self, compression: Compression | None) -> str:
+		return join_path(
+			self.local_path,
+			f'PackageManifest_{self.package_name}{MANIFEST_SUFFIXES[compression]}',
+		)
 
 	@property
 	def local_manifest_path(self) -> str:
-		return self._local_manifest_path
+		if self._local_manifest_path is not None:
+			return self._local_manifest_path
+		return self._default_manifest_path(self.manifest_compression)
 
 	@local_manifest_path.setter
 	def local_manifest_path(self, manifest_path: str) -> None:
 		self._local_manifest_path = manifest_path
 
-	def _simplify_manifest(self, data: PackageManifest) -> Manifest:
+	def _simplify_manifest(
+		self, data: PackageManifest | LazyPackageManifest
+	) -> Manifest:
 		"""将远程清单转换为Manifest实例。"""
 		version = data['PackageVersion']
 		items = {}
@@ -215,44 +405,233 @@ class YooVersionManager(AbstractVersionManager):
 				join_url(self.remote_path, remote_filehash),
 				f'{local_basename}.bundle',
 				remote_filehash.encode(),
+				item['FileSize'],
+				item['FileCRC'],
 			)
 		return Manifest(version=version, items=items)
 
-	def get_remote_version(self) -> str:
-		"""获取远程版本号"""
-		remote_version_url = join_url(self.remote_path, self.version_basename)
-		response = httpx.get(
-			remote_version_url,
-			params={'t': int(time.time() * 1000)},
+	def clear_remote_cache(self) -> None:
+		self._remote_version = None
+		self._remote_manifest = None
+		self._remote_manifest_data = None
+		self._dependency_index = None
+		self._remote_lock = anyio.Lock()
+
+	def _remote_version_url(self) -> str:
+		return join_url(self.remote_path, self.version_basename)
+
+	def _remote_manifest_url(self, version: str) -> str:
+		return join_url(
+			self.remote_path, f'PackageManifest_{self.package_name}_{version}.bytes'
 		)
+
+	def _request_params(self) -> dict[str, int]:
+		return {'t': int(time.time() * 1000)}
+
+	def _manifest_cache_namespace(self) -> str:
+		# 解析方式与路径不同时，相同版本的清单也会得到不同的结果
+		return '|'.join(
+			(
+				type(self).__qualname__,
+				type(self.manifest_factory).__qualname__,
+				self.remote_path,
+				self.local_path,
+			)
+		)
+
+	def _load_cached_manifest(self, version: str) -> Manifest | None:
+		if self.manifest_cache is None:
+			return None
+		return self.manifest_cache.load(
+			self.package_name, version, self._manifest_cache_namespace()
+		)
+
+	def _parse_remote_manifest(self, data: bytes, version: str) -> Manifest:
+		# 更新只需要Bundle列表，解析结果只由schema决定时可以跳过资源信息而不创建记录
+		factory = self.manifest_factory
+		with gc_paused():
+			manifest = self._simplify_manifest(
+				factory.parse_lazy(data)
+				if isinstance(factory, YooManifestParser) and factory.supports_lazy
+				else factory(data)
+			)
+		if self.manifest_cache is not None:
+			self.manifest_cache.save(
+				self.package_name, version, manifest, self._manifest_cache_namespace()
+			)
+		return manifest
+
+	def _remote_manifest_cache_key(self) -> str:
+		# 各版本的清单共用一个缓存键，新版本覆盖旧版本，缓存不会无限增长
+		return join_url(self.remote_path, f'PackageManifest_{self.package_name}.bytes')
+
+	def _fetch(
+		self, url: str, *, immutable: bool = False, cache_key: str | None = None
+	) -> bytes:
+		client = request.get_sync_client()
+		params = self._request_params()
+		if self.metadata_cache is not None:
+			return self.metadata_cache.get(
+				client,
+				url,
+				immutable=immutable,
+				params=params,
+				headers=self.headers,
+				key=cache_key,
+			)
+		response = client.get(url, params=params, headers=self.headers)
+		response.raise_for_status()
+		return response.content
+
+	async def _afetch(
+		self, url: str, *, immutable: bool = False, cache_key: str | None = None
+	) -> bytes:
+		client = request.get_client()
+		params = self._request_params()
+		if self.metadata_cache is not None:
+			return await self.metadata_cache.aget(
+				client,
+				url,
+				immutable=immutable,
+				params=params,
+				headers=self.headers,
+				key=cache_key,
+			)
+		response = await client.get(url, params=params, headers=self.headers)
 		response.raise_for_status()
-		result = response.text
-		return result
+		return response.content
+
+	def get_remote_version(self) -> str:
+		"""获取远程版本号，一次运行内只请求一次"""
+		if self._remote_version is None:
+			self._remote_version = self._fetch(self._remote_version_url()).decode()
+		return self._remote_version
+
+	async def aget_remote_version(self) -> str:
+		"""使用共享的异步客户端获取远程版本号，一次运行内只请求一次"""
+		async with self._remote_lock:
+			if self._remote_version is None:
+				data = await self._afetch(self._remote_version_url())
+				self._remote_version = data.decode()
+		return self._remote_version
 
 	def load_local_version(self) -> str:
 		"""加载本地版本号"""
 		return self.load_local_manifest().version
 
 	def get_remote_manifest(self) -> Manifest:
-		remote_manifest_url = join_url(
-			self.remote_path,
-			f'PackageManifest_{self.package_name}_{self.get_remote_version()}.bytes',
-		)
-		response = httpx.get(remote_manifest_url, params={'t': int(time.time() * 1000)})
-		response.raise_for_status()
-		manifest_dict = self.manifest_factory(response.content)
-		return self._simplify_manifest(manifest_dict)
+		if self._remote_manifest is None:
+			version = self.get_remote_version()
+			manifest = self._load_cached_manifest(version)
+			if manifest is None:
+				data = self._fetch_remote_manifest_data(version)
+				manifest = self._parse_remote_manifest(data, version)
+			self._remote_manifest = manifest
+		return self._remote_manifest
+
+	def _fetch_remote_manifest_data(self, version: str) -> bytes:
+		"""下载原始清单，一次运行内只下载一次"""
+		if self._remote_manifest_data is None:
+			# 清单的URL中带有版本号，内容不会改变
+			self._remote_manifest_data = self._fetch(
+				self._remote_manifest_url(version),
+				immutable=True,
+				cache_key=self._remote_manifest_cache_key(),
+			)
+		return self._remote_manifest_data
+
+	async def _afetch_remote_manifest_data(self, version: str) -> bytes:
+		"""异步下载原始清单，需要在持有_remote_lock时调用"""
+		if self._remote_manifest_data is None:
+			self._remote_manifest_data = await self._afetch(
+				self._remote_manifest_url(version),
+				immutable=True,
+				cache_key=self._remote_manifest_cache_key(),
+			)
+		return self._remote_manifest_data
+
+	async def aget_remote_manifest(self) -> Manifest:
+		version = await self.aget_remote_version()
+		async with self._remote_lock:
+			if self._remote_manifest is None:
+				manifest = await anyio.to_thread.run_sync(
+					self._load_cached_manifest, version
+				)
+				if manifest is None:
+					data = await self._afetch_remote_manifest_data(version)
+					# 解析较大的清单耗时较长，放到工作线程中避免阻塞事件循环
+					manifest = await anyio.to_thread.run_sync(
+						self._parse_remote_manifest, data, version
+					)
+				self._remote_manifest = manifest
+		return self._remote_manifest
+
+	def _bundle_local_filenames(
+		self, index: BundleDependencyIndex, bundle_ids: set[int]
+	) -> set[LocalFileName]:
+		return {
+			LocalFileName(join_path(self.local_path, index.bundle_names[i]))
+			for i in bundle_ids
+		}
+
+	def get_dependency_index(self) -> BundleDependencyIndex:
+		"""获取远程清单的依赖索引，一次运行内只解析一次"""
+		if self._dependency_index is None:
+			data = self._fetch_remote_manifest_data(self.get_remote_version())
+			self._dependency_index = BundleDependencyIndex(self.manifest_factory(data))
+		return self._dependency_index
+
+	def resolve_asset_patterns(self, *patterns: str) -> set[LocalFileName]:
+		"""返回加载资源路径匹配patterns的资源所需的全部bundle的本地文件名"""
+		index = self.get_dependency_index()
+		return self._bundle_local_filenames(index, index.resolve(*patterns))
+
+	async def aresolve_asset_patterns(self, *patterns: str) -> set[LocalFileName]:
+		version = await self.aget_remote_version()
+		async with self._remote_lock:
+			if self._dependency_index is None:
+				# 简化后的清单不包含资源信息，需要重新解析原始清单，
+				# 本次运行已经下载过的清单不会重复下载
+				data = await self._afetch_remote_manifest_data(version)
+				self._dependency_index = await anyio.to_thread.run_sync(
+					lambda: BundleDependencyIndex(self.manifest_factory(data))
+				)
+			index = self._dependency_index
+		return self._bundle_local_filenames(index, index.resolve(*patterns))
+
+	def _find_local_manifest(self) -> Path | None:
+		"""查找本地清单，更改压缩格式后仍能读取之前以其他格式保存的默认清单"""
+		path = Path(self.local_manifest_path)
+		if path.is_file():
+			return path
+		if self._local_manifest_path is None:
+			for compression in MANIFEST_SUFFIXES:
+				other = Path(self._default_manifest_path(compression))
+				if other.is_file():
+					return other
+		return None
 
 	def load_local_manifest(self) -> Manifest:
-		if not self.is_local_version_exists:
+		path = self._find_local_manifest()
+		if path is None:
 			return _create_empty_manifest()
 
-		return Manifest.from_json(Path(self.local_manifest_path).read_bytes())
+		return loads_manifest(path.read_bytes())
 
 	def save_manifest_to_local(self, manifest: Manifest) -> None:
 		local_manifest_path = Path(self.local_manifest_path)
 		local_manifest_path.parent.mkdir(parents=True, exist_ok=True)
-		local_manifest_path.write_text(manifest.to_json())
+		# 先写入临时文件再替换，保存过程中意外退出不会损坏已有的清单
+		temp_path = local_manifest_path.with_name(f'{local_manifest_path.name}.tmp')
+		temp_path.write_bytes(dumps_manifest(manifest, self.manifest_compression))
+		os.replace(temp_path, local_manifest_path)
+		if self._local_manifest_path is None:
+			# 删除以其他压缩格式保存的旧清单
+			for compression in MANIFEST_SUFFIXES:
+				if compression != self.manifest_compression:
+					Path(self._default_manifest_path(compression)).unlink(
+						missing_ok=True
+					)
 
 	@property
 	def is_version_outdated(self) -> bool:
@@ -262,7 +641,14 @@ class YooVersionManager(AbstractVersionManager):
 			self.version_factory(local_version) < self.version_factory(remote_version)
 		)
 
+	async def ais_version_outdated(self) -> bool:
+		remote_version = await self.aget_remote_version() or '0'
+		local_version = await anyio.to_thread.run_sync(self.load_local_version) or '0'
+		return not self.is_local_version_exists or (
+			self.version_factory(local_version) < self.version_factory(remote_version)
+		)
+
 	@property
 	def is_local_version_exists(self) -> bool:
 		"""检查本地版本是否存在"""
-		return Path(self.local_manifest_path).is_file()
+		return self._find_local_manifest() is not None
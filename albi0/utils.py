@@ -2,6 +2,7 @@ from collections.abc import Generator, Iterable, Iterator
 from contextlib import contextmanager
 import fnmatch
 import functools
+import gc
 import gzip
 import hashlib
 import itertools
@@ -111,9 +112,38 @@ def set_directory(path: PathTypes):
 		os.chdir(origin)
 
 
+@contextmanager
+def gc_paused() -> Iterator[None]:
+	"""暂停垃圾回收
+
+	解码清单时会创建大量不含循环引用的对象，频繁触发的完整回收没有任何收益。
+	"""
+	enabled = gc.isenabled()
+	gc.disable()
+	try:
+		yield
+	finally:
+		if enabled:
+			gc.enable()
+
+
 T_Path = TypeVar('T_Path', bound=PathTypes)
 
 
+_SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024**2, 'G': 1024**3}
+
+
+def parse_size(value: str) -> int:
+	"""解析带单位的字节数，如 "512K"、"10M"、"1.5G"，单位不区分大小写，可带B后缀"""
+	text = value.strip().upper().removesuffix('B')
+	unit = text[-1:] if text[-1:] in _SIZE_UNITS else ''
+	number = text[: len(text) - len(unit)]
+	try:
+		return int(float(number) * _SIZE_UNITS[unit])
+	except ValueError:
+		raise ValueError(f'无法解析的大小：{value}') from None
+
+
 def join_path(path: T_Path, *args: PathTypes) -> T_Path:
 	import os
 
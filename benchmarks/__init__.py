@@ -0,0 +1 @@
+"""离线性能基准测试，不依赖真实的资源服务器"""
@@ -0,0 +1,115 @@
+"""BytesReader各个基本类型的微基准测试
+
+用法::
+
+	python -m benchmarks.bench_bytes_reader --count 200000
+
+对比每次读取都切片复制、重新构造格式字符串的旧实现，
+与使用预编译struct.Struct的BytesReader（分别读取bytes与memoryview）。
+"""
+
+from collections.abc import Callable
+import struct
+import time
+from typing import Any
+
+import click
+
+from albi0.bytes_reader import BytesReader, LengthType, Writer
+
+
+class LegacyBytesReader(BytesReader):
+	"""旧的BytesReader实现，每次读取都切片复制并调用struct.unpack"""
+
+	def read(self, length: int | None = None, tag: str = '') -> bytes:
+		if length is None:
+			slice_data = self.data[self.offset :]
+			self.offset = len(self.data)
+		else:
+			slice_data = self.data[self.offset : self.offset + length]
+			self.offset += length
+		return bytes(slice_data)
+
+	def _unpack(self, code: str, little_endian: bool | None) -> Any:
+		if little_endian is None:
+			little_endian = self.little_endian
+		data = self.read(struct.calcsize(code))
+		format_str = f'<{code}' if little_endian else f'>{code}'
+		return struct.unpack(format_str, data)[0]
+
+	def text(self) -> str:
+		length = self.ushort()
+		if length > 0:
+			return self.read(length).decode('utf-8')
+		return ''
+
+	def text_list(self) -> list[str]:
+		length = self.ushort()
+		return [self.text() for _ in range(length)]
+
+	def int_list(self) -> list[int]:
+		length = self.ushort()
+		return [self.int() for _ in range(length)]
+
+
+def _text(value: str) -> bytes:
+	encoded = value.encode()
+	return Writer.ushort(len(encoded)) + encoded
+
+
+# 每种基本类型的单条记录
+RECORDS: dict[str, bytes] = {
+	'byte': b'\x07',
+	'short': Writer.short(-2),
+	'ushort': Writer.ushort(2),
+	'int': Writer.int(-3),
+	'uint': Writer.uint(3),
+	'long': Writer.long(-4),
+	'ulong': Writer.ulong(4),
+	'float': Writer.float(1.5),
+	'double': Writer.double(2.5),
+	'text': _text('assets/bench/bundle_000001.bundle'),
+	'text_list': Writer.ushort(2) + _text('tag_a') + _text('tag_b'),
+	'int_list': Writer.ushort(4) + b''.join(Writer.int(i) for i in range(4)),
+}
+
+
+def time_reads(
+	reader_factory: Callable[[Any], BytesReader], name: str, data: Any, count: int
+) -> float:
+	reader = reader_factory(data)
+	method = getattr(reader, name)
+	start = time.perf_counter()
+	for _ in range(count):
+		method()
+	elapsed = time.perf_counter() - start
+	assert reader.offset == len(data)
+	return elapsed
+
+
+@click.command(help='测试BytesReader各个基本类型的读取性能')
+@click.option('--count', default=200_000, show_default=True, help='每种类型的读取次数')
+def main(count: int) -> None:
+	def legacy(data: Any) -> BytesReader:
+		return LegacyBytesReader(bytes(data), length_type=LengthType.UINT16)
+
+	def current(data: Any) -> BytesReader:
+		return BytesReader(data, length_type=LengthType.UINT16)
+
+	click.echo(f'# 每种类型读取{count}次，单位为每次读取的纳秒数')
+	click.echo(
+		f'{"类型":<10} {"旧实现":>8} {"bytes":>8} {"memoryview":>11} {"加速比":>8}'
+	)
+	for name, record in RECORDS.items():
+		data = record * count
+		old = time_reads(legacy, name, data, count)
+		new = time_reads(current, name, data, count)
+		view = time_reads(current, name, memoryview(bytearray(data)), count)
+		click.echo(
+			f'{name:<10} {old / count * 1e9:>8.0f} {new / count * 1e9:>8.0f} '
+			f'{view / count * 1e9:>11.0f} {old / new:>8.1f}x'
+		)
+
+
+if __name__ == '__main__':
+	main()
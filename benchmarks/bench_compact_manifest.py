@@ -0,0 +1,67 @@
+"""列式清单的内存占用基准测试
+
+用法::
+
+	python -m benchmarks.bench_compact_manifest --bundles 100000
+
+对比以TypedDict列表表示的PackageManifest与CompactPackageManifest的内存占用
+（tracemalloc统计的新分配内存），以及二者的构建耗时。
+"""
+
+from collections.abc import Callable
+import gc
+import time
+import tracemalloc
+
+import click
+
+from albi0.plugins.newseer import NewseerManifestParser
+from albi0.updaters.compact_manifest import CompactPackageManifest
+from albi0.updaters.yoo_version_manager import YooManifestParser
+from benchmarks.yoo_cdn import CdnSpec, build_manifest_bytes, synthetic_bundles
+
+PARSERS: dict[str, tuple[bool, YooManifestParser]] = {
+	'YooAsset': (False, YooManifestParser()),
+	'Newseer': (True, NewseerManifestParser()),
+}
+
+
+def measure(build: Callable[[], object]) -> tuple[object, int, float]:
+	"""返回构建结果、其占用的内存字节数与耗时"""
+	gc.collect()
+	tracemalloc.start()
+	start = time.perf_counter()
+	result = build()
+	elapsed = time.perf_counter() - start
+	gc.collect()
+	size, _ = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+	return result, size, elapsed
+
+
+@click.command(help='测试列式清单的内存占用')
+@click.option('--bundles', default=100_000, show_default=True, help='bundle数量')
+def main(bundles: int) -> None:
+	click.echo(f'# bundle数量: {bundles}，tracemalloc下的耗时仅供相对比较')
+	click.echo(
+		f'{"格式":<10} {"原始(MiB)":>10} {"TypedDict(MiB)":>15} {"列式(MiB)":>10} '
+		f'{"TypedDict(ms)":>14} {"列式(ms)":>10}'
+	)
+	for name, (newseer, parser) in PARSERS.items():
+		spec = CdnSpec(bundle_count=bundles, newseer=newseer)
+		data = build_manifest_bytes(spec, synthetic_bundles(spec))
+		manifest, dict_size, dict_time = measure(lambda p=parser, d=data: p(d))
+		del manifest
+		compact, compact_size, compact_time = measure(
+			lambda p=parser, d=data: CompactPackageManifest.from_bytes(d, p)
+		)
+		del compact
+		click.echo(
+			f'{name:<10} {len(data) / 1024**2:>10.1f} {dict_size / 1024**2:>15.1f} '
+			f'{compact_size / 1024**2:>10.1f} {dict_time * 1000:>14.0f} '
+			f'{compact_time * 1000:>10.0f}'
+		)
+
+
+if __name__ == '__main__':
+	main()
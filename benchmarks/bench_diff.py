@@ -0,0 +1,110 @@
+"""清单比对的基准测试
+
+用法::
+
+	python -m benchmarks.bench_diff --items 100000
+
+对比逐项调用fnmatch的旧实现与预编译模式、一次遍历的diff_manifest_items。
+"""
+
+from collections.abc import Callable
+from fnmatch import fnmatch
+import random
+import time
+
+import click
+
+from albi0.update.diff import diff_manifest_items
+from albi0.update.version import LocalFileName, ManifestItem
+
+ItemDict = dict[LocalFileName, ManifestItem]
+
+PATTERNS = {
+	'无模式': (),
+	'1个模式': ('*_000*',),
+	'8个模式': tuple(f'*_{i:03d}*' for i in range(8)),
+}
+
+
+def make_items(
+	count: int, changed_ratio: float, seed: int
+) -> tuple[ItemDict, ItemDict]:
+	"""生成远程与本地清单，本地清单中有changed_ratio比例的项被修改或删除"""
+	rng = random.Random(seed)
+	remote: ItemDict = {}
+	local: ItemDict = {}
+	for i in range(count):
+		name = f'assets/bench/bundle_{i:06d}'
+		file_hash = rng.randbytes(16).hex().encode()
+		item = ManifestItem(
+			f'https://cdn/{file_hash.decode()}', f'{name}.bundle', file_hash
+		)
+		remote[LocalFileName(name)] = item
+		roll = rng.random()
+		if roll < changed_ratio / 2:
+			local[LocalFileName(name)] = item._replace(file_hash=b'old')
+		elif roll >= changed_ratio:
+			local[LocalFileName(name)] = item
+	return remote, local
+
+
+def legacy_diff(
+	remote: ItemDict, local: ItemDict, patterns: tuple[str, ...]
+) -> ItemDict:
+	"""旧的generate_update_manifest实现"""
+
+	def filter_items(items: ItemDict) -> ItemDict:
+		if not patterns:
+			return items
+		filtered = {}
+		for local_fn, item in items.items():
+			for pattern in patterns:
+				if fnmatch(item.local_basename, pattern):
+					filtered[local_fn] = item
+					break
+		return filtered
+
+	remote_items = filter_items(remote)
+	local_items = filter_items(local)
+	if local_items == remote_items or not remote_items:
+		return {}
+
+	def needs_update(item: tuple[LocalFileName, ManifestItem]) -> bool:
+		local_fn, remote_item = item
+		try:
+			return local_items[local_fn].file_hash != remote_item.file_hash
+		except KeyError:
+			return True
+
+	return dict(filter(needs_update, remote_items.items()))
+
+
+def best_of(func: Callable[[], object], repeat: int) -> float:
+	timings = []
+	for _ in range(repeat):
+		start = time.perf_counter()
+		func()
+		timings.append(time.perf_counter() - start)
+	return min(timings)
+
+
+@click.command(help='测试清单比对的性能')
+@click.option('--items', default=100_000, show_default=True, help='清单项数量')
+@click.option('--changed-ratio', default=0.05, show_default=True)
+@click.option('--repeat', default=5, show_default=True, help='取最快一次的结果')
+def main(items: int, changed_ratio: float, repeat: int) -> None:
+	remote, local = make_items(items, changed_ratio, seed=0)
+	click.echo(f'# 清单项数量: {items}，变化比例: {changed_ratio}')
+	click.echo(f'{"模式":<8} {"旧实现(ms)":>12} {"新实现(ms)":>12} {"加速比":>8}')
+	for name, patterns in PATTERNS.items():
+		expected = legacy_diff(remote, local, patterns)
+		assert diff_manifest_items(remote, local, patterns).updated == expected
+		old = best_of(lambda p=patterns: legacy_diff(remote, local, p), repeat)
+		new = best_of(lambda p=patterns: diff_manifest_items(remote, local, p), repeat)
+		click.echo(
+			f'{name:<8} {old * 1000:>12.1f} {new * 1000:>12.1f} {old / new:>8.1f}x'
+		)
+
+
+if __name__ == '__main__':
+	main()
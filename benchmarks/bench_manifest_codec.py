@@ -0,0 +1,80 @@
+"""本地清单保存与加载的基准测试
+
+用法::
+
+	python -m benchmarks.bench_manifest_codec --items 100000
+
+对比dataclasses_json的Manifest.to_json/from_json与orjson行格式的
+dumps_manifest/loads_manifest，未安装zstandard时跳过zstd。
+"""
+
+from collections.abc import Callable
+import importlib.util
+import random
+import time
+
+import click
+
+from albi0.update.manifest_codec import Compression, dumps_manifest, loads_manifest
+from albi0.update.version import LocalFileName, Manifest, ManifestItem
+
+
+def make_manifest(count: int, seed: int) -> Manifest:
+	rng = random.Random(seed)
+	items = {}
+	for i in range(count):
+		name = f'assets/bench/bundle_{i:06d}'
+		file_hash = rng.randbytes(16).hex()
+		items[LocalFileName(f'/data/{name}')] = ManifestItem(
+			f'https://cdn.example.com/{file_hash}',
+			f'{name}.bundle',
+			file_hash.encode(),
+			rng.randrange(1024, 8 * 1024**2),
+			str(rng.getrandbits(32)),
+		)
+	return Manifest(version='1.0.0', items=items)
+
+
+def best_of(func: Callable[[], object], repeat: int) -> float:
+	timings = []
+	for _ in range(repeat):
+		start = time.perf_counter()
+		func()
+		timings.append(time.perf_counter() - start)
+	return min(timings)
+
+
+@click.command(help='测试本地清单保存与加载的性能')
+@click.option('--items', default=100_000, show_default=True, help='清单项数量')
+@click.option('--repeat', default=5, show_default=True, help='取最快一次的结果')
+def main(items: int, repeat: int) -> None:
+	manifest = make_manifest(items, seed=0)
+	click.echo(f'# 清单项数量: {items}')
+	click.echo(f'{"编码":<18} {"保存(ms)":>10} {"加载(ms)":>10} {"大小(KiB)":>10}')
+
+	legacy = manifest.to_json()
+	save = best_of(manifest.to_json, repeat)
+	load = best_of(lambda: Manifest.from_json(legacy), repeat)
+	size = len(legacy.encode())
+	click.echo(
+		f'{"dataclasses_json":<18} {save * 1000:>10.1f} {load * 1000:>10.1f} '
+		f'{size / 1024:>10.1f}'
+	)
+
+	compressions: list[Compression | None] = [None, 'gzip']
+	if importlib.util.find_spec('zstandard') is not None:
+		compressions.append('zstd')
+	for compression in compressions:
+		data = dumps_manifest(manifest, compression)
+		assert loads_manifest(data) == manifest
+		save = best_of(lambda c=compression: dumps_manifest(manifest, c), repeat)
+		load = best_of(lambda d=data: loads_manifest(d), repeat)
+		name = f'orjson+{compression}' if compression else 'orjson'
+		click.echo(
+			f'{name:<18} {save * 1000:>10.1f} {load * 1000:>10.1f} '
+			f'{len(data) / 1024:>10.1f}'
+		)
+
+
+if __name__ == '__main__':
+	main()
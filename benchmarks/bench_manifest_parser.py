@@ -0,0 +1,168 @@
+"""二进制清单解析的基准测试
+
+用法::
+
+	python -m benchmarks.bench_manifest_parser --bundles 100000
+
+对比逐字段调用BytesReader的旧实现与由RecordSchema生成解码函数的解析器，
+合成清单中每个bundle包含3个资源。
+另外对比更新检查时完整解析后再转换为Manifest，与跳过资源信息、逐条读取Bundle的按需解析。
+"""
+
+from collections.abc import Callable
+import time
+
+import click
+from packaging.version import Version
+
+from albi0.bytes_reader import BytesReader
+from albi0.plugins.newseer import NewseerManifestParser
+from albi0.updaters.yoo_version_manager import (
+	PackageAssetInfo,
+	PackageBundleInfo,
+	PackageManifest,
+	YooManifestParser,
+	YooVersionManager,
+)
+from albi0.utils import gc_paused
+from benchmarks.yoo_cdn import CdnSpec, build_manifest_bytes, synthetic_bundles
+
+
+class LegacyYooManifestParser(YooManifestParser):
+	"""旧的YooManifestParser实现，每个字段都通过BytesReader读取"""
+
+	def _parse_asset_infos(
+		self, reader: BytesReader, version: str, count: int
+	) -> list[PackageAssetInfo]:
+		return [
+			PackageAssetInfo(
+				Address=reader.text(),
+				AssetPath=reader.text(),
+				AssetGUID=reader.text()
+				if Version(version) > Version('1.4.16')
+				else None,
+				AssetTags=reader.text_list(),
+				BundleID=reader.int(),
+				DependIDs=reader.int_list(),
+			)
+			for _ in range(count)
+		]
+
+	def _parse_bundle_list(
+		self, reader: BytesReader, version: str, count: int
+	) -> list[PackageBundleInfo]:
+		return [
+			PackageBundleInfo(
+				BundleName=reader.text(),
+				UnityCRC=reader.uint() if Version(version) > Version('1.5.1') else None,
+				FileHash=reader.text(),
+				FileCRC=reader.text(),
+				FileSize=reader.long(),
+				IsRawFile=reader.boolean(),
+				LoadMethod=reader.byte(),
+				Tags=reader.text_list(),
+				ReferenceIDs=reader.int_list(),
+			)
+			for _ in range(count)
+		]
+
+
+class LegacyNewseerManifestParser(YooManifestParser):
+	"""旧的NewseerManifestParser实现"""
+
+	def _parse_asset_infos(
+		self, reader: BytesReader, version: str, count: int
+	) -> list[PackageAssetInfo]:
+		return [
+			PackageAssetInfo(
+				Address='',
+				AssetPath=reader.text(),
+				AssetGUID=None,
+				AssetTags=[],
+				BundleID=reader.int(),
+				DependIDs=reader.int_list(),
+			)
+			for _ in range(count)
+		]
+
+	def _parse_bundle_list(
+		self, reader: BytesReader, version: str, count: int
+	) -> list[PackageBundleInfo]:
+		return [
+			PackageBundleInfo(
+				BundleName=reader.text(),
+				UnityCRC=reader.uint() if Version(version) > Version('1.5.1') else None,
+				FileHash=reader.text(),
+				FileCRC=reader.text(),
+				FileSize=reader.long(),
+				IsRawFile=reader.boolean(),
+				LoadMethod=reader.byte(),
+				Tags=[],
+				ReferenceIDs=reader.int_list(),
+			)
+			for _ in range(count)
+		]
+
+
+PARSERS: dict[
+	str, tuple[bool, Callable[[bytes], PackageManifest], YooManifestParser]
+] = {
+	'YooAsset': (False, LegacyYooManifestParser(), YooManifestParser()),
+	'Newseer': (True, LegacyNewseerManifestParser(), NewseerManifestParser()),
+}
+
+
+def best_of(func: Callable[[], object], repeat: int) -> float:
+	timings = []
+	for _ in range(repeat):
+		start = time.perf_counter()
+		func()
+		timings.append(time.perf_counter() - start)
+	return min(timings)
+
+
+@click.command(help='测试二进制清单解析的性能')
+@click.option('--bundles', default=100_000, show_default=True, help='bundle数量')
+@click.option('--repeat', default=3, show_default=True, help='取最快一次的结果')
+def main(bundles: int, repeat: int) -> None:
+	click.echo(f'# bundle数量: {bundles}')
+	click.echo(
+		f'{"格式":<10} {"大小(MiB)":>10} {"旧实现(ms)":>12} {"新实现(ms)":>12} '
+		f'{"加速比":>8}'
+	)
+	for name, (newseer, legacy, parser) in PARSERS.items():
+		spec = CdnSpec(bundle_count=bundles, newseer=newseer)
+		data = build_manifest_bytes(spec, synthetic_bundles(spec))
+		assert parser(data) == legacy(data)
+		old = best_of(lambda p=legacy, d=data: p(d), repeat)
+		new = best_of(lambda p=parser, d=data: p(d), repeat)
+		click.echo(
+			f'{name:<10} {len(data) / 1024**2:>10.1f} {old * 1000:>12.1f} '
+			f'{new * 1000:>12.1f} {old / new:>8.1f}x'
+		)
+
+	click.echo('\n# 更新检查：解析清单并转换为Manifest')
+	click.echo(f'{"格式":<10} {"完整解析(ms)":>14} {"按需解析(ms)":>14} {"加速比":>8}')
+	for name, (newseer, _, parser) in PARSERS.items():
+		spec = CdnSpec(bundle_count=bundles, newseer=newseer)
+		data = build_manifest_bytes(spec, synthetic_bundles(spec))
+		version_manager = YooVersionManager(
+			spec.package_name,
+			remote_path='http://127.0.0.1/',
+			local_path='./bench/',
+			manifest_factory=parser,
+		)
+
+		def simplify(package: object, vm: YooVersionManager = version_manager) -> None:
+			with gc_paused():
+				vm._simplify_manifest(package)  # type: ignore
+
+		old = best_of(lambda p=parser, d=data, f=simplify: f(p(d)), repeat)
+		new = best_of(lambda p=parser, d=data, f=simplify: f(p.parse_lazy(d)), repeat)
+		click.echo(
+			f'{name:<10} {old * 1000:>14.1f} {new * 1000:>14.1f} {old / new:>8.1f}x'
+		)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,268 @@
+"""Updater.update的端到端基准测试
+
+用法::
+
+	python -m benchmarks.bench_update -c 4 -c 16 -c 64
+
+每个并发设置在独立的子进程中运行，峰值内存（RSS）互不影响。
+请求延迟为单个GET请求从发出到响应体读取完毕的时间，不包括排队等待并发名额的时间。
+"""
+
+from collections.abc import AsyncIterator, Callable
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+from dataclasses import asdict, dataclass
+import multiprocessing
+import os
+from pathlib import Path
+import statistics
+import sys
+import tempfile
+import time
+
+import anyio
+import click
+from httpx import (
+	AsyncBaseTransport,
+	AsyncByteStream,
+	AsyncClient,
+	AsyncHTTPTransport,
+	Request,
+	Response,
+)
+
+from albi0 import request
+from albi0.request import ClientConfig, HostLimitedTransport
+from albi0.update import AdaptiveLimiter, Downloader, Updater
+from albi0.updaters.yoo_version_manager import YooVersionManager
+from benchmarks.yoo_cdn import CdnSpec, serve_cdn
+
+
+class TimedStream(AsyncByteStream):
+	"""响应体读取完毕或关闭时调用一次回调的响应流"""
+
+	def __init__(self, stream: AsyncByteStream, done: Callable[[], None]) -> None:
+		self._stream = stream
+		self._done: Callable[[], None] | None = done
+
+	def _finish(self) -> None:
+		if self._done is not None:
+			done, self._done = self._done, None
+			done()
+
+	async def __aiter__(self) -> AsyncIterator[bytes]:
+		try:
+			async for chunk in self._stream:
+				yield chunk
+		finally:
+			self._finish()
+
+	async def aclose(self) -> None:
+		try:
+			await self._stream.aclose()
+		finally:
+			self._finish()
+
+
+class TimingTransport(AsyncBaseTransport):
+	"""记录每个GET请求从发出到响应体读取完毕的时间"""
+
+	def __init__(self, transport: AsyncBaseTransport) -> None:
+		self._transport = transport
+		self.latencies: list[float] = []
+
+	def _recorder(self, start: float) -> Callable[[], None]:
+		return lambda: self.latencies.append(time.perf_counter() - start)
+
+	async def handle_async_request(self, request: Request) -> Response:
+		start = time.perf_counter()
+		response = await self._transport.handle_async_request(request)
+		if request.method == 'GET':
+			assert isinstance(response.stream, AsyncByteStream)
+			response.stream = TimedStream(response.stream, self._recorder(start))
+		return response
+
+	async def aclose(self) -> None:
+		await self._transport.aclose()
+
+
+@dataclass
+class BenchResult:
+	concurrency: int
+	adaptive: bool
+	files: int
+	total_bytes: int
+	elapsed: float
+	p50: float
+	p90: float
+	p99: float
+	max_latency: float
+	peak_rss: int
+	"""子进程的峰值RSS（字节）"""
+
+	@property
+	def throughput(self) -> float:
+		return self.total_bytes / self.elapsed
+
+	@property
+	def files_per_second(self) -> float:
+		return self.files / self.elapsed
+
+
+def _peak_rss() -> int:
+	import resource
+
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	# Linux以KiB为单位，macOS以字节为单位
+	return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _percentile(values: list[float], q: int) -> float:
+	if len(values) < 2:
+		return values[0] if values else 0.0
+	return statistics.quantiles(values, n=100, method='inclusive')[q - 1]
+
+
+async def _update(
+	base_url: str, spec: CdnSpec, working_dir: Path, concurrency: int, adaptive: bool
+) -> tuple[TimingTransport, int]:
+	"""返回请求计时与下载的总字节数"""
+	config = ClientConfig(
+		max_connections=max(ClientConfig.max_connections, concurrency),
+		max_connections_per_host=concurrency,
+	)
+	request.configure(config)
+	transport = TimingTransport(
+		HostLimitedTransport(AsyncHTTPTransport(limits=config.limits), concurrency)
+	)
+	async with AsyncClient(
+		headers=request.header, timeout=config.timeout, transport=transport
+	) as client:
+		updater = Updater(
+			'bench.yoo',
+			'基准测试',
+			version_manager=YooVersionManager(
+				spec.package_name,
+				remote_path=base_url,
+				local_path=str(working_dir),
+			),
+			downloader=Downloader(client, concurrency),
+		)
+		await updater.update(
+			semaphore=AdaptiveLimiter(1, max_limit=concurrency)
+			if adaptive
+			else anyio.Semaphore(concurrency),
+		)
+	await request.aclose()
+	manifest = updater.version_manager.load_local_manifest()
+	return transport, sum(item.file_size or 0 for item in manifest.items.values())
+
+
+def run_once(
+	base_url: str, spec: CdnSpec, concurrency: int, adaptive: bool
+) -> BenchResult:
+	"""在当前进程中运行一次完整的更新，应在新的子进程中调用"""
+	with (
+		tempfile.TemporaryDirectory() as working_dir,
+		open(os.devnull, 'w') as devnull,
+		contextlib.redirect_stdout(devnull),
+		contextlib.redirect_stderr(devnull),
+	):
+		start = time.perf_counter()
+		transport, total_bytes = anyio.run(
+			_update, base_url, spec, Path(working_dir), concurrency, adaptive
+		)
+		elapsed = time.perf_counter() - start
+
+	latencies = transport.latencies
+	return BenchResult(
+		concurrency=concurrency,
+		adaptive=adaptive,
+		files=len(latencies),
+		total_bytes=total_bytes,
+		elapsed=elapsed,
+		p50=_percentile(latencies, 50),
+		p90=_percentile(latencies, 90),
+		p99=_percentile(latencies, 99),
+		max_latency=max(latencies, default=0.0),
+		peak_rss=_peak_rss(),
+	)
+
+
+def format_result(result: BenchResult) -> str:
+	mode = 'adaptive' if result.adaptive else 'fixed'
+	return (
+		f'{result.concurrency:>5} {mode:>8} {result.files:>7} '
+		f'{result.throughput / 1024**2:>9.1f} {result.files_per_second:>8.1f} '
+		f'{result.p50 * 1000:>8.1f} {result.p90 * 1000:>8.1f} '
+		f'{result.p99 * 1000:>8.1f} {result.max_latency * 1000:>8.1f} '
+		f'{result.peak_rss / 1024**2:>8.1f}'
+	)
+
+
+HEADER = (
+	'并发数     模式     文件数    MiB/s   文件/s  p50(ms)  p90(ms)  p99(ms)  '
+	'max(ms)  RSS(MiB)'
+)
+
+
+@click.command(help='使用本地模拟CDN测试Updater.update的端到端性能')
+@click.option(
+	'-c',
+	'--concurrency',
+	multiple=True,
+	type=int,
+	default=(4, 16, 64),
+	show_default=True,
+	help='并发数，可以多次指定',
+)
+@click.option('--adaptive', is_flag=True, help='同时测试自适应并发')
+@click.option('--bundles', default=CdnSpec.bundle_count, show_default=True)
+@click.option(
+	'--median-size',
+	default=CdnSpec.median_size,
+	show_default=True,
+	help='bundle大小的中位数（字节）',
+)
+@click.option('--repeat', default=1, show_default=True, help='每个设置的重复次数')
+@click.option(
+	'-o',
+	'--output',
+	type=click.Path(dir_okay=False, writable=True, path_type=Path),
+	default=None,
+	help='将结果追加写入文件',
+)
+def main(
+	concurrency: tuple[int, ...],
+	adaptive: bool,
+	bundles: int,
+	median_size: int,
+	repeat: int,
+	output: Path | None,
+) -> None:
+	spec = CdnSpec(bundle_count=bundles, median_size=median_size)
+	settings = [(c, False) for c in concurrency]
+	if adaptive:
+		settings += [(c, True) for c in concurrency]
+
+	lines = [f'# {asdict(spec)}', HEADER]
+	click.echo('\n'.join(lines))
+	with serve_cdn(spec) as (base_url, cdn_bytes):
+		click.echo(f'# CDN: {base_url} 共{cdn_bytes / 1024**2:.1f}MiB')
+		ctx = multiprocessing.get_context('spawn')
+		for c, is_adaptive in settings:
+			for _ in range(repeat):
+				with ProcessPoolExecutor(1, mp_context=ctx) as executor:
+					result = executor.submit(
+						run_once, base_url, spec, c, is_adaptive
+					).result()
+				lines.append(format_result(result))
+				click.echo(lines[-1])
+
+	if output is not None:
+		with output.open('a', encoding='utf-8') as f:
+			f.write('\n'.join(lines) + '\n')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,142 @@
+"""本地HTTP服务器，模拟支持Range请求的CDN，供基准测试与测试使用。"""
+
+from dataclasses import dataclass, field
+import functools
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+from typing_extensions import Self
+
+
+@dataclass
+class RecordedRequest:
+	method: str
+	path: str
+	headers: dict[str, str]
+	"""请求头，键为小写"""
+
+
+@dataclass
+class StandInState:
+	files: dict[str, bytes] = field(default_factory=dict)
+	"""路径到文件内容的映射，路径以'/'开头"""
+	support_ranges: bool = True
+	"""为False时忽略Range请求头，且不返回Accept-Ranges"""
+	abort_after: dict[str, int] = field(default_factory=dict)
+	"""路径到字节数的映射，发送指定字节数后断开连接，仅生效一次"""
+	requests: list[RecordedRequest] = field(default_factory=list)
+	lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+@functools.lru_cache(maxsize=4096)
+def etag_of(data: bytes) -> str:
+	return f'"{hashlib.md5(data).hexdigest()}"'
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+	protocol_version = 'HTTP/1.1'
+	# 响应头与响应体分两次写入，关闭Nagle算法以免每个请求都等待延迟确认
+	disable_nagle_algorithm = True
+	server: 'StandInServer'
+
+	def log_message(self, format, *args) -> None:
+		pass
+
+	def do_HEAD(self) -> None:
+		self._handle(send_body=False)
+
+	def do_GET(self) -> None:
+		self._handle(send_body=True)
+
+	def _handle(self, *, send_body: bool) -> None:
+		state = self.server.state
+		path = self.path.split('?', 1)[0]
+		with state.lock:
+			state.requests.append(
+				RecordedRequest(
+					self.command,
+					path,
+					{k.lower(): v for k, v in self.headers.items()},
+				)
+			)
+			data = state.files.get(path)
+			abort_after = state.abort_after.pop(path, None) if send_body else None
+
+		if data is None:
+			self.send_response(404)
+			self.send_header('Content-Length', '0')
+			self.end_headers()
+			return
+
+		etag = etag_of(data)
+		if self.headers.get('If-None-Match') == etag:
+			self.send_response(304)
+			self.send_header('ETag', etag)
+			self.end_headers()
+			return
+
+		start, end = 0, len(data) - 1
+		status = 200
+		range_header = self.headers.get('Range')
+		if_range = self.headers.get('If-Range')
+		if (
+			state.support_ranges
+			and range_header
+			and (if_range is None or if_range == etag)
+		):
+			first, _, last = range_header.removeprefix('bytes=').partition('-')
+			start = int(first)
+			end = int(last) if last else len(data) - 1
+			if start >= len(data):
+				self.send_response(416)
+				self.send_header('Content-Range', f'bytes */{len(data)}')
+				self.send_header('Content-Length', '0')
+				self.end_headers()
+				return
+			end = min(end, len(data) - 1)
+			status = 206
+
+		body = data[start : end + 1]
+		self.send_response(status)
+		self.send_header('Content-Length', str(len(body)))
+		self.send_header('ETag', etag)
+		if state.support_ranges:
+			self.send_header('Accept-Ranges', 'bytes')
+		if status == 206:
+			self.send_header('Content-Range', f'bytes {start}-{end}/{len(data)}')
+		self.end_headers()
+		if not send_body:
+			return
+
+		if abort_after is not None:
+			self.wfile.write(body[:abort_after])
+			self.wfile.flush()
+			self.close_connection = True
+			return
+
+		self.wfile.write(body)
+
+
+class StandInServer(ThreadingHTTPServer):
+	daemon_threads = True
+
+	def __init__(self, state: StandInState | None = None) -> None:
+		super().__init__(('127.0.0.1', 0), StandInHandler)
+		self.state = state or StandInState()
+		self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+	@property
+	def base_url(self) -> str:
+		host, port = self.server_address[:2]
+		return f'http://{host}:{port}/'
+
+	def url(self, path: str) -> str:
+		return f'{self.base_url}{path.lstrip("/")}'
+
+	def __enter__(self) -> Self:
+		self._thread.start()
+		return self
+
+	def __exit__(self, *args) -> None:
+		self.shutdown()
+		self.server_close()
@@ -0,0 +1,200 @@
+"""模拟YooAsset资源服务器的本地CDN
+
+生成合成的bundle文件与二进制清单（使用bundle_bytes_struct打包），
+在独立的进程中提供服务，避免服务器占用基准测试进程的内存与GIL。
+"""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+import hashlib
+import math
+import multiprocessing
+from multiprocessing.connection import Connection
+import random
+import zlib
+
+from packaging.version import Version
+
+from albi0.bytes_reader import LengthType, Writer, bundle_bytes_struct
+from benchmarks.http_server import StandInServer, StandInState
+
+MANIFEST_FILE_VERSION = '2.3.1'
+_MANIFEST_MAGIC = 0x594F4F
+
+
+@dataclass(frozen=True)
+class CdnSpec:
+	"""合成资源的生成参数，相同的参数总是生成相同的文件"""
+
+	package_name: str = 'bench'
+	package_version: str = '1'
+	bundle_count: int = 2000
+	assets_per_bundle: int = 3
+	median_size: int = 32 * 1024
+	"""bundle大小的中位数，大小服从对数正态分布"""
+	size_sigma: float = 1.5
+	min_size: int = 512
+	max_size: int = 16 * 1024 * 1024
+	seed: int = 0
+	file_version: str = MANIFEST_FILE_VERSION
+	"""清单格式版本，决定是否包含LocationToLower、AssetGUID与UnityCRC字段"""
+	newseer: bool = False
+	"""是否使用赛尔号的精简格式（没有Address、AssetGUID与Tags）"""
+
+
+@dataclass(frozen=True)
+class SyntheticBundle:
+	name: str
+	file_hash: str
+	file_crc: str
+	file_size: int
+
+
+def _string(value: str) -> tuple:
+	return ('string', value, {'lengthType': LengthType.UINT16})
+
+
+def _text_list(values: list[str]) -> list:
+	return [('ushort', len(values)), *map(_string, values)]
+
+
+def _int_list(values: list[int]) -> list:
+	return [('ushort', len(values)), *(('int', v) for v in values)]
+
+
+def iter_bundle_sizes(spec: CdnSpec) -> Iterator[int]:
+	rng = random.Random(spec.seed)
+	mu = math.log(spec.median_size)
+	for _ in range(spec.bundle_count):
+		size = int(rng.lognormvariate(mu, spec.size_sigma))
+		yield min(spec.max_size, max(spec.min_size, size))
+
+
+def generate_bundles(spec: CdnSpec) -> dict[str, bytes]:
+	"""生成bundle文件内容，键为bundle名称"""
+	rng = random.Random(spec.seed + 1)
+	return {
+		f'assets/bench/bundle_{i:06d}': rng.randbytes(size)
+		for i, size in enumerate(iter_bundle_sizes(spec))
+	}
+
+
+def describe_bundles(files: dict[str, bytes]) -> list[SyntheticBundle]:
+	return [
+		SyntheticBundle(
+			name,
+			hashlib.md5(data).hexdigest(),
+			str(zlib.crc32(data)),
+			len(data),
+		)
+		for name, data in files.items()
+	]
+
+
+def synthetic_bundles(spec: CdnSpec) -> list[SyntheticBundle]:
+	"""只生成清单项而不保留文件内容，用于只需要清单的基准测试"""
+	rng = random.Random(spec.seed + 2)
+	return [
+		SyntheticBundle(
+			f'assets/bench/bundle_{i:06d}',
+			rng.randbytes(16).hex(),
+			str(rng.getrandbits(32)),
+			size,
+		)
+		for i, size in enumerate(iter_bundle_sizes(spec))
+	]
+
+
+def build_manifest_bytes(spec: CdnSpec, bundles: list[SyntheticBundle]) -> bytes:
+	"""按照YooManifestParser（或NewseerManifestParser）的格式打包二进制清单
+
+	每个bundle依赖前一个bundle，奇数序号的资源带有一个标签。
+	"""
+	version = Version(spec.file_version)
+	has_guid = version > Version('1.4.16')
+	has_unity_crc = version > Version('1.5.1')
+	full = not spec.newseer
+	writer = Writer()
+	schema: list = [
+		('uint', _MANIFEST_MAGIC),
+		_string(spec.file_version),
+		False,  # EnableAddressable
+		False if has_guid else None,  # LocationToLower
+		False if has_guid else None,  # IncludeAssetGUID
+		1,  # OutputNameType.HashName
+		_string(spec.package_name),
+		_string(spec.package_version),
+		len(bundles) * spec.assets_per_bundle,
+	]
+	for bundle_id, bundle in enumerate(bundles):
+		for i in range(spec.assets_per_bundle):
+			path = f'{bundle.name}/asset_{i}.prefab'
+			schema += [
+				_string(path.lower()) if full else None,
+				_string(path),
+				_string(hashlib.md5(path.encode()).hexdigest())
+				if full and has_guid
+				else None,
+				*(_text_list(['odd'] if i % 2 else []) if full else []),
+				bundle_id,
+				*_int_list([bundle_id - 1] if bundle_id else []),
+			]
+
+	schema.append(len(bundles))
+	for bundle_id, bundle in enumerate(bundles):
+		schema += [
+			_string(bundle.name),
+			('uint', 0) if has_unity_crc else None,  # UnityCRC
+			_string(bundle.file_hash),
+			_string(bundle.file_crc),
+			('long', bundle.file_size),
+			False,  # IsRawFile
+			('byte', 0),  # LoadMethod
+			*(_text_list(['bench']) if full else []),
+			# 被下一个bundle引用
+			*_int_list([bundle_id + 1] if bundle_id + 1 < len(bundles) else []),
+		]
+	return bundle_bytes_struct(writer, schema)
+
+
+def build_cdn_files(spec: CdnSpec) -> dict[str, bytes]:
+	"""生成CDN上的全部文件，键为以'/'开头的路径"""
+	contents = generate_bundles(spec)
+	bundles = describe_bundles(contents)
+	name = spec.package_name
+	files = {
+		f'/PackageManifest_{name}.version': spec.package_version.encode(),
+		f'/PackageManifest_{name}_{spec.package_version}.bytes': (
+			build_manifest_bytes(spec, bundles)
+		),
+	}
+	files.update((f'/{bundle.file_hash}', contents[bundle.name]) for bundle in bundles)
+	return files
+
+
+def _serve(spec: CdnSpec, conn: Connection) -> None:
+	state = StandInState(files=build_cdn_files(spec))
+	with StandInServer(state) as server:
+		conn.send((server.base_url, sum(map(len, state.files.values()))))
+		# 父进程发送任意消息或关闭连接时退出
+		try:
+			conn.recv()
+		except EOFError:
+			pass
+
+
+@contextmanager
+def serve_cdn(spec: CdnSpec) -> Iterator[tuple[str, int]]:
+	"""在子进程中启动CDN，返回根URL与全部文件的总大小"""
+	ctx = multiprocessing.get_context('spawn')
+	parent_conn, child_conn = ctx.Pipe()
+	process = ctx.Process(target=_serve, args=(spec, child_conn), daemon=True)
+	process.start()
+	try:
+		yield parent_conn.recv()
+	finally:
+		parent_conn.send(None)
+		process.join(5)
+		if process.is_alive():
+			process.kill()
@@ -0,0 +1,17 @@
+from collections.abc import Iterator
+
+import pytest
+
+from benchmarks.http_server import StandInServer
+
+
+@pytest.fixture
+def anyio_backend():
+	return 'asyncio'
+
+
+@pytest.fixture
+def stand_in_server() -> Iterator[StandInServer]:
+	"""启动一个本地HTTP服务器，模拟支持Range请求的CDN。"""
+	with StandInServer() as server:
+		yield server
@@ -0,0 +1,50 @@
+import httpx
+
+from albi0.update import Downloader
+from albi0.update.version import Manifest
+from albi0.updaters.yoo_version_manager import YooManifestParser
+from tests.test_version import DummyVersionManager
+
+
+class RecordingVersionManager(DummyVersionManager):
+	"""记录保存的清单的版本管理器。"""
+
+	local_manifest_path = ''
+
+	def __init__(self, local_manifest_path: str, **kwargs) -> None:
+		super().__init__(**kwargs)
+		self.local_manifest_path = local_manifest_path
+
+	def save_manifest_to_local(self, manifest: Manifest) -> None:
+		self.saved = manifest
+
+
+class StatefulVersionManager(DummyVersionManager):
+	"""保存的清单会作为下次加载的本地清单的版本管理器。"""
+
+	local_manifest_path = ''
+
+	def __init__(self, local_manifest_path: str, **kwargs) -> None:
+		super().__init__(**kwargs)
+		self.local_manifest_path = local_manifest_path
+		self.saved: list[Manifest] = []
+
+	def save_manifest_to_local(self, manifest: Manifest) -> None:
+		self.saved.append(manifest)
+		self._local_manifest = manifest
+
+
+class RenamingManifestParser(YooManifestParser):
+	"""重写了解析方法、为每个Bundle名称加上前缀的解析器。"""
+
+	def _parse_bundle_list(self, reader, version, count):
+		bundles = super()._parse_bundle_list(reader, version, count)
+		for bundle in bundles:
+			bundle['BundleName'] = f'renamed/{bundle["BundleName"]}'
+		return bundles
+
+
+def make_downloader(handler, **kwargs) -> Downloader:
+	"""使用 MockTransport 构造下载器。"""
+	client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+	return Downloader(client, **kwargs)
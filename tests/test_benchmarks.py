@@ -0,0 +1,20 @@
+from albi0.updaters.yoo_version_manager import YooManifestParser
+from benchmarks.yoo_cdn import CdnSpec, build_manifest_bytes, synthetic_bundles
+
+
+def test_synthetic_manifest_is_parsed_by_yoo_parser():
+	"""测试基准测试生成的二进制清单可以被YooManifestParser正确解析。"""
+	spec = CdnSpec(bundle_count=20, assets_per_bundle=2)
+	bundles = synthetic_bundles(spec)
+
+	manifest = YooManifestParser()(build_manifest_bytes(spec, bundles))
+
+	assert manifest['PackageName'] == spec.package_name
+	assert manifest['PackageVersion'] == spec.package_version
+	assert manifest['PackageAssetCount'] == 40
+	assert manifest['PackageAssetInfos'][3]['DependIDs'] == [0]
+	assert [b['BundleName'] for b in manifest['BundleList']] == [
+		b.name for b in bundles
+	]
+	assert manifest['BundleList'][5]['FileSize'] == bundles[5].file_size
+	assert manifest['BundleList'][5]['FileHash'] == bundles[5].file_hash
@@ -0,0 +1,103 @@
+import hashlib
+import os
+from pathlib import Path
+
+import httpx
+import pytest
+
+from albi0.update import BlobStore, Downloader, Updater
+from albi0.update.version import LocalFileName, Manifest, ManifestItem
+from tests.helpers import RecordingVersionManager
+
+DATA = {
+	'a': b'a' * 1000,
+	'b': b'b' * 2000,
+}
+
+
+def make_remote_manifest(root: Path) -> Manifest:
+	items = {}
+	for name, data in DATA.items():
+		items[LocalFileName(root / f'{name}.bundle')] = ManifestItem(
+			f'https://cdn.example.com/{name}',
+			f'{name}.bundle',
+			hashlib.md5(data).hexdigest().encode(),
+			file_size=len(data),
+		)
+	return Manifest(version='2', items=items)
+
+
+def make_updater(root: Path, store: BlobStore, requests: list[str]) -> Updater:
+	def handler(request: httpx.Request) -> httpx.Response:
+		requests.append(request.url.path)
+		return httpx.Response(200, content=DATA[request.url.path.strip('/')])
+
+	client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+	return Updater(
+		'test.blob_store',
+		'测试',
+		version_manager=RecordingVersionManager(
+			str(root / 'manifest.json'),
+			is_outdated=True,
+			remote_manifest=make_remote_manifest(root),
+			local_manifest=Manifest(version='', items={}),
+		),
+		downloader=Downloader(client),
+		blob_store=store,
+	)
+
+
+def test_key_of_uses_hex_for_unsafe_hashes():
+	"""测试字母数字哈希直接作为键，其他哈希使用十六进制表示。"""
+	assert BlobStore.key_of(b'ABCdef01') == 'abcdef01'
+	assert BlobStore.key_of(b'../x') == b'../x'.hex()
+
+
+def test_place_links_file_from_store(tmp_path: Path):
+	"""测试存储中的文件会被硬链接到目标路径，大小不一致时不放置。"""
+	store = BlobStore(tmp_path / 'store')
+	source = tmp_path / 'source'
+	source.write_bytes(b'data')
+	store.add('abcd', source)
+
+	target = tmp_path / 'out' / 'x.bundle'
+	assert store.place('abcd', target, size=4)
+	assert target.read_bytes() == b'data'
+	assert os.path.samefile(target, store.path_for('abcd'))
+
+	assert not store.place('abcd', tmp_path / 'y.bundle', size=5)
+	assert not store.place('missing', tmp_path / 'z.bundle')
+
+
+def test_place_falls_back_to_copy(tmp_path: Path):
+	"""测试不允许硬链接时回退为复制。"""
+	store = BlobStore(tmp_path / 'store', link_modes=('copy',))
+	source = tmp_path / 'source'
+	source.write_bytes(b'data')
+	store.add('abcd', source)
+
+	target = tmp_path / 'x.bundle'
+	assert store.place('abcd', target)
+	assert target.read_bytes() == b'data'
+	assert not os.path.samefile(target, store.path_for('abcd'))
+
+
+@pytest.mark.anyio
+async def test_updater_reuses_blob_store_across_directories(tmp_path: Path):
+	"""测试下载的文件会加入存储，另一个目录再次同步时不发出任何下载请求。"""
+	store = BlobStore(tmp_path / 'store')
+	requests: list[str] = []
+
+	first = make_updater(tmp_path / 'first', store, requests)
+	await first.update()
+	assert sorted(requests) == ['/a', '/b']
+
+	requests.clear()
+	second = make_updater(tmp_path / 'second', store, requests)
+	await second.update()
+
+	assert requests == []
+	for name, data in DATA.items():
+		assert (tmp_path / 'second' / f'{name}.bundle').read_bytes() == data
+	assert isinstance(second.version_manager, RecordingVersionManager)
+	assert second.version_manager.saved.version == '2'
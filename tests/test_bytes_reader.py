@@ -0,0 +1,185 @@
+import mmap
+
+import pytest
+
+from albi0.bytes_reader import (
+	BytesReader,
+	Const,
+	Field,
+	LengthType,
+	RecordSchema,
+	Writer,
+	bundle_bytes_struct,
+)
+
+PRIMITIVES = [
+	('short', -2),
+	('ushort', 65535),
+	('int', -123456),
+	('uint', 4000000000),
+	('long', -(2**40)),
+	('ulong', 2**63),
+	('float', 1.5),
+	('double', -2.25),
+]
+
+
+def make_data(little_endian: bool) -> bytes:
+	options = {'littleEndian': little_endian}
+
+	def text(value: str) -> list:
+		encoded = value.encode()
+		return [('ushort', len(encoded), options), encoded]
+
+	schema: list = [('byte', 7), True]
+	schema += [(name, value, options) for name, value in PRIMITIVES]
+	schema += [*text('字符串'), *text('')]
+	schema += [('ushort', 2, options), *text('a'), *text('bc')]
+	schema += [('ushort', 3, options), *(('int', v, options) for v in (1, -2, 3))]
+	schema.append(b'tail')
+	return bundle_bytes_struct(Writer(), schema)
+
+
+@pytest.mark.parametrize('little_endian', [True, False])
+@pytest.mark.parametrize(
+	'wrap', [bytes, bytearray, memoryview], ids=lambda t: t.__name__
+)
+def test_reads_every_primitive(little_endian, wrap):
+	"""测试bytes与零复制模式下所有基本类型的读取结果一致。"""
+	data = make_data(little_endian)
+	reader = BytesReader(
+		wrap(data), length_type=LengthType.UINT16, little_endian=little_endian
+	)
+
+	assert reader.byte() == 7
+	assert reader.boolean() is True
+	for name, value in PRIMITIVES:
+		assert getattr(reader, name)() == value
+	assert reader.text() == '字符串'
+	assert reader.text() == ''
+	assert reader.text_list() == ['a', 'bc']
+	assert reader.int_list() == [1, -2, 3]
+	tail = reader.read()
+	assert tail == b'tail'
+	assert type(tail) is bytes
+	assert reader.offset == len(data)
+
+
+def test_explicit_endianness_overrides_default():
+	"""测试单次读取指定的字节序优先于读取器的默认字节序。"""
+	reader = BytesReader(Writer.int(1, little_endian=False) + Writer.int(2))
+	assert reader.int(little_endian=False) == 1
+	assert reader.int() == 2
+
+
+def test_reads_from_mmap(tmp_path):
+	"""测试可以直接读取mmap，释放后可以正常关闭mmap。"""
+	path = tmp_path / 'data.bin'
+	path.write_bytes(Writer.ushort(3) + b'abc' + Writer.long(42))
+	with path.open('rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+		with BytesReader(mm, length_type=LengthType.UINT16) as reader:
+			assert reader.text() == 'abc'
+			assert reader.long() == 42
+			assert bytes(reader.view(0)) == b''
+
+
+@pytest.mark.parametrize('little_endian', [True, False])
+def test_record_schema_matches_reader(little_endian):
+	"""测试RecordSchema的解码结果与逐字段读取一致，版本条件在编译时确定。"""
+	options = {'littleEndian': little_endian}
+
+	def record(index: int, with_crc: bool) -> list:
+		name = f'bundle_{index}'.encode()
+		schema: list = [('ushort', len(name), options), name]
+		if with_crc:
+			schema.append(('uint', index, options))
+		schema += [('long', index * 10, options), index % 2 == 0, ('byte', 1)]
+		schema += [('ushort', 1, options), ('ushort', 3, options), b'tag']
+		schema += [
+			('ushort', 2, options),
+			('int', -index, options),
+			('int', 7, options),
+		]
+		return schema
+
+	schema = RecordSchema(
+		Field('Name', 'text'),
+		Field('CRC', 'uint', when=lambda version: version == 'new', default=0),
+		Field('Size', 'long'),
+		Field('IsRaw', 'boolean'),
+		Field('Method', 'byte'),
+		Field('Tags', 'text_list'),
+		Field('Refs', 'int_list'),
+		Const('Extra', factory=list),
+		little_endian=little_endian,
+	)
+	for version, with_crc in (('new', True), ('old', False)):
+		records: list = [part for i in range(3) for part in record(i, with_crc)]
+		data = bundle_bytes_struct(Writer(), [*records, b'tail'])
+		reader = BytesReader(data, little_endian=little_endian)
+
+		decoded = schema.read_list(reader, 3, version)
+
+		assert decoded[1] == {
+			'Name': 'bundle_1',
+			'CRC': 1 if with_crc else 0,
+			'Size': 10,
+			'IsRaw': False,
+			'Method': 1,
+			'Tags': ['tag'],
+			'Refs': [-1, 7],
+			'Extra': [],
+		}
+		assert decoded[0]['Extra'] is not decoded[1]['Extra']
+		assert reader.read() == b'tail'
+
+
+def test_record_schema_empty_lists_and_length_type():
+	"""测试空列表与字段单独指定的长度前缀类型。"""
+	data = Writer.uint(2) + b'ab' + Writer.ushort(0) + Writer.ushort(0)
+	schema = RecordSchema(
+		Field('Text', 'text', length_type=LengthType.UINT32),
+		Field('Tags', 'text_list'),
+		Field('Ids', 'int_list'),
+	)
+
+	assert schema.read(BytesReader(data)) == {'Text': 'ab', 'Tags': [], 'Ids': []}
+	assert schema.compile() is schema.compile('')
+
+
+def test_record_schema_iterates_and_skips():
+	"""测试逐条读取与跳过记录后，读取位置与完整读取一致。"""
+	schema = RecordSchema(
+		Field('Name', 'text'),
+		Field('Tags', 'text_list'),
+		Field('Size', 'int'),
+		Field('Ids', 'int_list'),
+		Field('Flag', 'boolean'),
+		Field('Skipped', 'long', when=lambda version: False),
+	)
+	records = [
+		('ushort', 1),
+		b'a',
+		('ushort', 2),
+		('ushort', 1),
+		b'x',
+		('ushort', 0),
+		('int', 3),
+		('ushort', 1),
+		('int', 9),
+		True,
+	]
+	data = bundle_bytes_struct(Writer(), [*records, *records, b'tail'])
+	expected = schema.read_list(reader := BytesReader(data), 2)
+
+	iterating = BytesReader(data)
+	iterator = schema.iter_records(iterating, 2)
+	assert next(iterator) == expected[0]
+	assert iterating.offset == 0
+	assert list(iterator) == expected[1:]
+	assert iterating.offset == reader.offset
+
+	skipping = BytesReader(data)
+	schema.skip(skipping, 2)
+	assert skipping.offset == reader.offset
+	assert skipping.read() == b'tail'
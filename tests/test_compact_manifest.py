@@ -0,0 +1,60 @@
+import pytest
+
+from albi0.plugins.newseer import NewseerManifestParser
+from albi0.updaters.compact_manifest import CompactPackageManifest
+from albi0.updaters.yoo_version_manager import YooManifestParser
+from benchmarks.yoo_cdn import CdnSpec, build_manifest_bytes, synthetic_bundles
+from tests.helpers import RenamingManifestParser
+
+
+@pytest.mark.parametrize('file_version', ['1.4.16', '2.3.1'])
+@pytest.mark.parametrize('newseer', [False, True], ids=['yoo', 'newseer'])
+def test_compact_manifest_round_trip(file_version, newseer):
+	"""测试列式清单可以还原为与完整解析一致的TypedDict清单。"""
+	spec = CdnSpec(bundle_count=20, file_version=file_version, newseer=newseer)
+	data = build_manifest_bytes(spec, synthetic_bundles(spec))
+	parser = NewseerManifestParser() if newseer else YooManifestParser()
+	manifest = parser(data)
+
+	compact = CompactPackageManifest.from_bytes(data, parser)
+
+	assert compact.to_manifest() == manifest
+	assert CompactPackageManifest.from_manifest(manifest).to_manifest() == manifest
+	assert compact.bundle_count == 20
+	assert compact.asset_count == len(manifest['PackageAssetInfos'])
+
+
+def test_compact_manifest_lookups():
+	"""测试按Bundle名称与资源路径查找，以及字符串的驻留。"""
+	spec = CdnSpec(bundle_count=10)
+	data = build_manifest_bytes(spec, synthetic_bundles(spec))
+	manifest = YooManifestParser()(data)
+	compact = CompactPackageManifest.from_bytes(data)
+	bundle = manifest['BundleList'][3]
+	asset = manifest['PackageAssetInfos'][7]
+
+	assert compact.get_bundle(bundle['BundleName']) == bundle
+	assert compact.find_bundle(bundle['BundleName']) == 3
+	assert compact.get_asset(asset['AssetPath']) == asset
+	assert (
+		compact.asset_bundle(asset['AssetPath'])
+		== (manifest['BundleList'][asset['BundleID']])
+	)
+	assert compact.get_bundle(asset['AssetPath']) is None
+	assert compact.get_asset('missing') is None
+	assert compact.asset_depend_ids[7] == asset['DependIDs']
+	assert compact.strings.strings.count('odd') == 1
+
+
+def test_compact_manifest_uses_overridden_parser_methods():
+	"""测试重写了解析方法的解析器创建列式清单时使用完整解析的结果。"""
+	spec = CdnSpec(bundle_count=10)
+	data = build_manifest_bytes(spec, synthetic_bundles(spec))
+	parser = RenamingManifestParser()
+
+	compact = CompactPackageManifest.from_bytes(data, parser)
+
+	assert compact.to_manifest() == parser(data)
+	assert all(
+		bundle['BundleName'].startswith('renamed/') for bundle in compact.iter_bundles()
+	)
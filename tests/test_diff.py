@@ -0,0 +1,57 @@
+from fnmatch import fnmatch
+
+from albi0.update.diff import compile_patterns, diff_manifest_items
+from albi0.update.version import LocalFileName, ManifestItem
+
+
+def item(name: str, file_hash: bytes) -> ManifestItem:
+	return ManifestItem(f'{name}.r', name, file_hash)
+
+
+def test_compile_patterns_matches_fnmatch():
+	"""测试编译后的模式与逐个调用fnmatch的结果一致。"""
+	patterns = ['*.bundle', 'ui/[ab]?.png', 'Shader/*', '[!x]*.txt']
+	names = [
+		'a.bundle',
+		'ui/a1.png',
+		'ui/c1.png',
+		'Shader/lit',
+		'x.txt',
+		'y.txt',
+		'readme',
+		'a.bundle.bak',
+	]
+	match = compile_patterns(patterns)
+	assert match is not None
+	for name in names:
+		assert match(name) == any(fnmatch(name, p) for p in patterns), name
+
+	assert compile_patterns([]) is None
+
+
+def test_diff_manifest_items_returns_added_changed_removed():
+	"""测试一次遍历得到新增、变化与删除的项，并按模式过滤。"""
+	remote = {
+		LocalFileName('a'): item('a.bin', b'h1'),
+		LocalFileName('b'): item('b.bin', b'h2'),
+		LocalFileName('c'): item('c.bin', b'h3'),
+		LocalFileName('d'): item('d.txt', b'h4'),
+	}
+	local = {
+		LocalFileName('a'): item('a.bin', b'h1'),
+		LocalFileName('b'): item('b.bin', b'old'),
+		LocalFileName('e'): item('e.bin', b'h5'),
+		LocalFileName('f'): item('f.txt', b'h6'),
+	}
+
+	diff = diff_manifest_items(remote, local)
+	assert list(diff.added) == ['c', 'd']
+	assert diff.changed == {'b': remote[LocalFileName('b')]}
+	assert list(diff.removed) == ['e', 'f']
+	assert list(diff.updated) == ['b', 'c', 'd']
+
+	filtered = diff_manifest_items(remote, local, ['*.bin'])
+	assert list(filtered.updated) == ['b', 'c']
+	assert list(filtered.removed) == ['e']
+
+	assert not diff_manifest_items(local, local)
@@ -0,0 +1,296 @@
+import hashlib
+import io
+from pathlib import Path
+import zlib
+
+import anyio
+import httpx
+import pytest
+from tqdm.asyncio import tqdm
+
+from albi0.update.downloader import (
+	ChecksumMismatchError,
+	Downloader,
+	DownloadParams,
+	FileSizeMismatchError,
+	get_state_filename,
+	get_temp_filename,
+)
+from albi0.update.retry import NO_RETRY, RetryPolicy
+from benchmarks.http_server import StandInServer
+from tests.helpers import make_downloader
+
+DATA = bytes(range(256)) * 1024
+
+
+def serve_data(request: httpx.Request) -> httpx.Response:
+	return httpx.Response(200, content=DATA)
+
+
+@pytest.mark.anyio
+async def test_download_streams_to_file(tmp_path: Path):
+	"""测试下载内容会被写入目标文件，且不会残留临时文件。"""
+	filename = tmp_path / 'sub' / 'a.bundle'
+	downloader = make_downloader(serve_data, chunk_size=1024)
+
+	await downloader.download(
+		'https://example.com/a',
+		filename,
+		md5=hashlib.md5(DATA).hexdigest(),
+	)
+
+	assert filename.read_bytes() == DATA
+	assert not get_temp_filename(filename).exists()
+
+
+@pytest.mark.anyio
+async def test_download_md5_mismatch_keeps_original_file(tmp_path: Path):
+	"""测试md5校验失败时抛出异常，且不会覆盖已存在的目标文件。"""
+	filename = tmp_path / 'a.bundle'
+	filename.write_bytes(b'old')
+	downloader = make_downloader(serve_data)
+
+	with pytest.raises(ChecksumMismatchError):
+		await downloader.download('https://example.com/a', filename, md5='0' * 32)
+
+	assert filename.read_bytes() == b'old'
+	assert not get_temp_filename(filename).exists()
+
+
+@pytest.mark.anyio
+async def test_download_with_postprocess_handler(tmp_path: Path):
+	"""测试下载完成后会对文件内容应用后处理函数。"""
+	filename = tmp_path / 'a.bundle'
+	downloader = make_downloader(serve_data)
+
+	await downloader.download(
+		'https://example.com/a',
+		filename,
+		postprocess_handler=lambda data: data[:16],
+	)
+
+	assert filename.read_bytes() == DATA[:16]
+
+
+@pytest.mark.anyio
+async def test_download_resumes_with_range(
+	tmp_path: Path, stand_in_server: StandInServer
+):
+	"""测试下载中断后保留临时文件，再次下载时使用Range请求续传。"""
+	state = stand_in_server.state
+	state.files['/a'] = DATA
+	state.abort_after['/a'] = 100_000
+	filename = tmp_path / 'a.bundle'
+	temp_filename = get_temp_filename(filename)
+	url = stand_in_server.url('a')
+
+	async with httpx.AsyncClient() as client:
+		downloader = Downloader(client, chunk_size=1024, retry_policy=NO_RETRY)
+		with pytest.raises(httpx.HTTPError):
+			await downloader.download(url, filename)
+
+		partial_size = temp_filename.stat().st_size
+		assert 0 < partial_size <= 100_000
+		assert get_state_filename(temp_filename).is_file()
+
+		await downloader.download(url, filename, md5=hashlib.md5(DATA).hexdigest())
+
+	assert filename.read_bytes() == DATA
+	assert not temp_filename.exists()
+	assert not get_state_filename(temp_filename).exists()
+	assert state.requests[-1].headers['range'] == f'bytes={partial_size}-'
+
+
+@pytest.mark.anyio
+async def test_download_restarts_when_range_is_ignored(
+	tmp_path: Path, stand_in_server: StandInServer
+):
+	"""测试服务器忽略Range请求时，从头下载完整文件。"""
+	state = stand_in_server.state
+	state.files['/a'] = DATA
+	state.abort_after['/a'] = 100_000
+	filename = tmp_path / 'a.bundle'
+	url = stand_in_server.url('a')
+
+	async with httpx.AsyncClient() as client:
+		downloader = Downloader(client, chunk_size=1024, retry_policy=NO_RETRY)
+		with pytest.raises(httpx.HTTPError):
+			await downloader.download(url, filename)
+
+		state.support_ranges = False
+		await downloader.download(url, filename, md5=hashlib.md5(DATA).hexdigest())
+
+	assert filename.read_bytes() == DATA
+
+
+@pytest.mark.anyio
+async def test_download_discards_partial_of_changed_file(
+	tmp_path: Path, stand_in_server: StandInServer
+):
+	"""测试远程文件变化后，If-Range校验失败，从头下载新文件。"""
+	state = stand_in_server.state
+	state.files['/a'] = DATA
+	state.abort_after['/a'] = 100_000
+	filename = tmp_path / 'a.bundle'
+	url = stand_in_server.url('a')
+
+	async with httpx.AsyncClient() as client:
+		downloader = Downloader(client, chunk_size=1024, retry_policy=NO_RETRY)
+		with pytest.raises(httpx.HTTPError):
+			await downloader.download(url, filename)
+
+		new_data = DATA[::-1]
+		state.files['/a'] = new_data
+		await downloader.download(url, filename, md5=hashlib.md5(new_data).hexdigest())
+
+	assert filename.read_bytes() == new_data
+
+
+@pytest.mark.anyio
+async def test_segmented_download(tmp_path: Path, stand_in_server: StandInServer):
+	"""测试大文件被拆分为多个Range请求并发下载。"""
+	state = stand_in_server.state
+	state.files['/a'] = DATA
+	filename = tmp_path / 'a.bundle'
+
+	async with httpx.AsyncClient() as client:
+		downloader = Downloader(
+			client, segment_threshold=len(DATA), segment_size=100_000
+		)
+		await downloader.download(
+			stand_in_server.url('a'), filename, md5=hashlib.md5(DATA).hexdigest()
+		)
+
+	assert filename.read_bytes() == DATA
+	ranges = sorted(r.headers['range'] for r in state.requests if r.method == 'GET')
+	assert ranges == [
+		'bytes=0-99999',
+		'bytes=100000-199999',
+		'bytes=200000-262143',
+	]
+
+
+@pytest.mark.anyio
+async def test_segmented_download_falls_back_without_accept_ranges(
+	tmp_path: Path, stand_in_server: StandInServer
+):
+	"""测试服务器没有声明Accept-Ranges时，回退为单连接下载。"""
+	state = stand_in_server.state
+	state.files['/a'] = DATA
+	state.support_ranges = False
+	filename = tmp_path / 'a.bundle'
+
+	async with httpx.AsyncClient() as client:
+		downloader = Downloader(client, segment_threshold=1, segment_size=100_000)
+		await downloader.download(stand_in_server.url('a'), filename)
+
+	assert filename.read_bytes() == DATA
+	get_requests = [r for r in state.requests if r.method == 'GET']
+	assert len(get_requests) == 1
+	assert 'range' not in get_requests[0].headers
+
+
+@pytest.mark.anyio
+async def test_segmented_download_with_known_size_falls_back_without_ranges(
+	tmp_path: Path, stand_in_server: StandInServer
+):
+	"""测试已知大小时跳过HEAD请求，服务器不支持Range时回退为单连接下载。"""
+	state = stand_in_server.state
+	state.files['/a'] = DATA
+	state.support_ranges = False
+	filename = tmp_path / 'a.bundle'
+
+	async with httpx.AsyncClient() as client:
+		downloader = Downloader(client, segment_threshold=1, segment_size=100_000)
+		await downloader.download(stand_in_server.url('a'), filename, size=len(DATA))
+
+	assert filename.read_bytes() == DATA
+	assert all(r.method == 'GET' for r in state.requests)
+	assert 'range' not in state.requests[-1].headers
+
+
+@pytest.mark.anyio
+async def test_segmented_download_retries_failed_segment(
+	tmp_path: Path, stand_in_server: StandInServer
+):
+	"""测试某个分段的连接中断时，按照重试策略重新下载。"""
+	state = stand_in_server.state
+	state.files['/a'] = DATA
+	state.abort_after['/a'] = 10
+	filename = tmp_path / 'a.bundle'
+
+	async with httpx.AsyncClient() as client:
+		downloader = Downloader(
+			client,
+			segment_threshold=1,
+			segment_size=100_000,
+			retry_policy=RetryPolicy(backoff_base=0),
+		)
+		await downloader.download(
+			stand_in_server.url('a'),
+			filename,
+			size=len(DATA),
+			md5=hashlib.md5(DATA).hexdigest(),
+		)
+
+	assert filename.read_bytes() == DATA
+	assert not state.abort_after
+
+
+@pytest.mark.anyio
+async def test_download_retries_corrupt_transfer(tmp_path: Path):
+	"""测试crc32校验失败时立即重新下载。"""
+	responses = [DATA[:-1] + b'\x00', DATA]
+
+	def handler(request: httpx.Request) -> httpx.Response:
+		return httpx.Response(200, content=responses.pop(0))
+
+	filename = tmp_path / 'a.bundle'
+	downloader = make_downloader(handler)
+	await downloader.download(
+		'https://example.com/a',
+		filename,
+		size=len(DATA),
+		crc32=zlib.crc32(DATA),
+	)
+
+	assert filename.read_bytes() == DATA
+	assert not responses
+
+
+@pytest.mark.anyio
+async def test_download_size_mismatch_fails_before_body(tmp_path: Path):
+	"""测试Content-Length与期望大小不一致时，不读取响应体直接失败。"""
+	filename = tmp_path / 'a.bundle'
+	downloader = make_downloader(serve_data, checksum_retries=0)
+
+	with pytest.raises(FileSizeMismatchError):
+		await downloader.download('https://example.com/a', filename, size=len(DATA) + 1)
+
+	assert not filename.exists()
+	assert not get_temp_filename(filename).exists()
+
+
+@pytest.mark.anyio
+async def test_downloads_share_progress_bar(tmp_path: Path):
+	"""测试多个并发的downloads共用进度条时累加总数，且不会关闭传入的进度条。"""
+	downloader = make_downloader(serve_data)
+	semaphore = anyio.Semaphore(4)
+
+	with tqdm(total=0, file=io.StringIO()) as progress_bar:
+		async with anyio.create_task_group() as tg:
+			for group in ('a', 'b'):
+				params = [
+					DownloadParams(
+						f'https://example.com/{group}{i}', tmp_path / f'{group}{i}'
+					)
+					for i in range(3)
+				]
+				tg.start_soon(
+					lambda p=params: downloader.downloads(
+						*p, progress_bar=progress_bar, semaphore=semaphore
+					)
+				)
+
+		assert progress_bar.total == 6
+		assert progress_bar.n == 6
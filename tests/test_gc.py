@@ -0,0 +1,75 @@
+from pathlib import Path
+
+from albi0.update.cleanup import remove_orphaned_files
+from albi0.update.version import LocalFileName, Manifest, ManifestItem
+from tests.helpers import StatefulVersionManager
+
+
+def make_items(root: Path, *names: str) -> dict[LocalFileName, ManifestItem]:
+	items = {}
+	for name in names:
+		path = root / name
+		path.parent.mkdir(parents=True, exist_ok=True)
+		path.write_bytes(b'x' * 10)
+		items[LocalFileName(str(path))] = ManifestItem(name, path.name, b'h', 10)
+	return items
+
+
+def make_version_manager(root: Path) -> StatefulVersionManager:
+	live = make_items(root, 'live.bundle', 'sub/live.bundle')
+	orphaned = make_items(root, 'old.bundle', 'sub/old.bundle', 'gone/a/old.bundle')
+	return StatefulVersionManager(
+		str(root / 'manifest.json'),
+		is_outdated=False,
+		remote_manifest=Manifest(version='2', items=live),
+		local_manifest=Manifest(version='2', items={**live, **orphaned}),
+	)
+
+
+def test_gc_dry_run_changes_nothing(tmp_path: Path):
+	"""测试dry_run只报告将要删除的文件与目录。"""
+	vm = make_version_manager(tmp_path)
+	result = vm.gc(dry_run=True)
+
+	assert sorted(result.files) == sorted(
+		[
+			tmp_path / 'old.bundle',
+			tmp_path / 'sub/old.bundle',
+			tmp_path / 'gone/a/old.bundle',
+		]
+	)
+	assert result.dirs == [tmp_path / 'gone/a']
+	assert result.freed_bytes == 30
+	assert (tmp_path / 'old.bundle').exists()
+	assert len(vm.load_local_manifest().items) == 5
+
+
+def test_gc_removes_orphans_and_empty_dirs(tmp_path: Path):
+	"""测试删除孤立文件与变为空的目录，并从本地清单中移除对应的项。"""
+	vm = make_version_manager(tmp_path)
+	result = vm.gc()
+
+	assert len(result.files) == 3
+	assert not (tmp_path / 'old.bundle').exists()
+	assert not (tmp_path / 'gone').exists()
+	assert result.dirs == [tmp_path / 'gone/a', tmp_path / 'gone']
+	assert (tmp_path / 'sub/live.bundle').exists()
+	# 本地清单所在的目录不会被删除
+	assert tmp_path.exists()
+	assert vm.load_local_manifest().items == vm.get_remote_manifest().items
+
+	assert not vm.gc().files
+
+
+def test_remove_orphaned_files_skips_missing_files(tmp_path: Path):
+	"""测试磁盘上已不存在的文件只从清单中移除，不报告为删除。"""
+	orphaned = {
+		LocalFileName(str(tmp_path / 'missing/x.bundle')): ManifestItem(
+			'x', 'x.bundle', b'h', 10
+		)
+	}
+	result = remove_orphaned_files(orphaned, protected_dirs=(tmp_path,))
+
+	assert result.files == []
+	assert result.dirs == []
+	assert result.stale_entries == list(orphaned)
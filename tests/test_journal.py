@@ -0,0 +1,147 @@
+import hashlib
+from pathlib import Path
+
+import httpx
+import pytest
+
+from albi0.update import Downloader, DownloadsFailedError, Updater
+from albi0.update.journal import ManifestJournal
+from albi0.update.version import LocalFileName, Manifest, ManifestItem
+from tests.helpers import StatefulVersionManager
+
+DATA = {
+	'a': b'a' * 1000,
+	'b': b'b' * 2000,
+}
+
+
+def make_item(name: str) -> ManifestItem:
+	data = DATA[name]
+	return ManifestItem(
+		f'https://cdn.example.com/{name}',
+		f'{name}.bundle',
+		hashlib.md5(data).hexdigest().encode(),
+		file_size=len(data),
+	)
+
+
+def make_updater(
+	root: Path, requests: list[str], *, fail: set[str] = frozenset(), **kwargs
+) -> Updater:
+	def handler(request: httpx.Request) -> httpx.Response:
+		name = request.url.path.strip('/')
+		requests.append(name)
+		if name in fail:
+			return httpx.Response(404)
+		return httpx.Response(200, content=DATA[name])
+
+	client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+	return Updater(
+		'test.journal',
+		'测试',
+		version_manager=StatefulVersionManager(
+			str(root / 'manifest.json'),
+			is_outdated=True,
+			remote_manifest=Manifest(
+				version='2',
+				items={
+					LocalFileName(str(root / f'{name}.bundle')): make_item(name)
+					for name in DATA
+				},
+			),
+			local_manifest=Manifest(version='1', items={}),
+		),
+		downloader=Downloader(client),
+		**kwargs,
+	)
+
+
+def test_replay_skips_truncated_line(tmp_path: Path):
+	"""测试日志最后一行写入到一半时，其余记录仍然可以恢复。"""
+	journal = ManifestJournal(tmp_path / 'manifest.json.journal')
+	journal.append('a.bundle', make_item('a'))
+	journal.append('b.bundle', make_item('b'))
+	journal.close()
+	journal.path.write_bytes(journal.path.read_bytes()[:-10])
+
+	assert journal.replay() == {'a.bundle': make_item('a')}
+
+	journal.clear()
+	assert not journal.exists()
+
+
+def test_rotate_keeps_records_until_compacted(tmp_path: Path):
+	"""测试轮换后的记录在合并前仍可恢复，且未合并时不会再次轮换。"""
+	journal = ManifestJournal(tmp_path / 'manifest.json.journal')
+	journal.append('a.bundle', make_item('a'))
+	assert journal.rotate()
+	assert journal.count == 0
+	journal.append('b.bundle', make_item('b'))
+
+	assert not journal.rotate()
+	assert list(journal.replay_rotated()) == ['a.bundle']
+	assert list(journal.replay()) == ['a.bundle', 'b.bundle']
+
+	journal.clear_rotated()
+	assert journal.rotate()
+	assert list(journal.replay_rotated()) == ['b.bundle']
+	journal.clear()
+	assert not journal.exists()
+
+
+@pytest.mark.anyio
+async def test_update_recovers_journal_from_interrupted_run(tmp_path: Path):
+	"""测试上次中断时日志中的文件会先合并到本地清单，不再重复下载。"""
+	a = LocalFileName(str(tmp_path / 'a.bundle'))
+	journal = ManifestJournal(tmp_path / 'manifest.json.journal')
+	journal.append(a, make_item('a'))
+	journal.close()
+
+	requests: list[str] = []
+	updater = make_updater(tmp_path, requests)
+	await updater.update()
+
+	assert requests == ['b']
+	assert not journal.exists()
+	version_manager = updater.version_manager
+	assert isinstance(version_manager, StatefulVersionManager)
+	# 恢复时保持本地版本号，全部更新完成后才写入远程版本号
+	assert version_manager.saved[0].version == '1'
+	assert list(version_manager.saved[0].items) == [a]
+	assert version_manager.saved[-1].version == '2'
+	assert len(version_manager.saved[-1].items) == 2
+
+
+@pytest.mark.anyio
+async def test_update_compacts_journal_and_keeps_completed_files(tmp_path: Path):
+	"""测试日志达到阈值时合并到本地清单，部分文件失败时已完成的文件仍被保存。"""
+	requests: list[str] = []
+	updater = make_updater(tmp_path, requests, fail={'b'}, journal_compact_every=1)
+	with pytest.raises(DownloadsFailedError):
+		await updater.update()
+
+	version_manager = updater.version_manager
+	assert isinstance(version_manager, StatefulVersionManager)
+	local_manifest = version_manager.load_local_manifest()
+	assert local_manifest.version == '1'
+	assert list(local_manifest.items) == [str(tmp_path / 'a.bundle')]
+	assert not (tmp_path / 'manifest.json.journal').exists()
+	assert not (tmp_path / 'manifest.json.journal.old').exists()
+
+
+@pytest.mark.anyio
+async def test_update_compacts_journal_during_downloads(tmp_path: Path):
+	"""测试下载期间达到阈值的日志会被合并到本地清单，结束时日志被清空。"""
+	requests: list[str] = []
+	updater = make_updater(tmp_path, requests, journal_compact_every=1)
+	await updater.update()
+
+	version_manager = updater.version_manager
+	assert isinstance(version_manager, StatefulVersionManager)
+	# 下载期间的合并保持本地版本号，最后一次保存写入远程版本号
+	assert len(version_manager.saved) >= 2
+	assert all(manifest.version == '1' for manifest in version_manager.saved[:-1])
+	assert version_manager.saved[-1].version == '2'
+	assert len(version_manager.saved[-1].items) == 2
+	assert not (tmp_path / 'manifest.json.journal').exists()
+	assert not (tmp_path / 'manifest.json.journal.old').exists()
@@ -0,0 +1,128 @@
+from pathlib import Path
+
+import anyio
+import httpx
+import pytest
+
+from albi0.update import AdaptiveLimiter, Downloader
+from albi0.update.downloader import DownloadParams
+from albi0.update.limiter import BandwidthLimiter, set_bandwidth_limit
+
+
+@pytest.mark.anyio
+async def test_adaptive_limiter_bounds_concurrency():
+	"""测试同时持有名额的任务数不超过当前上限。"""
+	limiter = AdaptiveLimiter(3, max_limit=3)
+	peak = 0
+
+	async def worker():
+		nonlocal peak
+		async with limiter:
+			peak = max(peak, limiter.in_flight)
+			await anyio.sleep(0.01)
+
+	async with anyio.create_task_group() as tg:
+		for _ in range(10):
+			tg.start_soon(worker)
+
+	assert peak == 3
+	assert limiter.in_flight == 0
+
+
+@pytest.mark.anyio
+async def test_adaptive_limiter_releases_slot_on_cancel():
+	"""测试获取名额时被取消不会占用名额。"""
+	limiter = AdaptiveLimiter(2, max_limit=2)
+	with anyio.CancelScope() as scope:
+		scope.cancel()
+		async with limiter:
+			pass
+	assert limiter.in_flight == 0
+
+	async with limiter:
+		assert limiter.in_flight == 1
+	assert limiter.in_flight == 0
+
+
+@pytest.mark.anyio
+async def test_adaptive_limiter_grows_and_shrinks():
+	"""测试窗口内全部成功时上限加一，失败时乘性下调且每个窗口只下调一次。"""
+	limiter = AdaptiveLimiter(4, max_limit=8, decrease_factor=0.5)
+
+	for _ in range(4):
+		limiter.record_response(0.01)
+		limiter.record_success(1000)
+	assert limiter.limit == 5
+
+	limiter.record_failure()
+	limiter.record_failure()
+	assert limiter.limit == 2
+
+
+@pytest.mark.anyio
+async def test_adaptive_limiter_shrinks_on_rising_latency():
+	"""测试首字节时间明显高于基线时下调上限。"""
+	limiter = AdaptiveLimiter(8, latency_tolerance=2.0, decrease_factor=0.5)
+	limiter.record_response(0.01)
+	for _ in range(4):
+		limiter.record_response(0.1)
+	assert limiter.limit == 4
+
+
+@pytest.mark.anyio
+async def test_downloads_with_adaptive_limiter(tmp_path: Path):
+	"""测试AdaptiveLimiter可以代替Semaphore传给Downloader.downloads。"""
+
+	def handler(request: httpx.Request) -> httpx.Response:
+		return httpx.Response(200, content=b'x' * 1024)
+
+	client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+	limiter = AdaptiveLimiter(2, max_limit=16)
+	params = [
+		DownloadParams(f'https://example.com/{i}', tmp_path / str(i)) for i in range(40)
+	]
+	await Downloader(client).downloads(*params, semaphore=limiter)
+
+	assert all(p.filename.read_bytes() == b'x' * 1024 for p in params)
+	assert limiter.limit > 2
+
+
+@pytest.mark.anyio
+async def test_bandwidth_limiter_paces_consumers():
+	"""测试多个消费者共享令牌桶时，总吞吐量不超过限制。"""
+	limiter = BandwidthLimiter(1_000_000, burst=100_000)
+
+	async def consumer():
+		for _ in range(3):
+			await limiter.consume(100_000)
+
+	start = anyio.current_time()
+	async with anyio.create_task_group() as tg:
+		for _ in range(2):
+			tg.start_soon(consumer)
+	elapsed = anyio.current_time() - start
+
+	# 600KB，扣除100KB的桶容量，至少需要0.5秒
+	assert 0.45 <= elapsed < 1.0
+
+
+@pytest.mark.anyio
+async def test_downloads_respect_global_bandwidth_limit(tmp_path: Path):
+	"""测试全局带宽限制作用于所有下载器。"""
+
+	def handler(request: httpx.Request) -> httpx.Response:
+		return httpx.Response(200, content=b'x' * 200_000)
+
+	client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+	set_bandwidth_limit(1_000_000, burst=64 * 1024)
+	try:
+		start = anyio.current_time()
+		for name in ('a', 'b'):
+			await Downloader(client).download(
+				f'https://example.com/{name}', tmp_path / name
+			)
+		elapsed = anyio.current_time() - start
+	finally:
+		set_bandwidth_limit(None)
+
+	assert elapsed >= 0.3
@@ -0,0 +1,80 @@
+import sys
+
+import pytest
+
+from albi0.update.manifest_codec import (
+	check_compression,
+	dumps_manifest,
+	loads_manifest,
+)
+from albi0.update.version import LocalFileName, Manifest, ManifestItem
+from albi0.updaters.yoo_version_manager import YooVersionManager
+
+
+def make_manifest() -> Manifest:
+	return Manifest(
+		version='3',
+		items={
+			LocalFileName(f'out/{i}.bundle'): ManifestItem(
+				f'https://cdn.example.com/{i}',
+				f'{i}.bundle',
+				f'{i:032x}'.encode(),
+				i * 10,
+				str(i) if i % 2 else None,
+			)
+			for i in range(5)
+		},
+	)
+
+
+@pytest.mark.parametrize('compression', [None, 'gzip'])
+def test_roundtrip(compression):
+	"""测试编码后再解码得到相同的清单，并保持清单项的顺序。"""
+	manifest = make_manifest()
+	loaded = loads_manifest(dumps_manifest(manifest, compression))
+	assert loaded == manifest
+	assert list(loaded.items) == list(manifest.items)
+
+
+def test_roundtrip_zstd():
+	"""测试zstd压缩的清单能够被自动识别并解码。"""
+	pytest.importorskip('zstandard')
+	manifest = make_manifest()
+	data = dumps_manifest(manifest, 'zstd')
+	assert loads_manifest(data) == manifest
+
+
+def test_loads_legacy_json():
+	"""测试仍然可以读取dataclasses_json写入的旧格式清单。"""
+	manifest = make_manifest()
+	assert loads_manifest(manifest.to_json()) == manifest
+
+
+def test_yoo_version_manager_reads_previous_format(tmp_path):
+	"""测试本地已有旧格式清单时可以读取，保存后使用压缩格式的文件名并删除旧清单。"""
+	vm = YooVersionManager(
+		'DefaultPackage',
+		remote_path='https://cdn.example.com',
+		local_path=str(tmp_path),
+		manifest_compression='gzip',
+	)
+	manifest = make_manifest()
+	path = tmp_path / 'PackageManifest_DefaultPackage.json'
+	path.write_text(manifest.to_json())
+	assert vm.load_local_manifest() == manifest
+
+	vm.save_manifest_to_local(manifest)
+	compressed = tmp_path / 'PackageManifest_DefaultPackage.json.gz'
+	assert vm.local_manifest_path == str(compressed)
+	assert compressed.read_bytes().startswith(b'\x1f\x8b')
+	assert not path.exists()
+	assert vm.load_local_manifest() == manifest
+	assert vm.load_local_version() == '3'
+
+
+def test_check_compression_requires_zstandard(monkeypatch):
+	"""测试未安装zstandard时，使用zstd压缩前即可检查出缺少依赖。"""
+	monkeypatch.setitem(sys.modules, 'zstandard', None)
+	check_compression('gzip')
+	with pytest.raises(ImportError, match='albi0\\[zstd\\]'):
+		check_compression('zstd')
@@ -0,0 +1,52 @@
+import pytest
+
+from albi0.plugins.newseer import NewseerManifestParser
+from albi0.updaters.yoo_version_manager import YooManifestParser
+from benchmarks.bench_manifest_parser import (
+	LegacyNewseerManifestParser,
+	LegacyYooManifestParser,
+)
+from benchmarks.yoo_cdn import CdnSpec, build_manifest_bytes, synthetic_bundles
+
+
+@pytest.mark.parametrize('file_version', ['1.4.16', '1.5.1', '2.3.1'])
+@pytest.mark.parametrize(
+	('newseer', 'legacy', 'parser'),
+	[
+		(False, LegacyYooManifestParser(), YooManifestParser()),
+		(True, LegacyNewseerManifestParser(), NewseerManifestParser()),
+	],
+	ids=['yoo', 'newseer'],
+)
+def test_parser_matches_legacy_reader(file_version, newseer, legacy, parser):
+	"""测试RecordSchema的解析结果与逐字段读取的旧实现一致。"""
+	spec = CdnSpec(bundle_count=30, file_version=file_version, newseer=newseer)
+	data = build_manifest_bytes(spec, synthetic_bundles(spec))
+
+	manifest = parser(data)
+
+	assert manifest == legacy(data)
+	assert manifest['PackageBundleCount'] == 30
+	assert manifest['BundleList'][2]['ReferenceIDs'] == [3]
+	assert manifest['PackageAssetInfos'][4]['DependIDs'] == [0]
+	if not newseer:
+		assert manifest['PackageAssetInfos'][1]['AssetTags'] == ['odd']
+
+
+@pytest.mark.parametrize('file_version', ['1.4.16', '2.3.1'])
+@pytest.mark.parametrize('newseer', [False, True], ids=['yoo', 'newseer'])
+def test_lazy_manifest_matches_full_parse(file_version, newseer):
+	"""测试按需解析的清单与完整解析的结果一致，Bundle列表可以跳过资源信息读取。"""
+	spec = CdnSpec(bundle_count=30, file_version=file_version, newseer=newseer)
+	data = build_manifest_bytes(spec, synthetic_bundles(spec))
+	parser = NewseerManifestParser() if newseer else YooManifestParser()
+	manifest = parser(data)
+
+	lazy = parser.parse_lazy(data)
+
+	assert list(lazy['BundleList']) == manifest['BundleList']
+	assert lazy['PackageBundleCount'] == 30
+	assert list(lazy['PackageAssetInfos']) == manifest['PackageAssetInfos']
+	assert lazy['PackageVersion'] == manifest['PackageVersion']
+	assert len(lazy) == len(manifest)
+	assert lazy.to_manifest() == manifest
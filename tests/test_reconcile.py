@@ -0,0 +1,123 @@
+import hashlib
+from pathlib import Path
+import zlib
+
+import httpx
+import pytest
+
+from albi0.update import Downloader, Updater
+from albi0.update import reconcile as reconcile_module
+from albi0.update.reconcile import StatCache, reconcile_files
+from albi0.update.version import LocalFileName, Manifest, ManifestItem
+from tests.helpers import RecordingVersionManager
+
+DATA = {name: name.encode() * 1000 for name in ('a', 'b', 'c', 'd')}
+
+
+def make_items(root: Path) -> dict[LocalFileName, ManifestItem]:
+	return {
+		LocalFileName(str(root / name)): ManifestItem(
+			f'https://cdn.example.com/{name}',
+			name,
+			hashlib.md5(data).hexdigest().encode(),
+			len(data),
+			str(zlib.crc32(data)),
+		)
+		for name, data in DATA.items()
+	}
+
+
+def write_files(root: Path) -> None:
+	for name, data in DATA.items():
+		(root / name).write_bytes(data)
+
+
+def test_reconcile_files_detects_broken_files(tmp_path: Path, mocker):
+	"""测试缺失、截断与损坏的文件会被找出，且状态未变化的文件不会重新计算摘要。"""
+	write_files(tmp_path)
+	items = make_items(tmp_path)
+	spy = mocker.spy(reconcile_module, 'hash_file')
+	stat_cache = StatCache(tmp_path / 'manifest.json.stat')
+
+	assert reconcile_files(items, stat_cache=stat_cache) == {}
+	assert spy.call_count == 4
+
+	(tmp_path / 'a').unlink()
+	(tmp_path / 'b').write_bytes(b'b' * 10)
+	(tmp_path / 'c').write_bytes(b'x' * len(DATA['c']))
+	stat_cache = StatCache(tmp_path / 'manifest.json.stat')
+	stat_cache.load()
+	broken = reconcile_files(items, stat_cache=stat_cache, max_workers=2)
+
+	assert {Path(local_fn).name for local_fn in broken} == {'a', 'b', 'c'}
+	# 只有被改写且大小不变的c需要重新计算摘要
+	assert spy.call_count == 5
+
+
+@pytest.mark.anyio
+async def test_updater_reconcile_redownloads_broken_files(tmp_path: Path):
+	"""测试清单一致但磁盘上的文件损坏时，reconcile模式只重新下载损坏的文件。"""
+	write_files(tmp_path)
+	(tmp_path / 'd').write_bytes(b'corrupted')
+	items = make_items(tmp_path)
+	requests: list[str] = []
+
+	def handler(request: httpx.Request) -> httpx.Response:
+		requests.append(request.url.path)
+		return httpx.Response(200, content=DATA[request.url.path.strip('/')])
+
+	manifest = Manifest(version='1', items=items)
+	vm = RecordingVersionManager(
+		str(tmp_path / 'manifest.json'),
+		is_outdated=False,
+		remote_manifest=manifest,
+		local_manifest=manifest,
+	)
+	updater = Updater(
+		'test.reconcile',
+		'测试',
+		version_manager=vm,
+		downloader=Downloader(
+			httpx.AsyncClient(transport=httpx.MockTransport(handler))
+		),
+	)
+
+	await updater.update()
+	assert requests == []
+
+	await updater.update(reconcile=True)
+	assert requests == ['/d']
+	assert (tmp_path / 'd').read_bytes() == DATA['d']
+	assert vm.saved == manifest
+
+
+@pytest.mark.anyio
+async def test_updater_reconcile_skips_postprocessed_files(tmp_path: Path):
+	"""测试指定了后处理函数时，reconcile模式不会把后处理过的文件当作损坏。"""
+	items = make_items(tmp_path)
+	for name, data in DATA.items():
+		(tmp_path / name).write_bytes(data[:10])
+	requests: list[str] = []
+
+	def handler(request: httpx.Request) -> httpx.Response:
+		requests.append(request.url.path)
+		return httpx.Response(200, content=DATA[request.url.path.strip('/')])
+
+	manifest = Manifest(version='1', items=items)
+	updater = Updater(
+		'test.reconcile',
+		'测试',
+		version_manager=RecordingVersionManager(
+			str(tmp_path / 'manifest.json'),
+			is_outdated=False,
+			remote_manifest=manifest,
+			local_manifest=manifest,
+		),
+		downloader=Downloader(
+			httpx.AsyncClient(transport=httpx.MockTransport(handler))
+		),
+		postprocess_handler=lambda data: data[:10],
+	)
+
+	await updater.update(reconcile=True)
+	assert requests == []
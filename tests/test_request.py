@@ -0,0 +1,52 @@
+import anyio
+import httpx
+import pytest
+
+from albi0 import request
+from albi0.request import ClientConfig, HostLimitedTransport
+
+
+@pytest.mark.anyio
+async def test_host_limited_transport_limits_concurrency_per_host():
+	"""测试每个主机的并发请求数不超过限制，且不同主机互不影响。"""
+	in_flight: dict[str, int] = {}
+	peak: dict[str, int] = {}
+
+	async def handler(req: httpx.Request) -> httpx.Response:
+		host = req.url.host
+		in_flight[host] = in_flight.get(host, 0) + 1
+		peak[host] = max(peak.get(host, 0), in_flight[host])
+		await anyio.sleep(0.01)
+		in_flight[host] -= 1
+		return httpx.Response(200, content=b'ok')
+
+	transport = HostLimitedTransport(httpx.MockTransport(handler), max_per_host=2)
+	async with (
+		httpx.AsyncClient(transport=transport) as client,
+		anyio.create_task_group() as tg,
+	):
+		for host in ('a.com', 'b.com'):
+			for _ in range(6):
+				tg.start_soon(client.get, f'https://{host}/')
+
+	assert peak == {'a.com': 2, 'b.com': 2}
+
+
+@pytest.mark.anyio
+async def test_shared_client_is_reused_and_reconfigurable():
+	"""测试共享客户端在多次获取时复用，关闭前拒绝重新配置，关闭后重建。"""
+	original = request.get_config()
+	try:
+		client = request.get_client()
+		assert request.get_client() is client
+
+		with pytest.raises(RuntimeError):
+			request.configure(ClientConfig(max_connections_per_host=None))
+		await request.aclose()
+		assert client.is_closed
+
+		request.configure(ClientConfig(max_connections_per_host=None))
+		assert request.get_client() is not client
+	finally:
+		await request.aclose()
+		request.configure(original)
@@ -0,0 +1,97 @@
+from pathlib import Path
+
+import anyio
+import httpx
+import pytest
+
+from albi0.update import CircuitBreaker, DownloadsFailedError, RetryPolicy
+from albi0.update.downloader import DownloadParams
+from tests.helpers import make_downloader
+
+FAST_RETRY = RetryPolicy(max_attempts=3, backoff_base=0, jitter=False)
+
+
+def test_retry_policy_classifies_errors():
+	"""测试重试策略对状态码与异常的判断。"""
+	policy = RetryPolicy()
+	request = httpx.Request('GET', 'https://example.com/a')
+
+	def status_error(code: int) -> httpx.HTTPStatusError:
+		response = httpx.Response(code, request=request)
+		return httpx.HTTPStatusError('', request=request, response=response)
+
+	assert policy.is_retryable(status_error(503))
+	assert not policy.is_retryable(status_error(404))
+	assert policy.is_retryable(httpx.ReadError('reset', request=request))
+	assert not policy.is_retryable(ValueError())
+
+
+def test_retry_policy_backoff_respects_max_and_retry_after():
+	"""测试退避时间不超过上限，并优先遵循Retry-After。"""
+	policy = RetryPolicy(backoff_base=1, backoff_max=4, jitter=False)
+	assert [policy.get_delay(n) for n in range(1, 5)] == [1, 2, 4, 4]
+
+	request = httpx.Request('GET', 'https://example.com/a')
+	response = httpx.Response(429, headers={'retry-after': '3'}, request=request)
+	exc = httpx.HTTPStatusError('', request=request, response=response)
+	assert policy.get_delay(1, exc) == 3
+
+	jittered = RetryPolicy(backoff_base=1, backoff_max=4)
+	assert all(0 <= jittered.get_delay(3) <= 4 for _ in range(100))
+
+
+@pytest.mark.anyio
+async def test_download_retries_transient_status(tmp_path: Path):
+	"""测试遇到可重试的状态码时重试下载。"""
+	statuses = [503, 502, 200]
+
+	def handler(request: httpx.Request) -> httpx.Response:
+		return httpx.Response(statuses.pop(0), content=b'data')
+
+	filename = tmp_path / 'a.bundle'
+	await make_downloader(handler, retry_policy=FAST_RETRY).download(
+		'https://example.com/a', filename
+	)
+
+	assert filename.read_bytes() == b'data'
+	assert not statuses
+
+
+@pytest.mark.anyio
+async def test_downloads_keep_going_when_one_file_fails(tmp_path: Path):
+	"""测试单个文件失败时不会取消其他下载。"""
+
+	def handler(request: httpx.Request) -> httpx.Response:
+		if request.url.path == '/bad':
+			return httpx.Response(500)
+		return httpx.Response(200, content=b'data')
+
+	params = [
+		DownloadParams(f'https://example.com/{name}', tmp_path / name)
+		for name in ('a', 'bad', 'b')
+	]
+	with pytest.raises(DownloadsFailedError) as exc_info:
+		await make_downloader(handler, retry_policy=FAST_RETRY).downloads(*params)
+
+	assert set(exc_info.value.failures) == {tmp_path / 'bad'}
+	assert (tmp_path / 'a').read_bytes() == b'data'
+	assert (tmp_path / 'b').read_bytes() == b'data'
+
+
+@pytest.mark.anyio
+async def test_circuit_breaker_delays_requests_to_failing_host():
+	"""测试连续失败达到阈值后，发往该主机的请求需要等待熔断关闭。"""
+	breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=0.2)
+	breaker.record_failure('a.com')
+	assert not breaker.is_open('a.com')
+	breaker.record_failure('a.com')
+	assert breaker.is_open('a.com')
+	assert not breaker.is_open('b.com')
+
+	start = anyio.current_time()
+	await breaker.wait('a.com')
+	assert anyio.current_time() - start >= 0.15
+
+	breaker.record_success('a.com')
+	breaker.record_failure('a.com')
+	assert not breaker.is_open('a.com')
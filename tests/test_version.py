@@ -207,3 +207,23 @@ def test_serialize_manifest_to_json():
 	remote_manifest_json = remote_manifest.to_json()
 	remote_manifest_from_json = Manifest.from_json(remote_manifest_json)
 	assert remote_manifest == remote_manifest_from_json
+
+
+def test_manifest_item_size_and_crc_roundtrip():
+	"""测试清单项的大小与CRC能够被序列化，并兼容不包含这些字段的旧清单。"""
+	item = ManifestItem('x.r', 'x.bin', b'0' * 32, 3, '12345')
+	manifest = Manifest(version='1', items={LocalFileName('x.bin'): item})
+
+	loaded = Manifest.from_json(manifest.to_json())
+	assert loaded.items[LocalFileName('x.bin')] == item
+	assert item.md5 == '0' * 32
+	assert item.crc32 == 12345
+
+	legacy = Manifest.from_json(
+		'{"version": "1", "items": {"x.bin": {"remote_filename": "x.r", '
+		'"local_basename": "x.bin", "file_hash": "6858"}}}'
+	)
+	legacy_item = legacy.items[LocalFileName('x.bin')]
+	assert legacy_item.file_size is None
+	assert legacy_item.crc32 is None
+	assert legacy_item.md5 is None
@@ -0,0 +1,261 @@
+from pathlib import Path
+
+import pytest
+
+from albi0 import request
+from albi0.update import Downloader, Updater
+from albi0.update.metadata_cache import ManifestCache, MetadataCache
+from albi0.updaters.yoo_version_manager import YooManifestParser, YooVersionManager
+from albi0.utils import join_path
+from benchmarks.http_server import StandInServer, etag_of
+from benchmarks.yoo_cdn import (
+	CdnSpec,
+	build_cdn_files,
+	build_manifest_bytes,
+	synthetic_bundles,
+)
+from tests.helpers import RenamingManifestParser
+
+SPEC = CdnSpec(package_name='test', package_version='3', bundle_count=10)
+
+
+@pytest.fixture
+def yoo_server(stand_in_server: StandInServer) -> StandInServer:
+	stand_in_server.state.files.update(
+		{
+			'/PackageManifest_test.version': b'3',
+			'/PackageManifest_test_3.bytes': build_manifest_bytes(
+				SPEC, synthetic_bundles(SPEC)
+			),
+		}
+	)
+	return stand_in_server
+
+
+def count_requests(server: StandInServer, suffix: str) -> int:
+	return sum(r.path.endswith(suffix) for r in server.state.requests)
+
+
+@pytest.mark.anyio
+async def test_remote_version_and_manifest_are_fetched_once(
+	yoo_server: StandInServer, tmp_path: Path
+):
+	"""测试一次运行内远程版本号与清单各只请求一次，同步与异步接口共用缓存。"""
+	vm = YooVersionManager(
+		'test', remote_path=yoo_server.base_url, local_path=str(tmp_path)
+	)
+	try:
+		assert await vm.aget_remote_version() == '3'
+		assert await vm.ais_version_outdated()
+		manifest = await vm.agenerate_update_manifest()
+		assert manifest is not None
+		assert len(manifest.items) == SPEC.bundle_count
+		assert vm.get_remote_version() == '3'
+		assert vm.get_remote_manifest() is await vm.aget_remote_manifest()
+		assert vm.is_version_outdated
+	finally:
+		await request.aclose()
+
+	assert count_requests(yoo_server, '.version') == 1
+	assert count_requests(yoo_server, '.bytes') == 1
+
+	vm.clear_remote_cache()
+	assert vm.get_remote_version() == '3'
+	assert count_requests(yoo_server, '.version') == 2
+
+
+@pytest.mark.anyio
+async def test_metadata_cache_uses_conditional_requests(
+	yoo_server: StandInServer, tmp_path: Path
+):
+	"""测试元数据缓存使用条件请求检查版本，且不会重新下载已缓存版本的清单。"""
+	cache = MetadataCache(tmp_path / 'cache')
+	vm = YooVersionManager(
+		'test',
+		remote_path=yoo_server.base_url,
+		local_path=str(tmp_path),
+		metadata_cache=cache,
+	)
+	try:
+		first = await vm.aget_remote_manifest()
+		vm.clear_remote_cache()
+		assert await vm.aget_remote_version() == '3'
+		second = await vm.aget_remote_manifest()
+	finally:
+		await request.aclose()
+
+	assert first == second
+	requests = yoo_server.state.requests
+	assert [r.path for r in requests] == [
+		'/PackageManifest_test.version',
+		'/PackageManifest_test_3.bytes',
+		'/PackageManifest_test.version',
+	]
+	assert 'if-none-match' not in requests[0].headers
+	assert requests[2].headers['if-none-match'] == etag_of(b'3')
+
+	# 版本变化时重新下载版本文件
+	yoo_server.state.files['/PackageManifest_test.version'] = b'4'
+	vm.clear_remote_cache()
+	assert vm.get_remote_version() == '4'
+
+
+def publish_version(server: StandInServer, version: str) -> None:
+	spec = CdnSpec(package_name='test', package_version=version, bundle_count=3)
+	server.state.files['/PackageManifest_test.version'] = version.encode()
+	server.state.files[f'/PackageManifest_test_{version}.bytes'] = build_manifest_bytes(
+		spec, synthetic_bundles(spec)
+	)
+
+
+def test_metadata_cache_keeps_only_latest_manifest(
+	yoo_server: StandInServer, tmp_path: Path
+):
+	"""测试远程版本变化后，新版本的清单覆盖旧版本的缓存。"""
+	cache_dir = tmp_path / 'cache'
+	vm = YooVersionManager(
+		'test',
+		remote_path=yoo_server.base_url,
+		local_path=str(tmp_path),
+		metadata_cache=MetadataCache(cache_dir),
+	)
+	assert len(vm.get_remote_manifest().items) == SPEC.bundle_count
+	publish_version(yoo_server, '4')
+	vm.clear_remote_cache()
+	assert len(vm.get_remote_manifest().items) == 3
+
+	assert len(list(cache_dir.glob('PackageManifest_test.bytes-*.bin'))) == 1
+	assert len(list(cache_dir.glob('*.bin'))) == 2
+
+
+@pytest.mark.anyio
+async def test_manifest_cache_skips_download_and_parse(
+	yoo_server: StandInServer, tmp_path: Path
+):
+	"""测试远程版本号未变化时直接加载解析后的清单缓存。"""
+	cache = ManifestCache(tmp_path / 'parsed')
+	parsed: list[bytes] = []
+
+	def parser(data: bytes):
+		parsed.append(data)
+		return YooManifestParser()(data)
+
+	def make_vm() -> YooVersionManager:
+		return YooVersionManager(
+			'test',
+			remote_path=yoo_server.base_url,
+			local_path=str(tmp_path),
+			manifest_factory=parser,
+			manifest_cache=cache,
+		)
+
+	try:
+		first = await make_vm().aget_remote_manifest()
+		second = make_vm().get_remote_manifest()
+	finally:
+		await request.aclose()
+
+	assert first == second
+	assert len(parsed) == 1
+	assert count_requests(yoo_server, '.bytes') == 1
+	assert count_requests(yoo_server, '.version') == 2
+
+
+def test_manifest_cache_prunes_older_versions(
+	yoo_server: StandInServer, tmp_path: Path
+):
+	"""测试保存新版本的解析缓存时删除同一个包旧版本的缓存，其他包不受影响。"""
+	cache = ManifestCache(tmp_path / 'parsed')
+	other = cache.path_for('other', '1')
+	other.parent.mkdir(parents=True)
+	other.write_bytes(b'{}')
+	vm = YooVersionManager(
+		'test',
+		remote_path=yoo_server.base_url,
+		local_path=str(tmp_path),
+		manifest_cache=cache,
+	)
+	vm.get_remote_manifest()
+	publish_version(yoo_server, '4')
+	vm.clear_remote_cache()
+	vm.get_remote_manifest()
+
+	namespace = vm._manifest_cache_namespace()
+	assert cache.load('test', '4', namespace) is not None
+	assert not cache.path_for('test', '3', namespace).exists()
+	assert other.exists()
+
+
+def bundle_path(root: Path, i: int) -> str:
+	return join_path(str(root), f'assets/bench/bundle_{i:06d}')
+
+
+@pytest.mark.anyio
+async def test_resolve_asset_patterns_includes_dependencies(
+	yoo_server: StandInServer, tmp_path: Path
+):
+	"""测试按资源路径筛选时包含传递依赖的bundle，合成清单中每个bundle依赖前一个。"""
+	vm = YooVersionManager(
+		'test', remote_path=yoo_server.base_url, local_path=str(tmp_path)
+	)
+	try:
+		selected = await vm.aresolve_asset_patterns('*/bundle_000003/asset_0.prefab')
+	finally:
+		await request.aclose()
+
+	assert selected == {bundle_path(tmp_path, i) for i in range(4)}
+	assert vm.resolve_asset_patterns('*/bundle_000000/*') == {bundle_path(tmp_path, 0)}
+	assert vm.resolve_asset_patterns('missing/*') == set()
+	assert count_requests(yoo_server, '.bytes') == 1
+
+
+def downloaded_bundles(root: Path, spec: CdnSpec) -> list[int]:
+	return [i for i in range(spec.bundle_count) if Path(bundle_path(root, i)).is_file()]
+
+
+@pytest.mark.anyio
+async def test_updater_downloads_only_asset_closure(
+	stand_in_server: StandInServer, tmp_path: Path
+):
+	"""测试指定资源路径时只下载加载该资源所需的bundle，清单只下载一次。"""
+	spec = CdnSpec(package_name='test', bundle_count=6, median_size=1024)
+	stand_in_server.state.files.update(build_cdn_files(spec))
+	updater = Updater(
+		'test.assets',
+		'测试',
+		version_manager=YooVersionManager(
+			'test', remote_path=stand_in_server.base_url, local_path=str(tmp_path)
+		),
+		downloader=Downloader(request.get_client()),
+	)
+	try:
+		await updater.update(asset_patterns=['*/bundle_000001/*'])
+	finally:
+		await request.aclose()
+
+	assert downloaded_bundles(tmp_path, spec) == [0, 1]
+	assert len(updater.version_manager.load_local_manifest().items) == 2
+	# 依赖索引复用本次运行下载的清单
+	assert count_requests(stand_in_server, '.bytes') == 1
+
+
+@pytest.mark.anyio
+async def test_overridden_parser_methods_apply_to_update_manifest(
+	yoo_server: StandInServer, tmp_path: Path
+):
+	"""测试重写了解析方法的解析器在更新时使用完整解析，不走按需解析。"""
+	assert YooManifestParser().supports_lazy
+	assert not RenamingManifestParser().supports_lazy
+	vm = YooVersionManager(
+		'test',
+		remote_path=yoo_server.base_url,
+		local_path=str(tmp_path),
+		manifest_factory=RenamingManifestParser(),
+	)
+	try:
+		manifest = await vm.aget_remote_manifest()
+	finally:
+		await request.aclose()
+
+	assert len(manifest.items) == SPEC.bundle_count
+	assert all('/renamed/' in str(local_fn) for local_fn in manifest.items)